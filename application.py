@@ -2,12 +2,18 @@ import os
 from dotenv import load_dotenv
 from main import create_app
 from main.services.search_service import SemanticSearch
+from main.services.index_snapshot import LocalPinecone
 
 # Load environment variables
 load_dotenv()
 
 # Initialize SemanticSearch with default index
-ss = SemanticSearch(index_name='tech')
+# SERVE_FROM_SNAPSHOTS=1 serves search from local index snapshots instead of Pinecone indexes
+# (add SNAPSHOTS_QUANTIZED=1 to keep int8 vectors in memory and rescore from the mmap'd float32 file)
+if os.getenv('SERVE_FROM_SNAPSHOTS') == '1':
+    ss = SemanticSearch(index_name='tech', pc=LocalPinecone(quantized=os.getenv('SNAPSHOTS_QUANTIZED') == '1'))
+else:
+    ss = SemanticSearch(index_name='tech')
 application = create_app(ss)
 
 # Get port from environment variable or use default
@@ -0,0 +1,283 @@
+import asyncio
+import hashlib
+import json
+import random
+import threading
+import time
+from types import SimpleNamespace
+import numpy as np
+from main.services.batching import estimate_vector_bytes
+
+# Local stand-ins for the Pinecone and OpenAI clients: they mirror the part of
+# each SDK the services use, with configurable latency and error rates.
+
+class FakeApiError(Exception):
+    """Mimics SDK exceptions: carries an HTTP status and response headers"""
+
+    def __init__(self, status, message="", headers=None):
+        super().__init__(f"({status}) {message}")
+        self.status = status
+        self.headers = headers or {}
+
+class _Faults:
+    """Shared latency / error injection"""
+
+    def __init__(self, latency=0.0, jitter=0.5, error_rate=0.0, rate_limit_rate=0.0, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = 0
+
+    def draw(self, extra_latency=0.0):
+        """(delay, error to raise afterwards or None) for one call"""
+        with self.lock:
+            self.calls += 1
+            roll = self.random.random()
+            jitter = self.random.uniform(1 - self.jitter, 1 + self.jitter)
+        delay = (self.latency + extra_latency) * jitter
+        if roll < self.rate_limit_rate:
+            return delay, FakeApiError(429, "Too Many Requests", headers={'Retry-After': '0.05'})
+        if roll < self.rate_limit_rate + self.error_rate:
+            return delay, FakeApiError(503, "Service Unavailable")
+        return delay, None
+
+    def apply(self, extra_latency=0.0):
+        delay, error = self.draw(extra_latency)
+        if delay > 0:
+            time.sleep(delay)
+        if error:
+            raise error
+
+    async def apply_async(self, extra_latency=0.0):
+        delay, error = self.draw(extra_latency)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if error:
+            raise error
+
+class _Record:
+    """Supports both attribute and item access, like the Pinecone SDK models"""
+
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+    def __getitem__(self, key):
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+def fake_embedding(text, dimension=1024):
+    """Deterministic unit vector for a text"""
+    seed = int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little')
+    vector = np.random.default_rng(seed).standard_normal(dimension).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+class FakeInference:
+    def __init__(self, faults, dimension, max_inputs=96):
+        self.faults = faults
+        self.dimension = dimension
+        self.max_inputs = max_inputs
+
+    def embed(self, model, inputs, parameters=None):
+        if len(inputs) > self.max_inputs:
+            raise FakeApiError(400, f"Batch size {len(inputs)} exceeds {self.max_inputs} inputs")
+        self.faults.apply(extra_latency=0.0005 * len(inputs))
+        return [_Record(values=fake_embedding(text, self.dimension).tolist()) for text in inputs]
+
+class FakeIndex:
+    def __init__(self, name, dimension, faults, max_request_bytes=2_000_000):
+        self.name = name
+        self.dimension = dimension
+        self.faults = faults
+        self.max_request_bytes = max_request_bytes
+        self.namespaces = {}
+        self.lock = threading.Lock()
+
+    def upsert(self, vectors, namespace=""):
+        # Rough size check, same estimate the batcher uses
+        size = sum(estimate_vector_bytes(v) for v in vectors)
+        if size > self.max_request_bytes:
+            raise FakeApiError(400, f"Request size {size} exceeds {self.max_request_bytes} bytes")
+        self.faults.apply(extra_latency=0.00002 * len(vectors))
+        with self.lock:
+            store = self.namespaces.setdefault(namespace, {})
+            for v in vectors:
+                store[v['id']] = (np.asarray(v['values'], dtype=np.float32), v.get('metadata', {}))
+        return {'upserted_count': len(vectors)}
+
+    def delete(self, ids, namespace=""):
+        self.faults.apply()
+        with self.lock:
+            store = self.namespaces.get(namespace, {})
+            for id in ids:
+                store.pop(id, None)
+        return {}
+
+    def describe_index_stats(self):
+        with self.lock:
+            return {
+                'dimension': self.dimension,
+                'namespaces': {ns: {'vector_count': len(store)} for ns, store in self.namespaces.items()}
+            }
+
+    def query(self, vector, top_k=10, namespace="", include_values=False, include_metadata=False, filter=None):
+        self.faults.apply()
+        with self.lock:
+            items = list(self.namespaces.get(namespace, {}).items())
+        if not items:
+            return {'matches': []}
+        ids = [id for id, _ in items]
+        matrix = np.stack([values for _, (values, _) in items])
+        scores = matrix @ np.asarray(vector, dtype=np.float32)
+        top = np.argsort(-scores)[:top_k]
+        return {'matches': [
+            {
+                'id': ids[i],
+                'score': float(scores[i]),
+                'metadata': items[i][1][1] if include_metadata else None,
+                'values': items[i][1][0].tolist() if include_values else None,
+            }
+            for i in top
+        ]}
+
+    def list(self, namespace="", limit=100):
+        """Yield pages of ids, like the serverless list endpoint"""
+        with self.lock:
+            ids = sorted(self.namespaces.get(namespace, {}))
+        for i in range(0, len(ids), limit):
+            yield ids[i:i + limit]
+
+    def fetch(self, ids, namespace=""):
+        self.faults.apply()
+        with self.lock:
+            store = self.namespaces.get(namespace, {})
+            return {'vectors': {
+                id: _Record(id=id, values=store[id][0].tolist(), metadata=store[id][1])
+                for id in ids if id in store
+            }}
+
+class FakePinecone:
+    """Stand-in for pinecone.Pinecone"""
+
+    def __init__(self, latency=0.0, error_rate=0.0, rate_limit_rate=0.0, dimension=1024, seed=0, **_):
+        self.faults = _Faults(latency, error_rate=error_rate, rate_limit_rate=rate_limit_rate, seed=seed)
+        self.dimension = dimension
+        self.inference = FakeInference(self.faults, dimension)
+        self.indexes = {}
+
+    def create_index(self, name, dimension, metric="cosine", spec=None):
+        if name in self.indexes:
+            raise FakeApiError(409, f"Index {name} already exists")
+        self.indexes[name] = FakeIndex(name, dimension, self.faults)
+
+    def describe_index(self, name):
+        return _Record(name=name, status={'ready': True})
+
+    def Index(self, name):
+        if name not in self.indexes:
+            self.indexes[name] = FakeIndex(name, self.dimension, self.faults)
+        return self.indexes[name]
+
+def _fake_completion(model, messages, max_tokens, response_format=None):
+    """Echo prompt words back; the length scales with the prompt, capped at max_tokens.
+
+    With a json_schema response_format the words are spread over the
+    schema's required fields and returned as a JSON object.
+    """
+    prompt = " ".join(m['content'] for m in messages)
+    completion_tokens = max(1, min(max_tokens, len(prompt) // 16))
+    words = prompt.split()
+    content = " ".join(words[i % len(words)] for i in range(completion_tokens)) if words else ""
+    if response_format and response_format.get("type") == "json_schema":
+        fields = response_format["json_schema"]["schema"].get("required", [])
+        share = max(1, completion_tokens // max(1, len(fields)))
+        content = json.dumps({
+            field: " ".join(words[(i * share + j) % len(words)] for j in range(share)) if words else "-"
+            for i, field in enumerate(fields)
+        })
+    return _Record(
+        model=model,
+        choices=[_Record(message=_Record(role="assistant", content=content), finish_reason="stop")],
+        usage=_Record(
+            prompt_tokens=len(prompt) // 4 + 1,
+            completion_tokens=completion_tokens,
+            total_tokens=len(prompt) // 4 + 1 + completion_tokens
+        )
+    )
+
+class _ServerLimits:
+    """Per-minute request/token windows enforced the way the OpenAI API does, with its headers"""
+
+    def __init__(self, requests_per_minute, tokens_per_minute):
+        self.limits = {'requests': requests_per_minute, 'tokens': tokens_per_minute}
+        self.available = dict(self.limits)
+        self.updated = time.monotonic()
+
+    def charge(self, tokens):
+        now = time.monotonic()
+        for kind, limit in self.limits.items():
+            self.available[kind] = min(limit, self.available[kind] + (now - self.updated) * limit / 60)
+        self.updated = now
+        cost = {'requests': 1, 'tokens': tokens}
+        short = {kind: cost[kind] - self.available[kind] for kind in cost if cost[kind] > self.available[kind]}
+        if not short:
+            for kind in cost:
+                self.available[kind] -= cost[kind]
+        return short
+
+    def headers(self, short=None):
+        headers = {}
+        for kind, limit in self.limits.items():
+            missing = (short or {}).get(kind, 0)
+            headers[f'x-ratelimit-limit-{kind}'] = str(limit)
+            headers[f'x-ratelimit-remaining-{kind}'] = str(int(max(0, self.available[kind])))
+            headers[f'x-ratelimit-reset-{kind}'] = f"{max(missing, 0) * 60 / limit * 1000:.0f}ms"
+        return headers
+
+class _RawResponse:
+    def __init__(self, completion, headers):
+        self.headers = headers
+        self._completion = completion
+
+    def parse(self):
+        return self._completion
+
+class FakeAsyncChatCompletions:
+    """Async chat completions, also reachable through .with_raw_response for rate-limit headers"""
+
+    def __init__(self, faults, seconds_per_output_token, server_limits=None):
+        self.faults = faults
+        self.seconds_per_output_token = seconds_per_output_token
+        self.server_limits = server_limits
+        self.with_raw_response = SimpleNamespace(create=self._create_raw)
+
+    async def create(self, model, messages, max_tokens=256, **kwargs):
+        return (await self._create_raw(model, messages, max_tokens, **kwargs)).parse()
+
+    async def _create_raw(self, model, messages, max_tokens=256, response_format=None, **kwargs):
+        completion = _fake_completion(model, messages, max_tokens, response_format)
+        headers = {}
+        if self.server_limits:
+            short = self.server_limits.charge(completion.usage.prompt_tokens + max_tokens)
+            headers = self.server_limits.headers(short)
+            if short:
+                raise FakeApiError(429, "Rate limit reached", headers=headers)
+        await self.faults.apply_async(extra_latency=self.seconds_per_output_token * completion.usage.completion_tokens)
+        return _RawResponse(completion, headers)
+
+class FakeAsyncOpenAI:
+    """Stand-in for openai.AsyncOpenAI (chat completions only), optionally enforcing RPM/TPM limits"""
+
+    def __init__(self, latency=0.0, error_rate=0.0, rate_limit_rate=0.0, seconds_per_output_token=0.0,
+                 requests_per_minute=None, tokens_per_minute=None, seed=0, **_):
+        self.faults = _Faults(latency, error_rate=error_rate, rate_limit_rate=rate_limit_rate, seed=seed)
+        server_limits = None
+        if requests_per_minute or tokens_per_minute:
+            server_limits = _ServerLimits(requests_per_minute or 10**9, tokens_per_minute or 10**12)
+        self.chat = SimpleNamespace(
+            completions=FakeAsyncChatCompletions(self.faults, seconds_per_output_token, server_limits)
+        )
@@ -0,0 +1,188 @@
+import argparse
+import cProfile
+import os
+import pstats
+import random
+import re
+import resource
+import time
+from functools import wraps
+import pandas as pd
+from main.services import summarization_service
+from main.services.embedding_service import EmbeddingsGenerator, REQUIRED_COLUMNS
+from main.services.completion_engine import CompletionEngine
+from main.services.llm_cache import LLMCache
+from main.services.record_store import read_records, write_records
+from benchmarks.fakes import FakePinecone, FakeAsyncOpenAI
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far (ru_maxrss is KiB on Linux)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def _load_seed_rows(data_path):
+    frames = [
+        read_records(os.path.join(data_path, file))
+        for file in sorted(os.listdir(data_path))
+        if file.endswith('.csv') or file.endswith('.parquet')
+    ]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+def _mutate(text, rng, vocabulary, rate):
+    """Swap a fraction of words so synthetic copies are not near-duplicates of each other"""
+    words = str(text).split()
+    for i in range(len(words)):
+        if rng.random() < rate:
+            words[i] = rng.choice(vocabulary)
+    return " ".join(words)
+
+def build_synthetic_corpus(seed_rows, scale, key_cols, text_cols, mutation_rate=0.3, seed=0):
+    """Scale seed rows to scale x their size with unique keys and perturbed text"""
+    rng = random.Random(seed)
+    vocabulary = sorted({
+        word for col in text_cols if col in seed_rows.columns
+        for text in seed_rows[col].dropna().astype(str) for word in re.findall(r'[A-Za-z]{4,}', text)
+    }) or ["synthetic"]
+    copies = []
+    for copy in range(int(scale)):
+        frame = seed_rows.copy()
+        for col in key_cols:
+            if col in frame.columns:
+                # Only suffix present keys; empty ones keep exercising the hash fallback for ids
+                keys = frame[col].fillna("").astype(str)
+                frame[col] = keys.where(keys == "", keys + f"-s{copy}")
+        if copy:
+            for col in text_cols:
+                if col in frame.columns:
+                    frame[col] = [_mutate(text, rng, vocabulary, mutation_rate) for text in frame[col].fillna("")]
+        copies.append(frame)
+    return pd.concat(copies, ignore_index=True)
+
+class StageTimer:
+    """Collects wall time and item counts per pipeline stage"""
+
+    def __init__(self):
+        self.stages = {}
+
+    def record(self, stage, seconds, items):
+        entry = self.stages.setdefault(stage, {'seconds': 0.0, 'items': 0})
+        entry['seconds'] += seconds
+        entry['items'] += items
+        entry['peak_rss_mb'] = peak_rss_mb()
+
+    def wrap(self, stage, func, count=len):
+        """Time every call of func, counting items with count(first argument)"""
+        @wraps(func)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.record(stage, time.perf_counter() - start, count(args[0]) if args else 0)
+        return timed
+
+    def report(self, title):
+        print(f"\n{title}")
+        print(f"{'stage':<16}{'items':>10}{'seconds':>10}{'items/s':>12}{'peak RSS MB':>14}")
+        for stage, entry in self.stages.items():
+            rate = entry['items'] / entry['seconds'] if entry['seconds'] else float('inf')
+            print(f"{stage:<16}{entry['items']:>10}{entry['seconds']:>10.2f}{rate:>12.1f}{entry['peak_rss_mb']:>14.1f}")
+
+def bench_embedding(kind, seed_path, scale, workdir, pc):
+    """format -> classify -> embed -> upsert against the fake Pinecone client"""
+    seed_rows = _load_seed_rows(seed_path)
+    if kind == 'tech':
+        corpus = build_synthetic_corpus(seed_rows, scale, ['number', 'link'], ['description', 'LLM Summary', 'LLM Teaser'])
+    else:
+        corpus = build_synthetic_corpus(seed_rows, scale, ['OPPORTUNITY NUMBER', 'LINK'], ['DESCRIPTION', 'LLM Summary', 'LLM Teaser'])
+    data_path = os.path.join(workdir, kind)
+    os.makedirs(data_path, exist_ok=True)
+    write_records(corpus, os.path.join(data_path, f'synthetic_{kind}.parquet'), kind)
+    print(f"Synthetic {kind} corpus: {len(corpus)} rows ({len(seed_rows)} seed rows x {scale})")
+
+    timer = StageTimer()
+    eg = EmbeddingsGenerator(data_path=data_path, index_name=f'bench-{kind}', snapshot_dir=os.path.join(workdir, 'snapshots'))
+    eg.setup(pc=pc)
+    eg.create_index()
+    eg.load_data(REQUIRED_COLUMNS[kind])
+    eg.classify_text_batch = timer.wrap('classify', eg.classify_text_batch)
+
+    start = time.perf_counter()
+    eg.deduplicate()
+    timer.record('dedup', time.perf_counter() - start, len(corpus))
+
+    # Batches are formatted as they are embedded: format time is what the other stages don't account for
+    getattr(eg, f'format_{kind}_data')()
+    start = time.perf_counter()
+    upserted, _ = eg.generate_embeddings()
+    elapsed = time.perf_counter() - start
+    classify_seconds = timer.stages.get('classify', {}).get('seconds', 0.0)
+    timer.record('format', elapsed - classify_seconds - sum(eg.batch_stats[stage]['elapsed'] for stage in ('embed', 'upsert')),
+                 upserted)
+    for stage in ('embed', 'upsert'):
+        stats = eg.batch_stats[stage]
+        timer.record(stage, stats['elapsed'], stats['items'])
+    timer.report(f"Embedding pipeline ({kind}, {len(corpus)} rows)")
+
+def bench_summarization(kind, seed_path, scale, rows, workdir, openai_client):
+    """process_csv against the fake OpenAI client"""
+    seed_rows = _load_seed_rows(seed_path)
+    text_col = 'description' if kind == 'tech' else 'DESCRIPTION'
+    key_cols = ['number', 'link'] if kind == 'tech' else ['OPPORTUNITY NUMBER', 'LINK']
+    corpus = build_synthetic_corpus(seed_rows, scale, key_cols, [text_col])
+    corpus = corpus.drop(columns=['LLM Summary', 'LLM Teaser'], errors='ignore').head(rows)
+    input_path = os.path.join(workdir, f'summarize_{kind}_input.parquet')
+    output_path = os.path.join(workdir, f'summarize_{kind}_output.parquet')
+    write_records(corpus, input_path, kind)
+    if os.path.exists(output_path):
+        os.remove(output_path)
+
+    # Fresh cache per run: hits would hide the cost being measured
+    cache_path = os.path.join(workdir, 'llm_cache.sqlite')
+    if os.path.exists(cache_path):
+        os.remove(cache_path)
+    engine = CompletionEngine(client=openai_client, model=summarization_service.SUMMARY_MODEL, cache=LLMCache(cache_path))
+    timer = StageTimer()
+    start = time.perf_counter()
+    summarization_service.SUMMARY_TELEMETRY_PATH = os.path.join(workdir, 'summarization_runs.jsonl')
+    summarization_service.process_csv(input_path, output_path, content_type=kind, engine=engine)
+    timer.record('summarize', time.perf_counter() - start, len(corpus))
+    timer.report(f"Summarization pipeline ({kind}, {len(corpus)} rows)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline ingestion benchmark with fake Pinecone/OpenAI clients")
+    parser.add_argument('--kind', choices=['tech', 'grants'], default='tech')
+    parser.add_argument('--scale', type=int, default=10, help="copies of the seed corpus")
+    parser.add_argument('--tech-data', default='data/tech')
+    parser.add_argument('--grants-data', default='data/grants/unprocessed')
+    parser.add_argument('--latency', type=float, default=0.05, help="seconds per fake API call")
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0)
+    parser.add_argument('--summarize-rows', type=int, default=100, help="0 skips the summarization benchmark")
+    parser.add_argument('--openai-rpm', type=int, default=5000, help="requests/minute the fake OpenAI server allows")
+    parser.add_argument('--openai-tpm', type=int, default=2000000, help="tokens/minute the fake OpenAI server allows")
+    parser.add_argument('--workdir', default='bench_output')
+    parser.add_argument('--profile', default=None, help="cProfile dump path (default: <workdir>/ingestion.prof)")
+    args = parser.parse_args()
+
+    os.makedirs(args.workdir, exist_ok=True)
+    seed_path = args.tech_data if args.kind == 'tech' else args.grants_data
+    fault_args = dict(latency=args.latency, error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate)
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    bench_embedding(args.kind, seed_path, args.scale, args.workdir, FakePinecone(**fault_args))
+    if args.summarize_rows:
+        openai_client = FakeAsyncOpenAI(
+            requests_per_minute=args.openai_rpm, tokens_per_minute=args.openai_tpm, **fault_args
+        )
+        bench_summarization(args.kind, seed_path, args.scale, args.summarize_rows, args.workdir, openai_client)
+    profiler.disable()
+
+    profile_path = args.profile or os.path.join(args.workdir, 'ingestion.prof')
+    profiler.dump_stats(profile_path)
+    print(f"\nPeak RSS: {peak_rss_mb():.1f} MB; cProfile dump written to {profile_path}")
+    pstats.Stats(profiler).sort_stats('cumulative').print_stats(20)
+
+if __name__ == "__main__":
+    # python -m benchmarks.ingestion_benchmark --kind tech --scale 10
+    main()
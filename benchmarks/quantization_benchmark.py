@@ -0,0 +1,82 @@
+import argparse
+import os
+import shutil
+import time
+import numpy as np
+from main.services.index_snapshot import Snapshot, SnapshotWriter, LocalIndex
+
+def build_synthetic_snapshot(path, count, dimension=1024, clusters=200, seed=0):
+    """Clustered unit vectors, closer to real embeddings than uniform noise"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dimension)).astype(np.float32)
+    writer = SnapshotWriter(path, os.path.basename(path), dimension=dimension)
+    for start in range(0, count, 10000):
+        rows = min(10000, count - start)
+        vectors = centers[rng.integers(0, clusters, rows)] + 0.6 * rng.standard_normal((rows, dimension)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        writer.add([
+            {"id": f"doc-{start + i}", "values": vector, "metadata": {"category": [f"c{(start + i) % 7}"]}}
+            for i, vector in enumerate(vectors)
+        ])
+    writer.close()
+
+def sample_queries(snapshot, count, noise=0.3, seed=1):
+    """Perturbed copies of random documents"""
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(snapshot), size=min(count, len(snapshot)), replace=False)
+    queries = np.asarray(snapshot.vectors[np.sort(rows)], dtype=np.float32)
+    queries += noise * rng.standard_normal(queries.shape).astype(np.float32) / np.sqrt(queries.shape[1])
+    return queries
+
+def run_queries(index, queries, top_k, filter=None):
+    start = time.perf_counter()
+    results = [
+        [m['id'] for m in index.query(vector=q, top_k=top_k, namespace=index.namespace, filter=filter)['matches']]
+        for q in queries
+    ]
+    return results, (time.perf_counter() - start) / len(queries)
+
+def recall(results, truth):
+    hits = sum(len(set(r) & set(t)) for r, t in zip(results, truth))
+    return hits / max(1, sum(len(t) for t in truth))
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall and memory of int8 quantized local search vs exact float32")
+    parser.add_argument('--snapshot', default=None, help="snapshot directory (default: build a synthetic one)")
+    parser.add_argument('--synthetic', type=int, default=100000, help="vectors in the synthetic snapshot")
+    parser.add_argument('--workdir', default='bench_output')
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--top-k', type=int, default=20)
+    parser.add_argument('--rescore-factors', default='1,2,4,8')
+    args = parser.parse_args()
+
+    path = args.snapshot
+    if path is None:
+        path = os.path.join(args.workdir, 'snapshots', f'synthetic-{args.synthetic}')
+        shutil.rmtree(path, ignore_errors=True)
+        build_synthetic_snapshot(path, args.synthetic)
+    snapshot = Snapshot(path)
+    queries = sample_queries(snapshot, args.queries)
+    print(f"{len(snapshot)} vectors x {snapshot.vectors.shape[1]} dims, {len(queries)} queries, top_k={args.top_k}")
+
+    exact = LocalIndex(snapshot)
+    truth, exact_latency = run_queries(exact, queries, args.top_k)
+    filter = {"$or": [{"category": {"$in": [snapshot.metadata[0].get("category", [None])[0]]}}]}
+    filtered_truth, _ = run_queries(exact, queries, args.top_k, filter)
+
+    float_mb = snapshot.vectors.nbytes / 2**20
+    print(f"\n{'mode':<22}{'resident MB':>12}{'recall@k':>10}{'filtered':>10}{'ms/query':>10}")
+    print(f"{'float32 exact':<22}{float_mb:>12.1f}{1.0:>10.3f}{1.0:>10.3f}{exact_latency * 1000:>10.2f}")
+    for factor in [int(f) for f in args.rescore_factors.split(',')]:
+        quantized = LocalIndex(snapshot, quantized=True, rescore_factor=factor)
+        results, latency = run_queries(quantized, queries, args.top_k)
+        filtered, _ = run_queries(quantized, queries, args.top_k, filter)
+        resident_mb = (quantized.codes.nbytes + quantized.norms.nbytes) / 2**20
+        print(
+            f"{f'int8 rescore x{factor}':<22}{resident_mb:>12.1f}{recall(results, truth):>10.3f}"
+            f"{recall(filtered, filtered_truth):>10.3f}{latency * 1000:>10.2f}"
+        )
+
+if __name__ == "__main__":
+    # python -m benchmarks.quantization_benchmark --snapshot snapshots/tech-2025-01-10-0900
+    main()
@@ -1,4 +1,44 @@
+import os
+
+# Fallback aliases, used until a blue/green build has written the alias file
 INDEX_ALIASES = {
     "tech": "tech-2024-12-05",
     "grants": "grants-2024-12-05"
-}
\ No newline at end of file
+}
+
+# Alias file shared by index builds and web workers (point it at shared storage in production)
+INDEX_ALIASES_PATH = os.getenv(
+    'INDEX_ALIASES_PATH',
+    os.path.join(os.path.dirname(__file__), 'index_aliases.json')
+)
+
+# Every build also writes a local snapshot (vectors, ids, metadata) under this directory
+INDEX_SNAPSHOTS_PATH = os.getenv('INDEX_SNAPSHOTS_PATH', 'snapshots')
+
+# Request limits for Pinecone inference (multilingual-e5-large) and upserts
+EMBED_MODEL = "multilingual-e5-large"
+EMBED_MAX_ITEMS = 96
+EMBED_MAX_INPUT_TOKENS = 507  # longer inputs are truncated server-side
+EMBED_MAX_TOKENS = 24000
+UPSERT_MAX_ITEMS = 1000
+UPSERT_MAX_BYTES = 1_800_000  # stays below the 2 MB request limit
+
+# Local e5-compatible ONNX model (directory with model.onnx and tokenizer.json); when set,
+# it replaces Pinecone inference for query and passage embeddings
+LOCAL_EMBED_MODEL_PATH = os.getenv('LOCAL_EMBED_MODEL_PATH')
+LOCAL_EMBED_QUANTIZED = os.getenv('LOCAL_EMBED_QUANTIZED') == '1'
+LOCAL_EMBED_WORKERS = int(os.getenv('LOCAL_EMBED_WORKERS', '1'))
+
+# Queries a freshly built index must answer before its alias is swapped
+SMOKE_QUERIES = {
+    "tech": [
+        "battery energy storage",
+        "cancer diagnostics",
+        "machine learning for images"
+    ],
+    "grants": [
+        "small business innovation research",
+        "autonomous systems",
+        "public health research"
+    ]
+}
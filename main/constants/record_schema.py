@@ -0,0 +1,26 @@
+import pyarrow as pa
+
+# Column names match the CSV headers the scrapers have always produced,
+# so load_data and process_csv treat Parquet and legacy CSV files alike.
+TECH_FIELDS = ["university", "title", "number", "patent", "link", "description"]
+
+GRANTS_FIELDS = [
+    "OPPORTUNITY TITLE", "AGENCY CODE", "OPPORTUNITY STATUS", "POSTED DATE",
+    "CLOSE DATE", "LINK", "OPPORTUNITY NUMBER", "CATEGORY",
+    "LAST_UPDATED_DATE", "POSTED_DATE", "APPLICATION_DEADLINE",
+    "TOTAL_FUNDING_AMOUNT", "AWARD_CEILING", "AWARD_FLOOR", "DESCRIPTION"
+]
+
+# Added by summarization_service
+LLM_FIELDS = ["LLM Summary", "LLM Teaser"]
+
+def _string_schema(fields, record_type):
+    return pa.schema(
+        [pa.field(name, pa.string()) for name in fields + LLM_FIELDS],
+        metadata={"record_type": record_type}
+    )
+
+RECORD_SCHEMAS = {
+    "tech": _string_schema(TECH_FIELDS, "tech"),
+    "grants": _string_schema(GRANTS_FIELDS, "grants"),
+}
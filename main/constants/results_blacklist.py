@@ -1,9 +1,17 @@
-GRANTS_BLACKLIST = [
-    "vec2173", 
-    "vec1566",
-    "vec2549",
-    "vec1358",
-    "vec1533"
-]
+# Ids are stable across builds ("<source>-<opportunity number>", e.g. "grantsgov-HHS-2025-ACF-0001").
+GRANTS_BLACKLIST = []
 
-TECH_BLACKLIST = []
\ No newline at end of file
+# Positional ids from grants indexes built before stable ids, by the index they were assigned in.
+# SemanticSearch resolves them to stable ids through that index on its first grants search; to fold them into
+# GRANTS_BLACKLIST for good: python -m main.services.document_ids migrate-blacklist
+LEGACY_GRANTS_BLACKLIST = {
+    "grants-2024-12-05": [
+        "vec2173",
+        "vec1566",
+        "vec2549",
+        "vec1358",
+        "vec1533",
+    ],
+}
+
+TECH_BLACKLIST = []
@@ -0,0 +1,103 @@
+import json
+import os
+import uuid
+
+# Batch job clients share one small interface, so the OpenAI Batch API and a
+# local stand-in are interchangeable:
+#   submit(job_path) -> batch_id
+#   retrieve(batch_id) -> {"status": ..., "output_file_id": ..., "error_file_id": ...}
+#   download(file_id, path)
+# Job and result files use the OpenAI batch JSONL format.
+BATCH_DONE_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+class OpenAIBatchClient:
+    """OpenAI Batch API (24h window, bulk pricing) for /v1/chat/completions jobs"""
+
+    def __init__(self, client=None):
+        if client is None:
+            import openai
+            client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+        self.client = client
+
+    def submit(self, job_path):
+        with open(job_path, 'rb') as f:
+            input_file = self.client.files.create(file=f, purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+        return batch.id
+
+    def retrieve(self, batch_id):
+        batch = self.client.batches.retrieve(batch_id)
+        return {
+            "status": batch.status,
+            "output_file_id": batch.output_file_id,
+            "error_file_id": batch.error_file_id,
+            "request_counts": dict(batch.request_counts) if batch.request_counts else {},
+        }
+
+    def download(self, file_id, path):
+        content = self.client.files.content(file_id)
+        with open(path, 'wb') as f:
+            f.write(content.read())
+        return path
+
+class LocalBatchClient:
+    """Runs a batch job file immediately against a synchronous chat client.
+
+    chat_client is anything with chat.completions.create (the openai module
+    or openai.OpenAI), so batch mode can be exercised without the Batch API.
+    """
+
+    def __init__(self, chat_client, workdir):
+        self.chat_client = chat_client
+        self.workdir = workdir
+        self.batches = {}
+        os.makedirs(workdir, exist_ok=True)
+
+    def submit(self, job_path):
+        batch_id = f"batch_local_{uuid.uuid4().hex[:12]}"
+        output_path = os.path.join(self.workdir, f"{batch_id}_output.jsonl")
+        errors = 0
+        with open(job_path, 'r', encoding='utf-8') as job, open(output_path, 'w', encoding='utf-8') as out:
+            for line in job:
+                request = json.loads(line)
+                try:
+                    completion = self.chat_client.chat.completions.create(**request["body"])
+                    body = {
+                        "model": completion.model,
+                        "choices": [{
+                            "index": 0,
+                            "message": {"role": "assistant", "content": completion.choices[0].message.content},
+                            "finish_reason": completion.choices[0].finish_reason,
+                        }],
+                        "usage": {
+                            "prompt_tokens": completion.usage.prompt_tokens,
+                            "completion_tokens": completion.usage.completion_tokens,
+                            "total_tokens": completion.usage.total_tokens,
+                        },
+                    }
+                    result = {"status_code": 200, "body": body}
+                    error = None
+                except Exception as e:
+                    errors += 1
+                    result, error = None, {"message": str(e)}
+                out.write(json.dumps({"custom_id": request["custom_id"], "response": result, "error": error}) + "\n")
+        self.batches[batch_id] = {
+            "status": "completed",
+            "output_file_id": output_path,
+            "error_file_id": None,
+            "request_counts": {"failed": errors},
+        }
+        return batch_id
+
+    def retrieve(self, batch_id):
+        return self.batches[batch_id]
+
+    def download(self, file_id, path):
+        if os.path.abspath(file_id) != os.path.abspath(path):
+            with open(file_id, 'rb') as src, open(path, 'wb') as dst:
+                dst.write(src.read())
+        return path
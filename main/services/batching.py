@@ -0,0 +1,176 @@
+import json
+import random
+import re
+import time
+
+# Rough size of one float in a JSON request body, e.g. "-0.0123456789,"
+FLOAT_JSON_BYTES = 20
+
+def estimate_tokens(text):
+    """Cheap token estimate (~4 characters per token for English text)"""
+    return len(text) // 4 + 1
+
+def estimate_vector_bytes(vector):
+    """Estimate the request bytes one upsert vector contributes"""
+    metadata_bytes = len(json.dumps(vector.get('metadata', {}), ensure_ascii=False).encode('utf-8'))
+    return len(vector['id']) + len(vector['values']) * FLOAT_JSON_BYTES + metadata_bytes
+
+def _status_code(error):
+    """Best-effort HTTP status from Pinecone/OpenAI/requests style exceptions"""
+    for attr in ('status', 'status_code', 'http_status'):
+        status = getattr(error, attr, None)
+        if isinstance(status, int):
+            return status
+    response = getattr(error, 'response', None)
+    return getattr(response, 'status_code', None)
+
+def _retry_after(error):
+    """Seconds requested by a Retry-After header, if the exception carries one"""
+    headers = getattr(error, 'headers', None) or getattr(getattr(error, 'response', None), 'headers', None) or {}
+    try:
+        return float(headers.get('Retry-After') or headers.get('retry-after'))
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+def is_rate_limited(error):
+    return _status_code(error) == 429 or 'rate limit' in str(error).lower()
+
+_SIZE_ERROR = re.compile(r'too large|exceeds|request size|payload size', re.IGNORECASE)
+# SDK connection failures that are not builtin ConnectionError/TimeoutError (urllib3, httpx, openai)
+_CONNECTION_ERROR_NAMES = re.compile(r'Connection|Timeout|ProtocolError|MaxRetryError')
+
+def is_size_error(error):
+    """The request was rejected for its size (or a record in it): smaller batches may succeed"""
+    return _status_code(error) in (400, 413) or bool(_SIZE_ERROR.search(str(error)))
+
+def is_transient(error):
+    """Server errors and connection failures/timeouts: the same request may succeed later"""
+    status = _status_code(error)
+    if status is not None:
+        return status >= 500
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    return any(_CONNECTION_ERROR_NAMES.search(cls.__name__) for cls in type(error).__mro__)
+
+class AdaptiveBatcher:
+    """Packs items into requests by count, payload bytes and tokens.
+
+    Failed requests are retried: rate limits, server errors and connection
+    failures wait (Retry-After or jittered exponential backoff) and resend
+    the same batch. Only size errors (400/413, payload too large) split the
+    batch in half and shrink the item cap, which also isolates a bad record.
+    The cap grows back after a run of successful requests, so builds settle
+    just under the API limits. Anything else fails the batch's items.
+    """
+
+    def __init__(self, name, max_items, max_bytes=None, max_tokens=None,
+                 size_fn=None, token_fn=None, max_retries=6, base_delay=1.0, max_delay=60.0):
+        self.name = name
+        self.hard_max_items = max_items
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.max_tokens = max_tokens
+        self.size_fn = size_fn or (lambda item: 0)
+        self.token_fn = token_fn or (lambda item: 0)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._successes = 0
+        self.stats = {
+            'items': 0, 'bytes': 0, 'tokens': 0, 'requests': 0,
+            'retries': 0, 'splits': 0, 'rate_limited': 0, 'failed': 0,
+            'elapsed': 0.0
+        }
+        self.failed_items = []
+
+    def pack(self, items):
+        """Yield lists of (position, item) that stay within every configured limit"""
+        batch, batch_bytes, batch_tokens = [], 0, 0
+        for position, item in enumerate(items):
+            size, tokens = self.size_fn(item), self.token_fn(item)
+            if batch and (
+                len(batch) >= self.max_items
+                or (self.max_bytes and batch_bytes + size > self.max_bytes)
+                or (self.max_tokens and batch_tokens + tokens > self.max_tokens)
+            ):
+                yield batch
+                batch, batch_bytes, batch_tokens = [], 0, 0
+            batch.append((position, item))
+            batch_bytes += size
+            batch_tokens += tokens
+        if batch:
+            yield batch
+
+    def run(self, items, call):
+        """Send every item through call(batch) and return results aligned with items.
+
+        call returns a list aligned with its batch (or None when there is no
+        result, as for upserts). Items that still fail on their own are left
+        as None and collected in failed_items.
+        """
+        items = list(items)
+        results = [None] * len(items)
+        start = time.time()
+        for batch in self.pack(items):
+            self._send(batch, call, results)
+        self.stats['elapsed'] += time.time() - start
+        return results
+
+    def _send(self, batch, call, results, attempt=0):
+        payload = [item for _, item in batch]
+        try:
+            self.stats['requests'] += 1
+            response = call(payload)
+        except Exception as e:
+            if is_rate_limited(e) and attempt < self.max_retries:
+                self.stats['rate_limited'] += 1
+                self.stats['retries'] += 1
+                self._backoff(attempt, _retry_after(e))
+                return self._send(batch, call, results, attempt + 1)
+            if is_transient(e) and attempt < self.max_retries:
+                # Same size again: a 503 or a dropped connection says nothing about the batch
+                self.stats['retries'] += 1
+                self._backoff(attempt, _retry_after(e))
+                return self._send(batch, call, results, attempt + 1)
+            if len(batch) > 1 and is_size_error(e):
+                # Too large or a bad record inside: halve and retry both sides
+                self.stats['splits'] += 1
+                self.stats['retries'] += 1
+                self.max_items = max(1, len(batch) // 2)
+                self._successes = 0
+                middle = len(batch) // 2
+                self._send(batch[:middle], call, results)
+                self._send(batch[middle:], call, results)
+                return
+            print(f"[{self.name}] giving up on {len(batch)} item(s) after {attempt + 1} attempts: {e}")
+            self.stats['failed'] += len(batch)
+            self.failed_items.extend(payload)
+            return
+
+        for offset, (position, item) in enumerate(batch):
+            results[position] = response[offset] if response is not None else True
+            self.stats['bytes'] += self.size_fn(item)
+            self.stats['tokens'] += self.token_fn(item)
+        self.stats['items'] += len(batch)
+
+        # Additive increase once the smaller cap has proven itself
+        self._successes += 1
+        if self.max_items < self.hard_max_items and self._successes >= 10:
+            self.max_items = min(self.hard_max_items, self.max_items + max(1, self.max_items // 4))
+            self._successes = 0
+
+    def _backoff(self, attempt, retry_after):
+        delay = retry_after if retry_after is not None else min(self.max_delay, self.base_delay * 2 ** attempt)
+        time.sleep(delay + random.uniform(0, delay / 2))
+
+    def report(self):
+        """Print achieved throughput for the calls made so far"""
+        s = self.stats
+        elapsed = max(s['elapsed'], 1e-9)
+        print(
+            f"[{self.name}] {s['items']} items in {s['requests']} requests over {s['elapsed']:.1f}s: "
+            f"{s['items'] / elapsed:.1f} items/s, {s['bytes'] / elapsed / 1024:.1f} KiB/s, "
+            f"{s['tokens'] / elapsed:.0f} tokens/s; retries={s['retries']} splits={s['splits']} "
+            f"rate_limited={s['rate_limited']} failed={s['failed']} final_cap={self.max_items}"
+        )
+        return dict(s)
@@ -0,0 +1,239 @@
+import asyncio
+import os
+import random
+import re
+import time
+import numpy as np
+from main.services.batching import is_rate_limited, _retry_after, _status_code
+from main.services.tokens import count_tokens
+
+try:
+    from openai import APIConnectionError, APITimeoutError
+    _TRANSIENT_ERRORS = (APIConnectionError, APITimeoutError, asyncio.TimeoutError)
+except ImportError:
+    _TRANSIENT_ERRORS = (asyncio.TimeoutError,)
+
+# Defaults match a low OpenAI usage tier; the limiters recalibrate from the
+# x-ratelimit-limit-* headers once the first response arrives.
+DEFAULT_REQUESTS_PER_MINUTE = int(os.getenv('OPENAI_REQUESTS_PER_MINUTE', '500'))
+DEFAULT_TOKENS_PER_MINUTE = int(os.getenv('OPENAI_TOKENS_PER_MINUTE', '200000'))
+DEFAULT_MAX_CONCURRENCY = int(os.getenv('OPENAI_MAX_CONCURRENCY', '64'))
+
+# USD per million (input, output) tokens, matched by model name prefix (longest first)
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-3.5-turbo": (0.50, 1.50),
+}
+BATCH_DISCOUNT = 0.5
+
+def estimate_cost(model, prompt_tokens, completion_tokens, batch=False):
+    """Estimated USD cost of the given usage, or None for a model without a price"""
+    prefix = next((p for p in sorted(MODEL_PRICES, key=len, reverse=True) if model.startswith(p)), None)
+    if prefix is None:
+        return None
+    input_price, output_price = MODEL_PRICES[prefix]
+    cost = (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+    return cost * BATCH_DISCOUNT if batch else cost
+
+_DURATION_PART = re.compile(r'(\d+(?:\.\d+)?)(ms|h|m|s)')
+_DURATION_SECONDS = {'h': 3600, 'm': 60, 's': 1, 'ms': 0.001}
+
+def is_retryable(error):
+    """Rate limits, server errors and connection/timeout failures; anything else (bad requests, bugs) is final"""
+    status = _status_code(error)
+    if status is not None:
+        return status == 429 or status >= 500
+    return isinstance(error, _TRANSIENT_ERRORS)
+
+def parse_reset(value):
+    """Seconds in an x-ratelimit-reset-* header ('1s', '6m0s', '20ms')"""
+    if not value:
+        return None
+    parts = _DURATION_PART.findall(str(value))
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_SECONDS[unit] for amount, unit in parts)
+
+def _header_int(headers, name):
+    try:
+        return int(float(headers.get(name)))
+    except (TypeError, ValueError):
+        return None
+
+class RateLimiter:
+    """Async token bucket holding up to one minute of budget, refilled continuously"""
+
+    def __init__(self, per_minute):
+        self.per_minute = per_minute
+        self.available = float(per_minute)
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.available = min(self.per_minute, self.available + (now - self.updated) * self.per_minute / 60)
+        self.updated = now
+
+    async def acquire(self, amount=1):
+        amount = min(amount, self.per_minute)
+        # Holding the lock while waiting keeps callers first-come, first-served
+        async with self.lock:
+            self._refill()
+            while self.available < amount:
+                await asyncio.sleep((amount - self.available) * 60 / self.per_minute)
+                self._refill()
+            self.available -= amount
+
+    def calibrate(self, limit, remaining):
+        """Adopt the server's view: its limit, and its remaining budget when that is lower"""
+        self._refill()
+        if limit and limit != self.per_minute:
+            self.per_minute = limit
+            self.available = min(self.available, limit)
+        if remaining is not None and remaining < self.available:
+            self.available = float(remaining)
+
+class CompletionEngine:
+    """Single chokepoint for chat completions.
+
+    Every call passes one global concurrency limit plus requests-per-minute
+    and tokens-per-minute limiters (prompt estimate + max_tokens, the way
+    OpenAI counts). Rate-limit headers recalibrate the limiters, and a 429
+    pauses every caller until the reset the server asked for. Only 429s, 5xx
+    and connection/timeout errors are retried; anything else raises at once.
+    With a cache, stored responses are returned without touching the
+    limiters or the API.
+    """
+
+    def __init__(self, client=None, model="gpt-4o-mini-2024-07-18", max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                 requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE, tokens_per_minute=DEFAULT_TOKENS_PER_MINUTE,
+                 max_retries=6, base_delay=1.0, max_delay=60.0, cache=None):
+        self._client = client
+        self.cache = cache
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.request_limiter = RateLimiter(requests_per_minute)
+        self.token_limiter = RateLimiter(tokens_per_minute)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.paused_until = 0.0
+        self.started = None
+        self.stats = {
+            'requests': 0, 'prompt_tokens': 0, 'completion_tokens': 0,
+            'retries': 0, 'rate_limited': 0, 'failed': 0, 'cache_hits': 0
+        }
+        # Seconds per successful API call, in completion order
+        self.latencies = []
+
+    @property
+    def client(self):
+        if self._client is None:
+            import openai
+            self._client = openai.AsyncOpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+        return self._client
+
+    async def complete(self, prompt, max_tokens, **params):
+        """Return the stripped text of a single-message chat completion"""
+        messages = [{"role": "user", "content": prompt}]
+        budget = count_tokens(prompt, self.model) + max_tokens
+        if self.started is None:
+            self.started = time.monotonic()
+        cache_params = dict(params, max_tokens=max_tokens)
+        if self.cache is not None:
+            cached = self.cache.get(self.model, prompt, cache_params)
+            if cached is not None:
+                self.stats['cache_hits'] += 1
+                return cached[0]
+        async with self.semaphore:
+            for attempt in range(self.max_retries + 1):
+                await self._wait_for_pause()
+                await self.request_limiter.acquire(1)
+                await self.token_limiter.acquire(budget)
+                try:
+                    self.stats['requests'] += 1
+                    sent = time.monotonic()
+                    response = await self._create(messages, max_tokens, **params)
+                    self.latencies.append(time.monotonic() - sent)
+                except Exception as e:
+                    if attempt >= self.max_retries or not is_retryable(e):
+                        self.stats['failed'] += 1
+                        raise
+                    self.stats['retries'] += 1
+                    delay = _retry_after(e) or self._reset_delay(e) or min(self.max_delay, self.base_delay * 2 ** attempt)
+                    if is_rate_limited(e):
+                        self.stats['rate_limited'] += 1
+                        # Everyone waits: more requests now would only collect more 429s
+                        self.paused_until = max(self.paused_until, time.monotonic() + delay)
+                    else:
+                        await asyncio.sleep(delay + random.uniform(0, delay / 2))
+                    continue
+                usage = getattr(response, 'usage', None)
+                if usage is not None:
+                    self.stats['prompt_tokens'] += usage.prompt_tokens
+                    self.stats['completion_tokens'] += usage.completion_tokens
+                text = response.choices[0].message.content.strip()
+                if self.cache is not None:
+                    self.cache.put(
+                        self.model, prompt, cache_params, text,
+                        getattr(usage, 'prompt_tokens', None), getattr(usage, 'completion_tokens', None)
+                    )
+                return text
+
+    async def _create(self, messages, max_tokens, **params):
+        completions = self.client.chat.completions
+        raw_api = getattr(completions, 'with_raw_response', None)
+        if raw_api is None:
+            return await completions.create(model=self.model, messages=messages, max_tokens=max_tokens, **params)
+        raw = await raw_api.create(model=self.model, messages=messages, max_tokens=max_tokens, **params)
+        self._observe_headers(raw.headers)
+        return raw.parse()
+
+    def _observe_headers(self, headers):
+        self.request_limiter.calibrate(
+            _header_int(headers, 'x-ratelimit-limit-requests'), _header_int(headers, 'x-ratelimit-remaining-requests')
+        )
+        self.token_limiter.calibrate(
+            _header_int(headers, 'x-ratelimit-limit-tokens'), _header_int(headers, 'x-ratelimit-remaining-tokens')
+        )
+
+    def _reset_delay(self, error):
+        headers = getattr(error, 'headers', None) or getattr(getattr(error, 'response', None), 'headers', None) or {}
+        resets = [parse_reset(headers.get(name)) for name in ('x-ratelimit-reset-requests', 'x-ratelimit-reset-tokens')]
+        resets = [reset for reset in resets if reset]
+        return max(resets) if resets else None
+
+    async def _wait_for_pause(self):
+        while (delay := self.paused_until - time.monotonic()) > 0:
+            await asyncio.sleep(delay + random.uniform(0, 0.1))
+
+    def mark(self):
+        """Point to measure a later report from, when one engine serves several runs"""
+        return dict(self.stats), len(self.latencies), time.monotonic()
+
+    def report(self, since=None, label=None):
+        """Print throughput, latency percentiles and estimated cost for the calls made so far (or since a mark)"""
+        if since is None:
+            since = ({name: 0 for name in self.stats}, 0, self.started or time.monotonic())
+        start_stats, start_latency, started = since
+        s = {name: value - start_stats.get(name, 0) for name, value in self.stats.items()}
+        elapsed = max(time.monotonic() - started, 1e-9)
+        latencies = np.asarray(self.latencies[start_latency:])
+        p50, p90, p99 = np.percentile(latencies, [50, 90, 99]) if len(latencies) else (0.0, 0.0, 0.0)
+        cost = estimate_cost(self.model, s['prompt_tokens'], s['completion_tokens'])
+        print(
+            f"[completions{f' {label}' if label else ''}] {s['requests']} requests in {elapsed:.1f}s: "
+            f"{s['requests'] / elapsed * 60:.0f} RPM, "
+            f"{(s['prompt_tokens'] + s['completion_tokens']) / elapsed * 60:.0f} TPM; "
+            f"tokens in={s['prompt_tokens']} out={s['completion_tokens']}; "
+            f"latency p50={p50:.2f}s p90={p90:.2f}s p99={p99:.2f}s; retries={s['retries']} "
+            f"rate_limited={s['rate_limited']} failed={s['failed']} cache_hits={s['cache_hits']} "
+            f"limits={self.request_limiter.per_minute} RPM/{self.token_limiter.per_minute} TPM"
+            + (f"; est. cost ${cost:.4f}" if cost is not None else "")
+        )
+        return dict(
+            s, elapsed=elapsed, latency_p50=float(p50), latency_p90=float(p90), latency_p99=float(p99),
+            estimated_cost=cost, model=self.model, label=label
+        )
@@ -0,0 +1,77 @@
+import re
+import zlib
+import numpy as np
+
+# Mersenne prime for the (a * x + b) % P hash family; products stay below 2**64
+_PRIME = np.uint64((1 << 31) - 1)
+_TOKEN = re.compile(r'[a-z0-9]+')
+# Signature of a text too short to shingle; such rows are never clustered
+EMPTY_SIGNATURE = np.iinfo(np.uint64).max
+
+def _shingle_hashes(text, shingle_size):
+    tokens = _TOKEN.findall(str(text).lower())
+    shingles = {" ".join(tokens[i:i + shingle_size]) for i in range(len(tokens) - shingle_size + 1)}
+    return np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingles), dtype=np.uint64, count=len(shingles)) % _PRIME
+
+def minhash_signatures(texts, num_perm=64, shingle_size=3, seed=1):
+    """MinHash signature matrix (len(texts) x num_perm) over word shingles.
+
+    A text with fewer than shingle_size words has no shingles; its row is
+    EMPTY_SIGNATURE throughout.
+    """
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, int(_PRIME), size=num_perm, dtype=np.uint64)[:, None]
+    b = rng.integers(0, int(_PRIME), size=num_perm, dtype=np.uint64)[:, None]
+    signatures = np.empty((len(texts), num_perm), dtype=np.uint64)
+    for row, text in enumerate(texts):
+        hashes = _shingle_hashes(text, shingle_size)[None, :]
+        if hashes.size:
+            signatures[row] = ((a * hashes + b) % _PRIME).min(axis=1)
+        else:
+            signatures[row] = EMPTY_SIGNATURE
+    return signatures
+
+def find_duplicate_clusters(signatures, bands=16, threshold=0.8, groups=None):
+    """Group rows whose estimated Jaccard similarity is at least threshold.
+
+    Candidate pairs come from LSH banding (rows sharing any band), so only
+    likely duplicates are compared. With groups (one label per row, e.g. the
+    source), a cluster holds at most one row of each group, so rows are only
+    merged across groups. Rows with EMPTY_SIGNATURE are never clustered.
+    Returns clusters of two or more rows.
+    """
+    n, num_perm = signatures.shape
+    rows_per_band = num_perm // bands
+    parent = list(range(n))
+    empty = (signatures == EMPTY_SIGNATURE).all(axis=1)
+    # Groups present in each cluster, by root
+    members_groups = {row: {groups[row]} for row in range(n)} if groups is not None else None
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for band in range(bands):
+        buckets = {}
+        chunk = signatures[:, band * rows_per_band:(band + 1) * rows_per_band]
+        for row in np.flatnonzero(~empty):
+            buckets.setdefault(chunk[row].tobytes(), []).append(row)
+        for members in buckets.values():
+            for i, first in enumerate(members):
+                for other in members[i + 1:]:
+                    root_a, root_b = find(first), find(other)
+                    if root_a == root_b:
+                        continue
+                    if members_groups is not None and members_groups[root_a] & members_groups[root_b]:
+                        continue
+                    if np.mean(signatures[first] == signatures[other]) >= threshold:
+                        parent[root_b] = root_a
+                        if members_groups is not None:
+                            members_groups[root_a] |= members_groups.pop(root_b)
+
+    clusters = {}
+    for row in range(n):
+        clusters.setdefault(find(row), []).append(row)
+    return [members for members in clusters.values() if len(members) > 1]
@@ -0,0 +1,126 @@
+import hashlib
+import re
+import pandas as pd
+
+# Characters that are safe in Pinecone ids and in /result/<index>/<id> urls
+_UNSAFE_ID_CHARS = re.compile(r'[^A-Za-z0-9_.\-]+')
+
+def content_hash(*parts, length=16):
+    """Short, stable hex digest of the given text parts"""
+    joined = "\x1f".join(str(part).strip() for part in parts)
+    return hashlib.sha1(joined.encode('utf-8')).hexdigest()[:length]
+
+def make_doc_id(source, key, *fallback_parts):
+    """Deterministic id: '<source>-<key>', or '<source>-h<hash>' when key is empty"""
+    key = str(key).strip() if key is not None else ""
+    if not key:
+        key = "h" + content_hash(*fallback_parts)
+    return _UNSAFE_ID_CHARS.sub('_', f"{source}-{key}")
+
+def grant_source(link):
+    """Name the dataset a grant row came from, based on its link"""
+    return "dodsbirsttr" if "dodsbirsttr.mil" in str(link) else "grantsgov"
+
+def grant_ids(frame):
+    """Ids for formatted grants: source plus opportunity/topic number"""
+    return pd.Series([
+        make_doc_id(grant_source(link), number, title, link)
+        for link, number, title in zip(frame["link"], frame["opportunity_number"], frame["title"])
+    ], index=frame.index, dtype=object)
+
+def tech_ids(frame):
+    """Ids for formatted tech rows: university plus docket number (link hash when missing)"""
+    return pd.Series([
+        make_doc_id(university, number, link, title)
+        for university, number, link, title in zip(frame["university"], frame["number"], frame["link"], frame["title"])
+    ], index=frame.index, dtype=object)
+
+# Raw record columns (scraper output) -> the formatted names the id functions expect
+_RECORD_ID_COLUMNS = {
+    "tech": {"university": "university", "number": "number", "link": "link", "title": "title"},
+    "grants": {"LINK": "link", "OPPORTUNITY NUMBER": "opportunity_number", "OPPORTUNITY TITLE": "title"},
+}
+
+def record_ids(records, record_type):
+    """Stable ids for raw scraped records, identical to the ids their index entries get"""
+    columns = {col.strip(): col for col in records.columns}
+    frame = pd.DataFrame({
+        formatted: records[columns[raw]].fillna("").astype(str) if raw in columns else ""
+        for raw, formatted in _RECORD_ID_COLUMNS[record_type].items()
+    }, index=records.index)
+    return grant_ids(frame) if record_type == "grants" else tech_ids(frame)
+
+def stable_grant_ids(index, legacy_ids, namespace="ns1"):
+    """Map positional grant ids ("vecN") to stable ids using the metadata stored with them in index"""
+    vectors = index.fetch(ids=list(legacy_ids), namespace=namespace)['vectors']
+    found = [legacy_id for legacy_id in legacy_ids if legacy_id in vectors]
+    frame = pd.DataFrame([
+        {field: vectors[legacy_id].metadata.get(field, "") for field in ("link", "opportunity_number", "title")}
+        for legacy_id in found
+    ], columns=["link", "opportunity_number", "title"])
+    return dict(zip(found, grant_ids(frame)))
+
+def resolve_grants_blacklist(pc, namespace="ns1"):
+    """Stable ids of blacklisted grants: GRANTS_BLACKLIST plus the legacy entries found in their old indexes"""
+    from main.constants.results_blacklist import GRANTS_BLACKLIST, LEGACY_GRANTS_BLACKLIST
+    blacklist = set(GRANTS_BLACKLIST)
+    for index_name, legacy_ids in LEGACY_GRANTS_BLACKLIST.items():
+        try:
+            mapping = stable_grant_ids(pc.Index(index_name), legacy_ids, namespace)
+        except Exception as e:
+            mapping = {}
+            print(f"Error resolving blacklisted ids through {index_name}: {e}")
+        missing = [legacy_id for legacy_id in legacy_ids if legacy_id not in mapping]
+        if missing:
+            print(f"Warning: blacklisted grants {missing} not found in {index_name}; they will not be hidden")
+        blacklist.update(mapping.values())
+    return blacklist
+
+def migrate_blacklist(pc, path="main/constants/results_blacklist.py", namespace="ns1"):
+    """Move the legacy entries that resolve into GRANTS_BLACKLIST as stable ids and rewrite the constants file"""
+    from main.constants.results_blacklist import GRANTS_BLACKLIST, LEGACY_GRANTS_BLACKLIST, TECH_BLACKLIST
+    grants = list(GRANTS_BLACKLIST)
+    legacy = {}
+    for index_name, legacy_ids in LEGACY_GRANTS_BLACKLIST.items():
+        mapping = stable_grant_ids(pc.Index(index_name), legacy_ids, namespace)
+        for legacy_id, stable_id in mapping.items():
+            print(f"{index_name} {legacy_id} -> {stable_id}")
+            if stable_id not in grants:
+                grants.append(stable_id)
+        unresolved = [legacy_id for legacy_id in legacy_ids if legacy_id not in mapping]
+        if unresolved:
+            print(f"Not found in {index_name}, left as is: {unresolved}")
+            legacy[index_name] = unresolved
+
+    with open(path, encoding='utf-8') as f:
+        source = f.read()
+    source = re.sub(r'GRANTS_BLACKLIST = \[.*?\]\n', lambda _: f"GRANTS_BLACKLIST = {_format_list(grants)}\n", source, count=1, flags=re.S)
+    legacy_text = "{\n" + "".join(
+        f'    "{index_name}": {_format_list(ids, indent=4)},\n' for index_name, ids in legacy.items()
+    ) + "}" if legacy else "{}"
+    source = re.sub(r'LEGACY_GRANTS_BLACKLIST = \{.*?\n\}\n|LEGACY_GRANTS_BLACKLIST = \{\}\n',
+                    lambda _: f"LEGACY_GRANTS_BLACKLIST = {legacy_text}\n", source, count=1, flags=re.S)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(source)
+    return grants
+
+def _format_list(values, indent=0):
+    if not values:
+        return "[]"
+    pad = " " * indent
+    return "[\n" + "".join(f'{pad}    "{value}",\n' for value in values) + pad + "]"
+
+if __name__ == "__main__":
+    """
+    Resolve LEGACY_GRANTS_BLACKLIST through the indexes its ids came from and move them into GRANTS_BLACKLIST:
+    python -m main.services.document_ids migrate-blacklist
+    """
+    import os
+    import sys
+    import dotenv
+    from pinecone import Pinecone
+    dotenv.load_dotenv()
+
+    if sys.argv[1:] != ["migrate-blacklist"]:
+        sys.exit("usage: python -m main.services.document_ids migrate-blacklist")
+    migrate_blacklist(Pinecone(api_key=os.getenv('PINECONE_API_KEY')))
@@ -0,0 +1,233 @@
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from main.constants.pinecone_indexes import (
+    EMBED_MODEL,
+    LOCAL_EMBED_MODEL_PATH,
+    LOCAL_EMBED_QUANTIZED,
+    LOCAL_EMBED_WORKERS
+)
+
+# Embedding backends expose the pc.inference surface used by the services:
+#   embed(model, inputs, parameters) -> [{"values": [...]}, ...]
+# so Pinecone inference and a local model are interchangeable.
+
+# e5 models expect these prefixes; Pinecone inference adds them server-side
+E5_PREFIXES = {"query": "query: ", "passage": "passage: "}
+
+class OnnxEmbedder:
+    """e5-compatible sentence embedder running on CPU with ONNX Runtime.
+
+    model_path is a directory with tokenizer.json and model.onnx (or
+    model_quantized.onnx for int8). Inputs are sorted by length and packed
+    into micro-batches by padded tokens, so short queries are not padded to
+    the longest passage. With workers > 1, large calls are spread over a
+    process pool in which every process loads the model once.
+    """
+
+    def __init__(self, model_path, quantized=False, max_length=512, batch_tokens=16384, workers=1):
+        self.model_path = model_path
+        self.quantized = quantized
+        self.max_length = max_length
+        self.batch_tokens = batch_tokens
+        self.workers = workers
+        self._session = None
+        self._tokenizer = None
+        self._pool = None
+
+    def _load(self):
+        if self._session is not None:
+            return
+        try:
+            import onnxruntime
+            from tokenizers import Tokenizer
+        except ImportError as e:
+            raise ImportError("The local embedding backend needs 'onnxruntime' and 'tokenizers' (pip install onnxruntime tokenizers)") from e
+        model_file = 'model_quantized.onnx' if self.quantized else 'model.onnx'
+        options = onnxruntime.SessionOptions()
+        # Parallelism comes from the process pool when there is one
+        options.intra_op_num_threads = 1 if self.workers > 1 else 0
+        self._session = onnxruntime.InferenceSession(
+            os.path.join(self.model_path, model_file), options, providers=['CPUExecutionProvider']
+        )
+        self._input_names = {i.name for i in self._session.get_inputs()}
+        self._tokenizer = Tokenizer.from_file(os.path.join(self.model_path, 'tokenizer.json'))
+        self._tokenizer.enable_truncation(self.max_length)
+
+    def embed(self, model=EMBED_MODEL, inputs=(), parameters=None):
+        input_type = (parameters or {}).get("input_type", "passage")
+        texts = [E5_PREFIXES.get(input_type, "") + text for text in inputs]
+        if self.workers > 1 and len(texts) >= 2 * self.workers:
+            vectors = self._embed_in_pool(texts)
+        else:
+            vectors = self.encode(texts)
+        return [{"values": vector.tolist()} for vector in vectors]
+
+    def encode(self, texts):
+        """Unit-length embeddings for already-prefixed texts, in input order"""
+        self._load()
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        encodings = self._tokenizer.encode_batch(list(texts))
+        order = np.argsort([len(e.ids) for e in encodings], kind='stable')
+        vectors = [None] * len(texts)
+        batch = []
+        for position in order:
+            # Sorted by length, so the current item is the longest in its batch
+            if batch and (len(batch) + 1) * len(encodings[position].ids) > self.batch_tokens:
+                self._run_batch(batch, encodings, vectors)
+                batch = []
+            batch.append(position)
+        if batch:
+            self._run_batch(batch, encodings, vectors)
+        return np.stack(vectors)
+
+    def _run_batch(self, batch, encodings, vectors):
+        length = max(len(encodings[p].ids) for p in batch)
+        input_ids = np.zeros((len(batch), length), dtype=np.int64)
+        attention_mask = np.zeros((len(batch), length), dtype=np.int64)
+        for row, position in enumerate(batch):
+            ids = encodings[position].ids
+            input_ids[row, :len(ids)] = ids
+            attention_mask[row, :len(ids)] = 1
+        feed = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self._input_names:
+            feed["token_type_ids"] = np.zeros_like(input_ids)
+        hidden = self._session.run(None, {k: v for k, v in feed.items() if k in self._input_names})[0]
+        # Mean pooling over real tokens, then L2 normalization (e5 recipe)
+        mask = attention_mask[:, :, None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        pooled /= np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+        for row, position in enumerate(batch):
+            vectors[position] = pooled[row].astype(np.float32)
+
+    def _embed_in_pool(self, texts):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(self.model_path, self.quantized, self.max_length, self.batch_tokens)
+            )
+        shards = np.array_split(np.arange(len(texts)), self.workers)
+        results = self._pool.map(_encode_in_worker, [[texts[i] for i in shard] for shard in shards if len(shard)])
+        return np.concatenate(list(results))
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+_worker_embedder = None
+
+def _init_worker(model_path, quantized, max_length, batch_tokens):
+    global _worker_embedder
+    _worker_embedder = OnnxEmbedder(model_path, quantized, max_length, batch_tokens)
+    _worker_embedder._load()
+
+def _encode_in_worker(texts):
+    return _worker_embedder.encode(texts)
+
+def get_embedder(pc, model_path=LOCAL_EMBED_MODEL_PATH):
+    """The local backend when LOCAL_EMBED_MODEL_PATH is set, otherwise Pinecone inference"""
+    if model_path:
+        return OnnxEmbedder(model_path, quantized=LOCAL_EMBED_QUANTIZED, workers=LOCAL_EMBED_WORKERS)
+    return pc.inference
+
+def _embed_matrix(embedder, texts, input_type, batch_size=96):
+    vectors = []
+    for i in range(0, len(texts), batch_size):
+        response = embedder.embed(model=EMBED_MODEL, inputs=texts[i:i + batch_size], parameters={"input_type": input_type, "truncate": "END"})
+        vectors.extend(e['values'] for e in response)
+    return np.asarray(vectors, dtype=np.float32)
+
+def build_parity_reference(embedder, passages, queries, path):
+    """Cache remote embeddings of sample passages and queries for later parity checks"""
+    np.savez_compressed(
+        path,
+        passage_texts=np.asarray(passages, dtype=object),
+        passage_vectors=_embed_matrix(embedder, passages, "passage"),
+        query_texts=np.asarray(queries, dtype=object),
+        query_vectors=_embed_matrix(embedder, queries, "query"),
+    )
+    print(f"Parity reference with {len(passages)} passages and {len(queries)} queries written to {path}")
+
+def parity_check(embedder, path, min_cosine=0.99, top_k=10):
+    """Compare a backend against cached reference embeddings.
+
+    Checks the per-text cosine between backends and the overlap of the
+    top_k passages each query retrieves from the reference set.
+    """
+    with np.load(path, allow_pickle=True) as reference:
+        passages, remote_passages = list(reference['passage_texts']), reference['passage_vectors']
+        queries, remote_queries = list(reference['query_texts']), reference['query_vectors']
+    local_passages = _embed_matrix(embedder, passages, "passage")
+    local_queries = _embed_matrix(embedder, queries, "query")
+
+    cosines = np.concatenate([
+        np.sum(local_passages * remote_passages, axis=1),
+        np.sum(local_queries * remote_queries, axis=1),
+    ]) / np.concatenate([
+        np.linalg.norm(local_passages, axis=1) * np.linalg.norm(remote_passages, axis=1),
+        np.linalg.norm(local_queries, axis=1) * np.linalg.norm(remote_queries, axis=1),
+    ])
+    k = min(top_k, len(passages))
+    remote_top = np.argsort(-(remote_queries @ remote_passages.T), axis=1)[:, :k]
+    local_top = np.argsort(-(local_queries @ local_passages.T), axis=1)[:, :k]
+    overlap = np.mean([len(set(r) & set(l)) / k for r, l in zip(remote_top, local_top)]) if len(queries) else 1.0
+
+    print(f"Embedding parity: mean cosine {cosines.mean():.4f}, min {cosines.min():.4f}, top-{k} overlap {overlap:.3f}")
+    return bool(cosines.min() >= min_cosine)
+
+def quantize_model(model_path):
+    """Write model_quantized.onnx (dynamic int8 weights) next to model.onnx"""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    quantize_dynamic(
+        os.path.join(model_path, 'model.onnx'),
+        os.path.join(model_path, 'model_quantized.onnx'),
+        weight_type=QuantType.QInt8
+    )
+    print(f"Quantized model written to {os.path.join(model_path, 'model_quantized.onnx')}")
+
+if __name__ == "__main__":
+    """
+    python -m main.services.embedding_backends reference data/tech/stanford_technologies.parquet --out parity_reference.npz
+    python -m main.services.embedding_backends parity models/multilingual-e5-large --reference parity_reference.npz
+    python -m main.services.embedding_backends quantize models/multilingual-e5-large
+    """
+    import dotenv
+    from pinecone import Pinecone
+    from main.constants.pinecone_indexes import SMOKE_QUERIES
+    from main.services.record_store import read_records
+    dotenv.load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Local embedding backend tools")
+    commands = parser.add_subparsers(dest='command', required=True)
+    reference_parser = commands.add_parser('reference', help="cache Pinecone inference embeddings of sample texts")
+    reference_parser.add_argument('records')
+    reference_parser.add_argument('--column', default='description')
+    reference_parser.add_argument('--sample', type=int, default=200)
+    reference_parser.add_argument('--out', default='parity_reference.npz')
+    parity_parser = commands.add_parser('parity', help="compare a local model against the cached reference")
+    parity_parser.add_argument('model_path')
+    parity_parser.add_argument('--reference', default='parity_reference.npz')
+    parity_parser.add_argument('--quantized', action='store_true')
+    parity_parser.add_argument('--min-cosine', type=float, default=0.99)
+    quantize_parser = commands.add_parser('quantize', help="write an int8 copy of model.onnx")
+    quantize_parser.add_argument('model_path')
+    args = parser.parse_args()
+
+    if args.command == 'reference':
+        records = read_records(args.records)
+        column = next(col for col in records.columns if col.lower() == args.column.lower())
+        texts = [text for text in records[column].dropna().tolist() if text.strip()]
+        rng = np.random.default_rng(0)
+        passages = [texts[i] for i in sorted(rng.choice(len(texts), size=min(args.sample, len(texts)), replace=False))]
+        queries = [query for group in SMOKE_QUERIES.values() for query in group]
+        build_parity_reference(Pinecone(api_key=os.getenv('PINECONE_API_KEY')).inference, passages, queries, args.out)
+    elif args.command == 'parity':
+        embedder = OnnxEmbedder(args.model_path, quantized=args.quantized)
+        ok = parity_check(embedder, args.reference, args.min_cosine)
+        print("Parity OK" if ok else f"Parity FAILED (min cosine below {args.min_cosine})")
+    else:
+        quantize_model(args.model_path)
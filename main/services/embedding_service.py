@@ -1,4 +1,5 @@
 import pandas as pd
+import numpy as np
 from pinecone import Pinecone, ServerlessSpec
 import time
 import os
@@ -9,23 +10,132 @@ from main.constants.metadata_fields import (
     GRANTS_METADATA_FIELDS,
     COMMON_METADATA_FIELDS
 )
+from main.constants.pinecone_indexes import (
+    SMOKE_QUERIES,
+    INDEX_SNAPSHOTS_PATH,
+    EMBED_MAX_ITEMS,
+    EMBED_MAX_INPUT_TOKENS,
+    EMBED_MAX_TOKENS,
+    UPSERT_MAX_ITEMS,
+    UPSERT_MAX_BYTES
+)
+from main.services.index_aliases import swap_alias
+from main.services.index_snapshot import SnapshotWriter, snapshot_path
+from main.services.document_ids import grant_ids, grant_source, tech_ids
+from main.services.dedup import minhash_signatures, find_duplicate_clusters
+from main.services.record_store import is_parquet, record_columns, iter_record_batches
+from main.services.batching import AdaptiveBatcher, estimate_tokens, estimate_vector_bytes
+from main.services.embedding_backends import get_embedder
 import dotenv
 
 dotenv.load_dotenv()
 
+# Text columns are kept as Arrow-backed strings instead of python objects
+STRING_DTYPE = pd.StringDtype("pyarrow")
+
+# Low-cardinality fields repeated on every row are stored as categoricals
+CATEGORICAL_COLS = ["UNIVERSITY", "AGENCY_CODE", "OPPORTUNITY_STATUS", "CATEGORY"]
+
+# Pinecone metadata field -> normalized CSV column
+GRANTS_METADATA_COLUMNS = {
+    "title": "OPPORTUNITY_TITLE",
+    "opportunity_number": "OPPORTUNITY_NUMBER",
+    "agency_code": "AGENCY_CODE",
+    "status": "OPPORTUNITY_STATUS",
+    "posted_date": "POSTED_DATE",
+    "last_updated_date": "LAST_UPDATED_DATE",
+    "application_deadline": "APPLICATION_DEADLINE",
+    "close_date": "CLOSE_DATE",
+    "total_funding": "TOTAL_FUNDING_AMOUNT",
+    "award_ceiling": "AWARD_CEILING",
+    "award_floor": "AWARD_FLOOR",
+    "link": "LINK",
+    "description": "DESCRIPTION",
+    "llm_summary": "LLM_SUMMARY",
+    "llm_teaser": "LLM_TEASER",
+}
+
+TECH_METADATA_COLUMNS = {
+    "title": "TITLE",
+    "university": "UNIVERSITY",
+    "number": "NUMBER",
+    "patent": "PATENT",
+    "link": "LINK",
+    "description": "DESCRIPTION",
+    "llm_summary": "LLM_SUMMARY",
+    "llm_teaser": "LLM_TEASER",
+}
+
+# Record columns each kind of index is built from
+REQUIRED_COLUMNS = {
+    'grants': [
+        "OPPORTUNITY TITLE", "AGENCY CODE", "OPPORTUNITY STATUS",
+        "POSTED DATE", "CLOSE DATE", "LINK", "OPPORTUNITY NUMBER",
+        "CATEGORY", "LAST_UPDATED_DATE", "POSTED_DATE", "APPLICATION_DEADLINE",
+        "TOTAL_FUNDING_AMOUNT", "AWARD_CEILING", "AWARD_FLOOR", "DESCRIPTION",
+        "LLM Summary", "LLM Teaser"  # Fixed column names
+    ],
+    'tech': ["university", "title", "number", "patent", "link", "description", "LLM Summary", "LLM Teaser"],
+}
+
+def _clean_column_name(col):
+    """Normalize a CSV header, e.g. '"LLM Summary"' -> 'LLM_SUMMARY'"""
+    return col.strip('" ').replace(' ', '_').upper()
+
+def _text(df, col):
+    """Return a column as plain strings (categoricals included), empty when absent"""
+    if col not in df.columns:
+        return pd.Series("", index=df.index, dtype=STRING_DTYPE)
+    return df[col].astype(STRING_DTYPE)
+
+def _normalize_rows(matrix):
+    """Scale each row of a matrix to unit length"""
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+def _batch_ids(chunk):
+    """Ids of a normalized batch's records, the same ones format_*_batch assigns"""
+    if "OPPORTUNITY_NUMBER" in chunk.columns:
+        fields, ids = {f: GRANTS_METADATA_COLUMNS[f] for f in ("link", "opportunity_number", "title")}, grant_ids
+    else:
+        fields, ids = {f: TECH_METADATA_COLUMNS[f] for f in ("university", "number", "link", "title")}, tech_ids
+    return ids(pd.DataFrame({field: _text(chunk, col) for field, col in fields.items()}, index=chunk.index))
+
+def _first_occurrences(ids, seen):
+    """Mask of each id's first record across batches (a later one would overwrite it in Pinecone anyway)"""
+    return (~ids.duplicated() & ~ids.isin(seen)).to_numpy()
+
+def _to_vectors(frame, embeddings):
+    """Materialize upsert payloads from a formatted batch and its embeddings"""
+    metadata = frame.drop(columns=["id", "text"]).to_dict('records')
+    return [
+        {"id": id, "values": e['values'], "metadata": m}
+        for id, e, m in zip(frame["id"].tolist(), embeddings, metadata)
+    ]
+
 class EmbeddingsGenerator:
-    def __init__(self, data_path, index_name):
+    def __init__(self, data_path, index_name, chunk_size=1000, snapshot_dir=INDEX_SNAPSHOTS_PATH):
         self.pc = None
+        self.embedder = None
         self.index_name = index_name
         self.data_path = data_path
-        self.formatted_data = None
+        self.chunk_size = chunk_size
+        self.snapshot_dir = snapshot_dir
+        self.sources = []
+        self.columns = []
+        self.formatted_batches = None
+        self.dropped_ids = set()
+        self.batch_stats = {}
         self.categories = CATEGORIES
         self.category_embeddings = None
+        self._category_matrix_cache = None
 
-    def setup(self):
+    def setup(self, pc=None, embedder=None):
+        """Create the Pinecone client and embedding backend (or use the given ones) and embed the categories"""
         print("Setting up Pinecone client...")
         PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
-        self.pc = Pinecone(api_key=PINECONE_API_KEY)
+        self.pc = pc or Pinecone(api_key=PINECONE_API_KEY)
+        # Pinecone inference unless LOCAL_EMBED_MODEL_PATH points at a local model
+        self.embedder = embedder or get_embedder(self.pc)
         
         # Create enhanced category texts that combine name and description
         enhanced_categories = [
@@ -33,11 +143,12 @@ class EmbeddingsGenerator:
             for category in self.categories
         ]
         
-        self.category_embeddings = self.pc.inference.embed(
+        self.category_embeddings = self.embedder.embed(
             model='multilingual-e5-large',
             inputs=enhanced_categories,
             parameters={"input_type": "passage", "truncate": "END"}
         )
+        self._category_matrix_cache = None
         print("Pinecone client and category embeddings setup complete.")
 
     def create_index(self):
@@ -57,249 +168,249 @@ class EmbeddingsGenerator:
             print("Index already exists, skipping creation.")
 
     def load_data(self, required_cols):
+        """Validate every Parquet/CSV file in data_path and register it for streaming.
+
+        Only the header of each file is read here; rows are streamed in
+        chunks by iter_batches() when the formatting stage asks for them.
+        """
         print("Loading data from CSV...")
-        self.df = None
-        
-        # Separate required and optional columns
-        optional_cols = ["LLM Summary", "LLM Teaser"]
-        strict_required_cols = [col for col in required_cols if col not in optional_cols]
-        
-        for file in os.listdir(self.data_path):
-            if file.endswith('.csv'):
+        self.sources = []
+        strict_required_cols = self.set_columns(required_cols)
+
+        for file in sorted(os.listdir(self.data_path)):
+            if file.endswith('.csv') or is_parquet(file):
                 print(f"\nLoading {file}...")
-                # Add quoting parameter to handle quoted columns
-                df = pd.read_csv(
-                    os.path.join(self.data_path, file),
-                    skipinitialspace=True,
-                    quotechar='"',  # Specify quote character
-                    encoding='utf-8'
-                )
-                
-                # Clean column names - remove quotes and standardize format
-                df.columns = df.columns.str.strip('" ').str.replace(' ', '_').str.upper()
-                cleaned_required_cols = [col.strip('" ').replace(' ', '_').upper() for col in strict_required_cols]
-                
-                print("\nAvailable columns in file:", list(df.columns))
-                print("\nCleaned required columns:", cleaned_required_cols)
-                
-                if not all(col in df.columns for col in cleaned_required_cols):
-                    missing_cols = [col for col in cleaned_required_cols if col not in df.columns]
+                path = os.path.join(self.data_path, file)
+                available_cols = {_clean_column_name(col) for col in record_columns(path)}
+
+                print("\nAvailable columns in file:", sorted(available_cols))
+                print("\nCleaned required columns:", strict_required_cols)
+
+                missing_cols = [col for col in strict_required_cols if col not in available_cols]
+                if missing_cols:
                     print(f"Missing columns: {missing_cols}")
                     continue
-                
-                if self.df is None:
-                    self.df = df
-                else:
-                    if set(df.columns) == set(self.df.columns):
-                        self.df = pd.concat([self.df, df], ignore_index=True)
-                    else:
-                        print(f"Warning: {file} columns do not match existing dataframe")
-                        continue
-                
-                print(f"{file} loaded. Total rows now: {len(self.df)}")
-
-        if self.df is None:
+
+                self.sources.append(path)
+                print(f"{file} registered. Total files now: {len(self.sources)}")
+
+        if not self.sources:
             raise ValueError("No valid CSV files were loaded. Please check your data files and required columns.")
 
-        self.df.columns = self.df.columns.str.replace(' ', '_')
-        print("Column names cleaned.")
+    def set_columns(self, required_cols):
+        """Set the normalized columns batches are projected onto; returns the strictly required ones"""
+        # Separate required and optional columns
+        optional_cols = ["LLM Summary", "LLM Teaser"]
+        strict_required_cols = list(dict.fromkeys(
+            _clean_column_name(col) for col in required_cols if col not in optional_cols
+        ))
+        self.columns = strict_required_cols + [_clean_column_name(col) for col in optional_cols]
+        return strict_required_cols
+
+    def iter_batches(self):
+        """Stream normalized record batches from every registered file"""
+        wanted = set(self.columns)
+        for path in self.sources:
+            if is_parquet(path):
+                # Column projection: only the fields we index are read from disk
+                columns = [col for col in record_columns(path) if _clean_column_name(col) in wanted]
+                for batch in iter_record_batches(path, columns=columns, batch_size=self.chunk_size):
+                    yield self._normalize_batch(batch)
+                continue
+
+            reader = pd.read_csv(
+                path,
+                usecols=lambda col: _clean_column_name(col) in wanted,
+                dtype=STRING_DTYPE,
+                chunksize=self.chunk_size,
+                skipinitialspace=True,
+                quotechar='"',  # Specify quote character
+                encoding='utf-8'
+            )
+            with reader:
+                for chunk in reader:
+                    yield self._normalize_batch(chunk)
+
+    def _normalize_batch(self, df):
+        """Clean column names, merge duplicates, fill gaps and apply lean dtypes"""
+        df.columns = [_clean_column_name(col) for col in df.columns]
+
+        # Some exports carry the same field twice (e.g. "POSTED DATE" and "POSTED_DATE")
+        if df.columns.has_duplicates:
+            merged = {}
+            for position, col in enumerate(df.columns):
+                series = df.iloc[:, position]
+                merged[col] = merged[col].fillna(series) if col in merged else series
+            df = pd.DataFrame(merged)
+
+        # Optional columns (LLM output) may be absent from older files
+        for col in self.columns:
+            if col not in df.columns:
+                df[col] = pd.Series("", index=df.index, dtype=STRING_DTYPE)
+
+        df = df[self.columns].fillna("")
+        for col in CATEGORICAL_COLS:
+            if col in df.columns:
+                df[col] = df[col].astype("category")
+        return df
 
     def classify_text(self, text, threshold=0.79):
         """Classify text using vector similarity"""
-        text_embedding = self.pc.inference.embed(
-            model='multilingual-e5-large',
-            inputs=[text],
-            parameters={"input_type": "passage", "truncate": "END"}
-        )[0]
-        
-        similarities = []
-        for cat_embedding in self.category_embeddings:
-            similarity = self._cosine_similarity(
-                text_embedding['values'], 
-                cat_embedding['values']
-            )
-            similarities.append(similarity)
-        
-        categories = [
-            self.categories[i] 
-            for i, sim in enumerate(similarities) 
-            if sim > threshold
-        ]
-        
-        if not categories:
-            max_idx = similarities.index(max(similarities))
-            categories = [self.categories[max_idx]]
-        return categories
+        return self.classify_text_batch([text], threshold=threshold)[0]
 
     def classify_text_batch(self, texts, threshold=0.79):
         """Classify multiple texts using vector similarity in batch"""
-        text_embeddings = self.pc.inference.embed(
+        text_embeddings = self.embedder.embed(
             model='multilingual-e5-large',
             inputs=texts,
             parameters={"input_type": "passage", "truncate": "END"}
         )
         
+        # Cosine similarity of every text against every category in one product
+        text_matrix = _normalize_rows(np.array([e['values'] for e in text_embeddings], dtype=np.float32))
+        similarities = text_matrix @ self._category_matrix().T
+
         results = []
-        for text_embedding in text_embeddings:
-            similarities = []
-            for cat_embedding in self.category_embeddings:
-                similarity = self._cosine_similarity(
-                    text_embedding['values'], 
-                    cat_embedding['values']
-                )
-                similarities.append(similarity)
-            
-            categories = [
-                self.categories[i] 
-                for i, sim in enumerate(similarities) 
-                if sim > threshold
-            ]
-            
+        for row in similarities:
+            categories = [self.categories[i] for i in np.flatnonzero(row > threshold)]
             if not categories:
-                max_idx = similarities.index(max(similarities))
-                categories = [self.categories[max_idx]]
+                categories = [self.categories[int(row.argmax())]]
             results.append(categories)
         
         return results
 
-    def _cosine_similarity(self, v1, v2):
-        """Calculate cosine similarity between two vectors"""
-        dot_product = sum(a * b for a, b in zip(v1, v2))
-        norm1 = sum(a * a for a in v1) ** 0.5
-        norm2 = sum(b * b for b in v2) ** 0.5
-        return dot_product / (norm1 * norm2)
+    def _category_matrix(self):
+        """Row-normalized category embeddings, computed once per setup"""
+        if self._category_matrix_cache is None:
+            self._category_matrix_cache = _normalize_rows(
+                np.array([e['values'] for e in self.category_embeddings], dtype=np.float32)
+            )
+        return self._category_matrix_cache
+
+    def classify_column(self, texts, batch_size=20):
+        """Classify a column of texts, batch_size texts per embed call, retrying rate-limited calls"""
+        batcher = AdaptiveBatcher("classify", max_items=batch_size)
+        results = batcher.run(texts.tolist(), self.classify_text_batch)
+        return [categories or [] for categories in results]
 
     def format_grants_data(self):
-        print("Formatting grants data...")
-        data = []
-        batch_size = 20
-        
-        for i in tqdm(range(0, len(self.df), batch_size), desc="Processing grants"):
-            batch = self.df.iloc[i:i+batch_size]
-            texts_to_classify = []
-            
-            for _, row in batch.iterrows():
-                # Use LLM Summary and Teaser if available, otherwise fall back to original text
-                summary = row.get('LLM Summary', '')
-                teaser = row.get('LLM Teaser', '')
-                title = row.OPPORTUNITY_TITLE if pd.notna(row.OPPORTUNITY_TITLE) else ""
-                
-                # Combine teaser and summary for classification
-                text_for_classification = f"{title} {teaser} {summary}"
-                if not summary and not teaser:
-                    # Fallback to original description if no LLM content
-                    summarized_description = str(row.DESCRIPTION)[:300] if len(str(row.DESCRIPTION)) > 300 else str(row.DESCRIPTION)
-                    text_for_classification = f"{title} {summarized_description}"
-                
-                texts_to_classify.append(text_for_classification)
-            
-            # Batch classify texts
-            batch_categories = self.classify_text_batch(texts_to_classify)
-            
-            for j, row in enumerate(batch.itertuples(index=False)):
-                title = row.OPPORTUNITY_TITLE if pd.notna(row.OPPORTUNITY_TITLE) else ""
-                description = row.DESCRIPTION if pd.notna(row.DESCRIPTION) else ""
-                
-                # Fix: Use standardized column names with underscores
-                summary = getattr(row, 'LLM_SUMMARY', '')
-                teaser = getattr(row, 'LLM_TEASER', '')
-                
-                # Text for embedding will be LLM content if available, otherwise original
-                embedding_text = f"{title}. {teaser} {summary}" if (summary or teaser) else f"{title}. {description}"
-                
-                metadata = {
-                    "title": title,
-                    "opportunity_number": row.OPPORTUNITY_NUMBER if pd.notna(row.OPPORTUNITY_NUMBER) else "",
-                    "agency_code": row.AGENCY_CODE if pd.notna(row.AGENCY_CODE) else "",
-                    "category": batch_categories[j],
-                    "status": row.OPPORTUNITY_STATUS if pd.notna(row.OPPORTUNITY_STATUS) else "",
-                    "posted_date": row.POSTED_DATE if pd.notna(row.POSTED_DATE) else "",
-                    "last_updated_date": row.LAST_UPDATED_DATE if pd.notna(row.LAST_UPDATED_DATE) else "",
-                    "application_deadline": row.APPLICATION_DEADLINE if pd.notna(row.APPLICATION_DEADLINE) else "",
-                    "close_date": row.CLOSE_DATE if pd.notna(row.CLOSE_DATE) else "",
-                    "total_funding": row.TOTAL_FUNDING_AMOUNT if pd.notna(row.TOTAL_FUNDING_AMOUNT) else "",
-                    "award_ceiling": row.AWARD_CEILING if pd.notna(row.AWARD_CEILING) else "",
-                    "award_floor": row.AWARD_FLOOR if pd.notna(row.AWARD_FLOOR) else "",
-                    "link": row.LINK if pd.notna(row.LINK) else "",
-                    "description": description,
-                    "llm_summary": summary,
-                    "llm_teaser": teaser
-                }
-                
-                data.append({
-                    "id": f"vec{i+j}",
-                    "text": embedding_text,
-                    "metadata": metadata
-                })
-        
-        self.formatted_data = data
-        print(f"Processed {len(data)} grants")
+        """Format grants lazily: generate_embeddings formats each batch as it embeds it"""
+        self.formatted_batches = self.iter_formatted(self.format_grants_batch, "grants")
 
     def format_tech_data(self):
-        print("Formatting tech data...")
-        data = []
-        batch_size = 20  # Same batch size as grants
-        
-        for i in tqdm(range(0, len(self.df), batch_size), desc="Processing tech data"):
-            batch = self.df.iloc[i:i+batch_size]
-            texts_to_classify = []
-            
-            for _, row in batch.iterrows():
-                summary = row.get('LLM_SUMMARY', '')  # Changed from 'LLM Summary'
-                teaser = row.get('LLM_TEASER', '')   # Changed from 'LLM Teaser'
-                title = row.TITLE if pd.notna(row.TITLE) else ""  # Changed from row.title
-
-                texts_to_classify.append(f"{title} {teaser} {summary}")
-            
-            # Batch classify texts
-            batch_categories = self.classify_text_batch(texts_to_classify)
-            
-            for j, row in enumerate(batch.itertuples(index=False)):
-                title = row.TITLE if pd.notna(row.TITLE) else ""  # Changed from row.title
-                description = row.DESCRIPTION if pd.notna(row.DESCRIPTION) else ""
-
-                # get LLM content using uppercase column names
-                summary = getattr(row, 'LLM_SUMMARY', '')  # Changed access method
-                teaser = getattr(row, 'LLM_TEASER', '')   # Changed access method
-                embedding_text = f"{title} {teaser} {summary}"
-                
-                data.append({
-                    "id": f"{row.UNIVERSITY}-{row.NUMBER}".replace(' ', '_'), # replace spaces with underscores, because id will be used in url
-                    "text": embedding_text,
-                    "metadata": {
-                        "title": title,
-                        "university": row.UNIVERSITY if pd.notna(row.UNIVERSITY) else "",  # Changed from row.university
-                        "number": row.NUMBER if pd.notna(row.NUMBER) else "",              # Changed from row.number
-                        "patent": row.PATENT if pd.notna(row.PATENT) else "",              # Changed from row.patent
-                        "link": row.LINK if pd.notna(row.LINK) else "",                    # Changed from row.link
-                        "description": description,
-                        "category": batch_categories[j],
-                        "llm_summary": summary,
-                        "llm_teaser": teaser
-                    }
-                })
-        
-        self.formatted_data = data
-        print(f"Processed {len(data)} tech entries")
+        """Format tech records lazily: generate_embeddings formats each batch as it embeds it"""
+        self.formatted_batches = self.iter_formatted(self.format_tech_batch, "tech entries")
 
-    def generate_embeddings(self):
-        print("Preparing data for embedding generation...")
-        data = self.formatted_data
-        print(f"Total items to process: {len(data)}")
+    def iter_formatted(self, format_batch, label):
+        """Formatted batches from iter_batches(), without repeated ids or the ones deduplicate() dropped.
 
-        # Process in batches of 90
-        batch_size = 20
-        all_embeddings = []
-        
-        for i in tqdm(range(0, len(data), batch_size), desc="Generating embeddings"):
-            batch = data[i:i + batch_size]
-            batch_embeddings = self.pc.inference.embed(
-                model='multilingual-e5-large',
-                inputs=[d['text'] for d in batch],
-                parameters={"input_type": "passage", "truncate": "END"}
-            )
-            all_embeddings.extend(batch_embeddings)
+        Records are filtered before formatting, so duplicates are never classified,
+        and only the ids seen so far are kept between batches.
+        """
+        print(f"Formatting {label}...")
+        seen = set()
+        processed = repeated = 0
+        for chunk in tqdm(self.iter_batches(), desc=f"Processing {label}", unit="chunk"):
+            ids = _batch_ids(chunk)
+            first = _first_occurrences(ids, seen)
+            seen.update(ids[first])
+            repeated += int((~first).sum())
+            keep = first & ~ids.isin(self.dropped_ids).to_numpy()
+            if keep.any():
+                frame = format_batch(chunk[keep].reset_index(drop=True))
+                processed += len(frame)
+                yield frame
+        if repeated:
+            print(f"Dropped {repeated} records with repeated ids")
+        print(f"Processed {processed} {label}")
+
+    def format_grants_batch(self, chunk):
+        """Index records (id, text, metadata, category) for one normalized grants batch"""
+        title = _text(chunk, 'OPPORTUNITY_TITLE')
+        description = _text(chunk, 'DESCRIPTION')
+        summary = _text(chunk, 'LLM_SUMMARY')
+        teaser = _text(chunk, 'LLM_TEASER')
+        has_llm = (summary != "") | (teaser != "")
 
+        # Use LLM Summary and Teaser if available, otherwise fall back to original text
+        classification_text = (title + " " + teaser + " " + summary).where(
+            has_llm, title + " " + description.str.slice(0, 300)
+        )
+        embedding_text = (title + ". " + teaser + " " + summary).where(
+            has_llm, title + ". " + description
+        )
+
+        frame = pd.DataFrame({"text": embedding_text})
+        for field, col in GRANTS_METADATA_COLUMNS.items():
+            frame[field] = _text(chunk, col)
+        # Ids come from source + opportunity/topic number, so they survive reordering
+        frame.insert(0, "id", grant_ids(frame))
+        frame["category"] = self.classify_column(classification_text)
+        return frame
+
+    def format_tech_batch(self, chunk):
+        """Index records (id, text, metadata, category) for one normalized tech batch"""
+        title = _text(chunk, 'TITLE')
+        summary = _text(chunk, 'LLM_SUMMARY')
+        teaser = _text(chunk, 'LLM_TEASER')
+        embedding_text = title + " " + teaser + " " + summary
+
+        frame = pd.DataFrame({"text": embedding_text})
+        for field, col in TECH_METADATA_COLUMNS.items():
+            frame[field] = _text(chunk, col)
+        # university + docket number; url-safe because the id is used in /result urls
+        frame.insert(0, "id", tech_ids(frame))
+        frame["category"] = self.classify_column(embedding_text)
+        return frame
+
+    def format_records(self, df, content_type):
+        """Index records for raw record rows (e.g. streamed straight from a scraper)"""
+        chunk = self._normalize_batch(df)
+        return self.format_grants_batch(chunk) if content_type == 'grants' else self.format_tech_batch(chunk)
+
+    def deduplicate(self, threshold=0.8):
+        """Collapse grants listed by both grants.gov and DOD SBIR into one record before embedding.
+
+        Only grants from different sources are merged; tech records and
+        near-identical grants from the same source are kept as they are.
+        One pass over the batches keeps just ids, sources and MinHash
+        signatures; the ids to drop are skipped when batches are formatted.
+        """
+        if "OPPORTUNITY_NUMBER" not in self.columns:
+            print("Not grants data; skipping cross-source deduplication.")
+            return
+        ids, sources, signatures, has_llm, desc_length = [], [], [], [], []
+        seen = set()
+        for chunk in self.iter_batches():
+            batch_ids = _batch_ids(chunk)
+            first = _first_occurrences(batch_ids, seen)
+            chunk, batch_ids = chunk[first], batch_ids[first]
+            seen.update(batch_ids)
+            description = _text(chunk, 'DESCRIPTION')
+            ids.extend(batch_ids)
+            sources.extend(_text(chunk, 'LINK').map(grant_source))
+            signatures.append(minhash_signatures((_text(chunk, 'OPPORTUNITY_TITLE') + " " + description).tolist()))
+            has_llm.append((_text(chunk, 'LLM_SUMMARY') != "").to_numpy())
+            desc_length.append(description.str.len().to_numpy())
+        if not ids:
+            return
+        print(f"Checking {len(ids)} grants for opportunities listed by more than one source...")
+        clusters = find_duplicate_clusters(np.concatenate(signatures), threshold=threshold, groups=sources)
+
+        # Keep the record with LLM content and the longest description
+        has_llm, desc_length = np.concatenate(has_llm), np.concatenate(desc_length)
+        self.dropped_ids = set()
+        for members in clusters:
+            keep = max(members, key=lambda row: (has_llm[row], desc_length[row]))
+            dropped = [ids[row] for row in members if row != keep]
+            self.dropped_ids.update(dropped)
+            print(f"Duplicate group kept {ids[keep]}, dropped {dropped}")
+
+        print(f"Removed {len(self.dropped_ids)} near-duplicates in {len(clusters)} groups; "
+              f"{len(ids) - len(self.dropped_ids)} records remain.")
+
+    def generate_embeddings(self, window_size=1000):
+        """Embed and upsert formatted_batches as they are formatted; returns (upserted, failed) record counts"""
         print("Waiting for index to be ready...")
         while not self.pc.describe_index(self.index_name).status['ready']:
             time.sleep(1)
@@ -308,47 +419,117 @@ class EmbeddingsGenerator:
 
         index = self.pc.Index(self.index_name)
 
-        print("Preparing vectors for upsert...")
-        vectors = []
+        embed_batcher, upsert_batcher = self.make_batchers()
+
+        # Everything that reaches the index is also kept locally, so rebuilds need no re-embedding
+        snapshot = SnapshotWriter(snapshot_path(self.index_name, self.snapshot_dir), self.index_name)
+
+        # One formatted batch in memory at a time, not the whole corpus
+        print(f"Embedding and upserting in windows of {window_size}...")
+        try:
+            for frame in self.formatted_batches:
+                for i in range(0, len(frame), window_size):
+                    window = frame.iloc[i:i + window_size]
+                    snapshot.add(self.embed_and_upsert(window, index, embed_batcher, upsert_batcher))
+        except BaseException:
+            snapshot.abort()
+            raise
+        snapshot.close()
+
+        self.batch_stats = {"embed": embed_batcher.report(), "upsert": upsert_batcher.report()}
+        upserted = len(snapshot.ids)
+        failed = len(embed_batcher.failed_items) + len(upsert_batcher.failed_items)
+        if failed:
+            print(f"Warning: {failed} items could not be embedded or upserted.")
+        print(f"Upsert complete: {upserted} upserted, {failed} failed.")
+        return upserted, failed
+
+    def make_batchers(self):
+        """(embed, upsert) batchers: embed requests are capped by input count and tokens, upserts by request size"""
+        embed_batcher = AdaptiveBatcher(
+            "embed", max_items=EMBED_MAX_ITEMS, max_tokens=EMBED_MAX_TOKENS,
+            token_fn=lambda text: min(estimate_tokens(text), EMBED_MAX_INPUT_TOKENS)
+        )
+        upsert_batcher = AdaptiveBatcher(
+            "upsert", max_items=UPSERT_MAX_ITEMS, max_bytes=UPSERT_MAX_BYTES,
+            size_fn=estimate_vector_bytes
+        )
+        return embed_batcher, upsert_batcher
+
+    def embed_and_upsert(self, window, index, embed_batcher, upsert_batcher):
+        """Embed one window of formatted records and upsert it; returns the vectors that were upserted"""
         MAX_DESC_LENGTH = 30000  # Much more generous limit
-        for d, e in zip(data, all_embeddings):
-            # Truncate description if present
-            if 'description' in d['metadata']:
-                d['metadata']['description'] = d['metadata']['description'][:MAX_DESC_LENGTH]
-            
-            vectors.append({
-                "id": d['id'],
-                "values": e['values'],
-                "metadata": d['metadata']
-            })
-
-        print(f"Upserting {len(vectors)} vectors in batches...")
-        batch_size = 50  # Smaller batch size for upsert
-        for i in tqdm(range(0, len(vectors), batch_size), desc="Upserting vectors"):
-            batch = vectors[i:i + batch_size]
-            index.upsert(vectors=batch, namespace="ns1")
-        print("Upsert complete.")
+        if 'description' in window.columns:
+            window = window.assign(description=window['description'].str.slice(0, MAX_DESC_LENGTH))
+
+        def embed(texts):
+            return self.embedder.embed(
+                model='multilingual-e5-large',
+                inputs=texts,
+                parameters={"input_type": "passage", "truncate": "END"}
+            )
+
+        def upsert(vectors):
+            index.upsert(vectors=vectors, namespace="ns1")
+
+        embeddings = embed_batcher.run(window["text"].tolist(), embed)
+        embedded = [e is not None for e in embeddings]
+        vectors = _to_vectors(window[embedded], [e for e in embeddings if e is not None])
+        upserted = upsert_batcher.run(vectors, upsert)
+        return [v for v, ok in zip(vectors, upserted) if ok]
+
+    def wait_for_vectors(self, expected_count, timeout=600):
+        """Block until the new index reports every upserted vector (serverless writes are eventually visible)"""
+        index = self.pc.Index(self.index_name)
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            stats = index.describe_index_stats()
+            namespace = stats.get('namespaces', {}).get("ns1")
+            count = namespace['vector_count'] if namespace else 0
+            if count >= expected_count:
+                print(f"Index reports {count} vectors.")
+                return True
+            time.sleep(5)
+        print(f"Timed out waiting for {expected_count} vectors in {self.index_name}.")
+        return False
+
+    def smoke_test(self, queries, min_matches=1):
+        """Run a set of queries against the new index; every query must return matches"""
+        index = self.pc.Index(self.index_name)
+        embeddings = self.embedder.embed(
+            model='multilingual-e5-large',
+            inputs=queries,
+            parameters={"input_type": "query"}
+        )
+        passed = True
+        for query, embedding in zip(queries, embeddings):
+            results = index.query(
+                namespace="ns1",
+                vector=embedding['values'],
+                top_k=max(min_matches, 5),
+                include_metadata=True
+            )
+            matches = results['matches']
+            ok = len(matches) >= min_matches and all(match.get('metadata') for match in matches)
+            print(f"Smoke query '{query}': {len(matches)} matches {'OK' if ok else 'FAILED'}")
+            passed = passed and ok
+        return passed
 
 if __name__ == "__main__":
     option = 'tech' # ONLY CHANGE THIS, DO NOT CHANGE THE REST (grants or tech)
-    date = '2024-12-05' # can actually change this too
+    date = time.strftime('%Y-%m-%d-%H%M') # every build goes to a fresh index
+    swap_alias_on_success = True # blue/green: point the live alias at the new index once it passes the smoke queries
     options = {
         'grants': {
             'index_name': f'grants-{date}',
             'data_path': 'data/grants',
-            'required_cols': [
-                "OPPORTUNITY TITLE", "AGENCY CODE", "OPPORTUNITY STATUS",
-                "POSTED DATE", "CLOSE DATE", "LINK", "OPPORTUNITY NUMBER",
-                "CATEGORY", "LAST_UPDATED_DATE", "POSTED_DATE", "APPLICATION_DEADLINE",
-                "TOTAL_FUNDING_AMOUNT", "AWARD_CEILING", "AWARD_FLOOR", "DESCRIPTION",
-                "LLM Summary", "LLM Teaser"  # Fixed column names
-            ],
+            'required_cols': REQUIRED_COLUMNS['grants'],
             'format_data': 'format_grants_data'
         },
         'tech': {
             'index_name': f'tech-{date}',
             'data_path': 'data/tech',
-            'required_cols': ["university", "title", "number", "patent", "link", "description", "LLM Summary", "LLM Teaser"],
+            'required_cols': REQUIRED_COLUMNS['tech'],
             'format_data': 'format_tech_data'
         }
     }
@@ -364,5 +545,15 @@ if __name__ == "__main__":
     eg.load_data(options[option]['required_cols'])
     format_method = getattr(eg, options[option]['format_data'])
     format_method()
-    eg.generate_embeddings()
-    print("Embedding generation process finished.")
\ No newline at end of file
+    eg.deduplicate()
+    upserted, failed = eg.generate_embeddings()
+    print("Embedding generation process finished.")
+
+    if swap_alias_on_success:
+        if failed:
+            print(f"{failed} records failed to embed or upsert; alias '{option}' still points to its previous index.")
+        elif eg.wait_for_vectors(upserted) and eg.smoke_test(SMOKE_QUERIES[option]):
+            previous = swap_alias(option, eg.index_name)
+            print(f"Roll back with: python -m main.services.index_aliases rollback {option}  (-> {previous})")
+        else:
+            print(f"Smoke test failed; alias '{option}' still points to its previous index.")
\ No newline at end of file
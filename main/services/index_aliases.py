@@ -0,0 +1,104 @@
+import json
+import os
+import sys
+import tempfile
+import time
+import fcntl
+from contextlib import contextmanager
+from main.constants.pinecone_indexes import INDEX_ALIASES, INDEX_ALIASES_PATH
+
+def read_aliases(path=INDEX_ALIASES_PATH):
+    """Return {alias: {"index": name, "previous": name}}, falling back to INDEX_ALIASES"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {alias: {"index": name, "previous": None} for alias, name in INDEX_ALIASES.items()}
+
+def write_aliases(aliases, path=INDEX_ALIASES_PATH):
+    """Atomically replace the alias file so readers never see a partial write"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.index_aliases.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(aliases, f, indent=4, sort_keys=True)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+@contextmanager
+def _locked(path):
+    """Serialize read-modify-write cycles between concurrent builds"""
+    with open(f"{path}.lock", 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def swap_alias(alias, index_name, path=INDEX_ALIASES_PATH):
+    """Point alias at index_name, remembering the old target for rollback"""
+    with _locked(path):
+        aliases = read_aliases(path)
+        current = aliases.get(alias, {}).get("index")
+        aliases[alias] = {"index": index_name, "previous": current}
+        write_aliases(aliases, path)
+    print(f"Alias '{alias}' now points to '{index_name}' (previous: '{current}')")
+    return current
+
+def rollback_alias(alias, path=INDEX_ALIASES_PATH):
+    """Flip alias back to its previous index"""
+    with _locked(path):
+        aliases = read_aliases(path)
+        entry = aliases.get(alias)
+        if not entry or not entry.get("previous"):
+            raise ValueError(f"Alias '{alias}' has no previous index to roll back to")
+        aliases[alias] = {"index": entry["previous"], "previous": entry["index"]}
+        write_aliases(aliases, path)
+    print(f"Alias '{alias}' rolled back to '{entry['previous']}'")
+    return entry["previous"]
+
+class IndexAliasResolver:
+    """Resolves aliases to index names, reloading the alias file when it changes"""
+
+    def __init__(self, path=INDEX_ALIASES_PATH, check_interval=5):
+        self.path = path
+        self.check_interval = check_interval
+        self._aliases = {}
+        self._mtime = None
+        self._checked_at = 0
+        self._reload()
+
+    def _reload(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime != self._mtime or not self._aliases:
+            self._aliases = {alias: entry["index"] for alias, entry in read_aliases(self.path).items()}
+            self._mtime = mtime
+        self._checked_at = time.monotonic()
+
+    def resolve(self, alias):
+        """Return the index currently behind alias (names that are not aliases pass through)"""
+        if time.monotonic() - self._checked_at >= self.check_interval:
+            self._reload()
+        return self._aliases.get(alias, alias)
+
+if __name__ == "__main__":
+    """
+    python -m main.services.index_aliases show
+    python -m main.services.index_aliases set tech tech-2024-12-05
+    python -m main.services.index_aliases rollback tech
+    """
+    command = sys.argv[1] if len(sys.argv) > 1 else 'show'
+    if command == 'set':
+        swap_alias(sys.argv[2], sys.argv[3])
+    elif command == 'rollback':
+        rollback_alias(sys.argv[2])
+    else:
+        print(json.dumps(read_aliases(), indent=4, sort_keys=True))
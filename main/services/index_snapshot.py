@@ -0,0 +1,412 @@
+import argparse
+import json
+import os
+import shutil
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pyarrow as pa
+from main.constants.pinecone_indexes import (
+    INDEX_SNAPSHOTS_PATH,
+    EMBED_MODEL,
+    UPSERT_MAX_ITEMS,
+    UPSERT_MAX_BYTES
+)
+from main.services.batching import AdaptiveBatcher, estimate_vector_bytes
+from main.services.quantization import ScalarQuantizer, quantize_snapshot
+
+# A snapshot is a directory named after its index:
+#   manifest.json       format version, model, dimension, metric, namespace, count
+#   vectors.npy         float32 matrix, one row per id
+#   ids.json            ids in row order
+#   metadata.jsonl.zst  one JSON object per row, zstd-compressed
+#   vectors.int8.npy, norms.npy, quantizer.npz   int8 codes for quantized serving, built with the snapshot
+SNAPSHOT_FORMAT_VERSION = 1
+
+SnapshotVector = namedtuple('SnapshotVector', ['id', 'values', 'metadata'])
+
+def snapshot_path(index_name, root=INDEX_SNAPSHOTS_PATH):
+    return os.path.join(root, index_name)
+
+class SnapshotWriter:
+    """Streams upserted vectors to a snapshot directory, published atomically on close()"""
+
+    def __init__(self, path, index_name, dimension=1024, metric="cosine", namespace="ns1", model=EMBED_MODEL,
+                 quantize=True):
+        self.path = path
+        self.quantize = quantize
+        self.tmp_path = f"{path}.tmp"
+        self.manifest = {
+            "format_version": SNAPSHOT_FORMAT_VERSION,
+            "index_name": index_name,
+            "model": model,
+            "dimension": dimension,
+            "metric": metric,
+            "namespace": namespace,
+            "count": 0,
+        }
+        shutil.rmtree(self.tmp_path, ignore_errors=True)
+        os.makedirs(self.tmp_path)
+        self.ids = []
+        # Rows are appended as raw float32 and wrapped in an .npy header on close
+        self._vectors = open(os.path.join(self.tmp_path, 'vectors.f32'), 'wb')
+        self._metadata = pa.CompressedOutputStream(os.path.join(self.tmp_path, 'metadata.jsonl.zst'), 'zstd')
+
+    def add(self, vectors):
+        """Append upsert payloads ({"id", "values", "metadata"} dicts)"""
+        if not vectors:
+            return
+        matrix = np.asarray([v['values'] for v in vectors], dtype=np.float32)
+        if matrix.shape[1] != self.manifest["dimension"]:
+            raise ValueError(f"Expected {self.manifest['dimension']}-d vectors, got {matrix.shape[1]}")
+        self._vectors.write(matrix.tobytes())
+        self._metadata.write("".join(
+            json.dumps(v.get('metadata', {}), ensure_ascii=False) + "\n" for v in vectors
+        ).encode('utf-8'))
+        self.ids.extend(v['id'] for v in vectors)
+
+    def close(self):
+        self._vectors.close()
+        self._metadata.close()
+        count = len(self.ids)
+        raw_path = os.path.join(self.tmp_path, 'vectors.f32')
+        with open(os.path.join(self.tmp_path, 'vectors.npy'), 'wb') as out, open(raw_path, 'rb') as raw:
+            header = {'descr': '<f4', 'fortran_order': False, 'shape': (count, self.manifest["dimension"])}
+            np.lib.format.write_array_header_1_0(out, header)
+            shutil.copyfileobj(raw, out, length=16 * 1024 * 1024)
+        os.remove(raw_path)
+
+        with open(os.path.join(self.tmp_path, 'ids.json'), 'w', encoding='utf-8') as f:
+            json.dump(self.ids, f)
+        if self.quantize:
+            # Quantized once here, not by each serving process on first load
+            quantize_snapshot(self.tmp_path, np.load(os.path.join(self.tmp_path, 'vectors.npy'), mmap_mode='r'))
+        self.manifest["count"] = count
+        self.manifest["created_at"] = time.strftime('%Y-%m-%dT%H:%M:%S')
+        with open(os.path.join(self.tmp_path, 'manifest.json'), 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, indent=4)
+
+        shutil.rmtree(self.path, ignore_errors=True)
+        os.replace(self.tmp_path, self.path)
+        print(f"Snapshot of {count} vectors written to {self.path}")
+        return self.path
+
+    def abort(self):
+        self._vectors.close()
+        self._metadata.close()
+        shutil.rmtree(self.tmp_path, ignore_errors=True)
+
+class Snapshot:
+    """A loaded snapshot; the vector matrix is memory-mapped, not read into RAM"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'manifest.json'), 'r', encoding='utf-8') as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(f"Unsupported snapshot format {self.manifest.get('format_version')} in {path}")
+        with open(os.path.join(path, 'ids.json'), 'r', encoding='utf-8') as f:
+            self.ids = json.load(f)
+        self.vectors = np.load(os.path.join(path, 'vectors.npy'), mmap_mode='r')
+        with pa.CompressedInputStream(pa.OSFile(os.path.join(path, 'metadata.jsonl.zst')), 'zstd') as f:
+            self.metadata = [json.loads(line) for line in f.read().decode('utf-8').splitlines()]
+        if not (len(self.ids) == len(self.metadata) == self.vectors.shape[0]):
+            raise ValueError(f"Snapshot {path} is inconsistent: ids, vectors and metadata differ in length")
+        self.positions = {id: row for row, id in enumerate(self.ids)}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def load_quantized(self):
+        """(quantizer, int8 codes, row norms) written with the snapshot"""
+        quantizer_path = os.path.join(self.path, 'quantizer.npz')
+        if not os.path.exists(quantizer_path):
+            raise FileNotFoundError(
+                f"{self.path} has no quantized vectors; run python -m main.services.index_snapshot quantize {self.path}"
+            )
+        quantizer = ScalarQuantizer.load(quantizer_path)
+        codes = np.load(os.path.join(self.path, 'vectors.int8.npy'))
+        norms = np.load(os.path.join(self.path, 'norms.npy'))
+        return quantizer, codes, norms
+
+    def iter_vectors(self, start=0, stop=None, batch_size=1000):
+        """Yield upsert payloads for rows [start, stop) in batches"""
+        stop = len(self) if stop is None else stop
+        for offset in range(start, stop, batch_size):
+            end = min(offset + batch_size, stop)
+            values = np.asarray(self.vectors[offset:end]).tolist()
+            yield [
+                {"id": self.ids[row], "values": values[row - offset], "metadata": self.metadata[row]}
+                for row in range(offset, end)
+            ]
+
+def _matches_condition(value, condition):
+    """Evaluate one Pinecone field condition; list-valued metadata matches if any element does"""
+    if not isinstance(condition, dict):
+        condition = {"$eq": condition}
+    values = value if isinstance(value, list) else [value]
+    for op, operand in condition.items():
+        if op == "$eq":
+            ok = operand in values
+        elif op == "$ne":
+            ok = operand not in values
+        elif op == "$in":
+            ok = any(v in operand for v in values)
+        elif op == "$nin":
+            ok = not any(v in operand for v in values)
+        elif op == "$exists":
+            ok = (value is not None) == bool(operand)
+        else:
+            raise ValueError(f"Unsupported filter operator {op}")
+        if not ok:
+            return False
+    return True
+
+def matches_filter(metadata, filter):
+    """Evaluate a Pinecone metadata filter ($and/$or plus field conditions) against one record"""
+    for key, condition in filter.items():
+        if key == "$and":
+            if not all(matches_filter(metadata, f) for f in condition):
+                return False
+        elif key == "$or":
+            if not any(matches_filter(metadata, f) for f in condition):
+                return False
+        elif not _matches_condition(metadata.get(key), condition):
+            return False
+    return True
+
+def _top_rows(scores, k):
+    """Positions of the k highest scores, best first"""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+class LocalIndex:
+    """Serves query/fetch/describe_index_stats from a snapshot, like a Pinecone Index handle.
+
+    With quantized=True only int8 codes are held in memory (a quarter of the
+    float32 matrix); the best top_k * rescore_factor candidates are rescored
+    exactly against the memory-mapped float32 vectors.
+    """
+
+    def __init__(self, snapshot, quantized=False, rescore_factor=4):
+        self.snapshot = snapshot
+        self.namespace = snapshot.manifest["namespace"]
+        self.rescore_factor = rescore_factor
+        self.quantizer, self.codes = None, None
+        if quantized:
+            self.quantizer, self.codes, self.norms = snapshot.load_quantized()
+        else:
+            self.norms = np.linalg.norm(snapshot.vectors, axis=1)
+        self.norms = np.where(self.norms == 0, 1.0, self.norms).astype(np.float32)
+        self._filter_masks = {}
+
+    def _mask(self, filter):
+        key = json.dumps(filter, sort_keys=True)
+        if key not in self._filter_masks:
+            self._filter_masks[key] = np.fromiter(
+                (matches_filter(m, filter) for m in self.snapshot.metadata), dtype=bool, count=len(self.snapshot)
+            )
+        return self._filter_masks[key]
+
+    def query(self, vector, top_k=10, namespace="ns1", include_values=False, include_metadata=False, filter=None, **_):
+        if namespace != self.namespace or not len(self.snapshot):
+            return {'matches': []}
+        query = np.asarray(vector, dtype=np.float32)
+        query_norm = max(float(np.linalg.norm(query)), 1e-12)
+        if self.codes is not None:
+            approximate = self.quantizer.scores(self.codes, query) / (self.norms * query_norm)
+            if filter:
+                approximate = np.where(self._mask(filter), approximate, -np.inf)
+            candidates = _top_rows(approximate, top_k * self.rescore_factor)
+            candidates = np.sort(candidates[np.isfinite(approximate[candidates])])
+            exact = (np.asarray(self.snapshot.vectors[candidates]) @ query) / (self.norms[candidates] * query_norm)
+            scores = np.full(len(approximate), -np.inf, dtype=np.float32)
+            scores[candidates] = exact
+            top = candidates[_top_rows(exact, top_k)]
+        else:
+            scores = (self.snapshot.vectors @ query) / (self.norms * query_norm)
+            if filter:
+                scores = np.where(self._mask(filter), scores, -np.inf)
+            top = _top_rows(scores, top_k)
+        return {'matches': [
+            {
+                'id': self.snapshot.ids[row],
+                'score': float(scores[row]),
+                'metadata': self.snapshot.metadata[row] if include_metadata else None,
+                'values': self.snapshot.vectors[row].tolist() if include_values else None,
+            }
+            for row in top if np.isfinite(scores[row])
+        ]}
+
+    def fetch(self, ids, namespace="ns1", **_):
+        if namespace != self.namespace:
+            return {'vectors': {}}
+        positions = self.snapshot.positions
+        return {'vectors': {
+            id: SnapshotVector(id, self.snapshot.vectors[positions[id]].tolist(), self.snapshot.metadata[positions[id]])
+            for id in ids if id in positions
+        }}
+
+    def describe_index_stats(self):
+        return {
+            'dimension': self.snapshot.manifest["dimension"],
+            'namespaces': {self.namespace: {'vector_count': len(self.snapshot)}}
+        }
+
+class LocalPinecone:
+    """Drop-in for the Pinecone client that reads indexes from local snapshots.
+
+    Query embeddings go through Pinecone inference (a client built from
+    PINECONE_API_KEY unless one is given) unless LOCAL_EMBED_MODEL_PATH
+    selects the local backend, in which case serving needs no network.
+    """
+
+    def __init__(self, root=INDEX_SNAPSHOTS_PATH, inference_client=None, quantized=False):
+        self.root = root
+        self._inference_client = inference_client
+        self.quantized = quantized
+        self.indexes = {}
+
+    @property
+    def inference(self):
+        if self._inference_client is None:
+            from pinecone import Pinecone
+            self._inference_client = Pinecone(api_key=os.getenv('PINECONE_API_KEY'))
+        return self._inference_client.inference
+
+    def Index(self, name):
+        if name not in self.indexes:
+            self.indexes[name] = LocalIndex(Snapshot(snapshot_path(name, self.root)), quantized=self.quantized)
+        return self.indexes[name]
+
+def export_index(pc, index_name, path=None, namespace="ns1", batch_size=100):
+    """Pull every vector of an existing Pinecone index into a snapshot (list + fetch)"""
+    path = path or snapshot_path(index_name)
+    index = pc.Index(index_name)
+    dimension = index.describe_index_stats()['dimension']
+    writer = SnapshotWriter(path, index_name, dimension=dimension, namespace=namespace)
+    try:
+        for ids in index.list(namespace=namespace):
+            for i in range(0, len(ids), batch_size):
+                fetched = index.fetch(ids=ids[i:i + batch_size], namespace=namespace)['vectors']
+                writer.add([
+                    {"id": id, "values": v.values, "metadata": getattr(v, 'metadata', None) or {}}
+                    for id, v in fetched.items()
+                ])
+    except BaseException:
+        writer.abort()
+        raise
+    return writer.close()
+
+def update_snapshot(path, delta=None, removed_ids=(), batch_size=1000):
+    """
+    Rewrite the snapshot at path with delta's vectors (a Snapshot of new or
+    changed rows) upserted over it and removed_ids deleted, the way the same
+    upserts and deletes changed the live index.
+    """
+    base = Snapshot(path)
+    replaced = set(removed_ids) | set(delta.ids if delta is not None else ())
+    manifest = base.manifest
+    writer = SnapshotWriter(path, manifest["index_name"], dimension=manifest["dimension"], metric=manifest["metric"],
+                            namespace=manifest["namespace"], model=manifest["model"])
+    try:
+        for batch in base.iter_vectors(batch_size=batch_size):
+            writer.add([vector for vector in batch if vector["id"] not in replaced])
+        if delta is not None:
+            removed = set(removed_ids)
+            for batch in delta.iter_vectors(batch_size=batch_size):
+                writer.add([vector for vector in batch if vector["id"] not in removed])
+    except BaseException:
+        writer.abort()
+        raise
+    return writer.close()
+
+def import_snapshot(pc, path, index_name, workers=8, cloud="aws", region="us-east-1"):
+    """Create index_name and upsert a snapshot into it from parallel workers (no re-embedding)"""
+    from pinecone import ServerlessSpec
+    snapshot = Snapshot(path)
+    manifest = snapshot.manifest
+    print(f"Importing {len(snapshot)} vectors from {path} into '{index_name}' ({cloud}/{region})...")
+    try:
+        pc.create_index(
+            name=index_name,
+            dimension=manifest["dimension"],
+            metric=manifest["metric"],
+            spec=ServerlessSpec(cloud=cloud, region=region)
+        )
+    except Exception as e:
+        print(f"Index not created ({e}); upserting into the existing index.")
+    while not pc.describe_index(index_name).status['ready']:
+        time.sleep(1)
+    index = pc.Index(index_name)
+
+    def upsert(vectors):
+        index.upsert(vectors=vectors, namespace=manifest["namespace"])
+
+    def upsert_shard(shard, start, stop):
+        # One batcher per worker: each keeps its own adaptive cap and stats
+        batcher = AdaptiveBatcher(
+            f"import-{shard}", max_items=UPSERT_MAX_ITEMS, max_bytes=UPSERT_MAX_BYTES,
+            size_fn=estimate_vector_bytes
+        )
+        for vectors in snapshot.iter_vectors(start, stop, batch_size=UPSERT_MAX_ITEMS):
+            batcher.run(vectors, upsert)
+        return batcher
+
+    bounds = np.linspace(0, len(snapshot), num=max(1, workers) + 1, dtype=int)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        batchers = list(executor.map(upsert_shard, range(len(bounds) - 1), bounds[:-1], bounds[1:]))
+
+    upserted = sum(b.stats['items'] for b in batchers)
+    failed = sum(b.stats['failed'] for b in batchers)
+    print(f"Imported {upserted} vectors into '{index_name}'" + (f"; {failed} failed" if failed else ""))
+    return upserted, failed
+
+if __name__ == "__main__":
+    """
+    python -m main.services.index_snapshot info snapshots/tech-2025-01-10-0900
+    python -m main.services.index_snapshot export tech-2024-12-05
+    python -m main.services.index_snapshot quantize snapshots/tech-2025-01-10-0900
+    python -m main.services.index_snapshot import snapshots/tech-2025-01-10-0900 tech-restored --workers 8
+    Serve the web app from snapshots with SERVE_FROM_SNAPSHOTS=1 (see application.py)
+    """
+    import dotenv
+    from pinecone import Pinecone
+    dotenv.load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Local index snapshots")
+    commands = parser.add_subparsers(dest='command', required=True)
+    info_parser = commands.add_parser('info')
+    info_parser.add_argument('path')
+    quantize_parser = commands.add_parser('quantize')
+    quantize_parser.add_argument('path')
+    export_parser = commands.add_parser('export')
+    export_parser.add_argument('index_name')
+    export_parser.add_argument('--path', default=None)
+    import_parser = commands.add_parser('import')
+    import_parser.add_argument('path')
+    import_parser.add_argument('index_name')
+    import_parser.add_argument('--workers', type=int, default=8)
+    import_parser.add_argument('--cloud', default='aws')
+    import_parser.add_argument('--region', default='us-east-1')
+    import_parser.add_argument('--swap-alias', default=None, help="point this alias at the new index afterwards")
+    args = parser.parse_args()
+
+    if args.command == 'info':
+        snapshot = Snapshot(args.path)
+        print(json.dumps(snapshot.manifest, indent=4))
+    elif args.command == 'quantize':
+        snapshot = Snapshot(args.path)
+        quantize_snapshot(snapshot.path, snapshot.vectors)
+    elif args.command == 'export':
+        export_index(Pinecone(api_key=os.getenv('PINECONE_API_KEY')), args.index_name, args.path)
+    else:
+        pc = Pinecone(api_key=os.getenv('PINECONE_API_KEY'))
+        upserted, failed = import_snapshot(pc, args.path, args.index_name, args.workers, args.cloud, args.region)
+        if args.swap_alias and not failed:
+            from main.services.index_aliases import swap_alias
+            swap_alias(args.swap_alias, args.index_name)
@@ -0,0 +1,92 @@
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+
+LLM_CACHE_PATH = os.getenv('LLM_CACHE_PATH', 'data/llm_cache.sqlite')
+
+def prompt_hash(prompt):
+    return hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+
+def cache_key(model, prompt, params):
+    """Key on model, prompt hash and every request parameter, so changing any of them misses"""
+    payload = json.dumps({"model": model, "prompt": prompt_hash(prompt), "params": params}, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class LLMCache:
+    """SQLite store of chat completion responses and their token usage.
+
+    Entries are keyed by (model, prompt hash, parameters): editing a prompt
+    template only misses for the requests whose text actually changed.
+    """
+
+    def __init__(self, path=LLM_CACHE_PATH):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        # WAL lets several summarization processes share one cache file
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS completions (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                prompt_hash TEXT NOT NULL,
+                params TEXT NOT NULL,
+                response TEXT NOT NULL,
+                prompt_tokens INTEGER,
+                completion_tokens INTEGER,
+                created_at REAL NOT NULL
+            )
+        """)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, model, prompt, params):
+        """(response, prompt_tokens, completion_tokens) or None"""
+        row = self.conn.execute(
+            "SELECT response, prompt_tokens, completion_tokens FROM completions WHERE key = ?",
+            (cache_key(model, prompt, params),)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return row
+
+    def put(self, model, prompt, params, response, prompt_tokens=None, completion_tokens=None):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO completions VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (cache_key(model, prompt, params), model, prompt_hash(prompt), json.dumps(params, sort_keys=True),
+             response, prompt_tokens, completion_tokens, time.time())
+        )
+
+    def stats(self):
+        count, prompt_tokens, completion_tokens = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(prompt_tokens), 0), COALESCE(SUM(completion_tokens), 0) FROM completions"
+        ).fetchone()
+        return {"entries": count, "prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens}
+
+    def clear(self, model=None):
+        """Drop every entry, or only those for one model"""
+        if model:
+            self.conn.execute("DELETE FROM completions WHERE model = ?", (model,))
+        else:
+            self.conn.execute("DELETE FROM completions")
+
+    def close(self):
+        self.conn.close()
+
+if __name__ == "__main__":
+    """
+    python -m main.services.llm_cache stats
+    python -m main.services.llm_cache clear [model]
+    """
+    cache = LLMCache()
+    command = sys.argv[1] if len(sys.argv) > 1 else 'stats'
+    if command == 'clear':
+        cache.clear(sys.argv[2] if len(sys.argv) > 2 else None)
+    print(json.dumps(cache.stats(), indent=4))
@@ -0,0 +1,364 @@
+import argparse
+import asyncio
+import importlib
+import inspect
+import os
+import shutil
+import time
+import numpy as np
+import pandas as pd
+from main.services.record_store import clean_text as clean_cell, is_parquet, iter_record_batches, read_records, write_records
+from main.services.completion_engine import CompletionEngine
+from main.services.llm_cache import LLMCache
+from main.services.document_ids import record_ids
+from main.services.results_journal import ResultsJournal
+from main.services.embedding_service import EmbeddingsGenerator, REQUIRED_COLUMNS
+from main.services.index_snapshot import Snapshot, SnapshotWriter, export_index, snapshot_path, update_snapshot
+from main.services.summarization_service import SUMMARY_MODEL, clean_text, find_text_columns, summarize_row
+
+# Streaming ingestion: records flow scrape -> summarize -> embed/upsert one by
+# one through bounded queues, instead of each stage materializing a full file
+# before the next starts. A full queue blocks the stage feeding it, so a slow
+# stage throttles the ones upstream instead of buffering the whole crawl.
+
+PIPELINE_CHECKPOINT_DIR = os.getenv('PIPELINE_CHECKPOINT_DIR', 'data/pipeline')
+
+# Live scrapers by name; imported on demand because they pull in selenium/aiohttp
+SCRAPERS = {
+    'stanford': 'scrapers.tech.live_scrapers.stanford_scraper.StanfordScraper',
+    'mit': 'scrapers.tech.live_scrapers.mit_scraper.MITScraper',
+    'upenn': 'scrapers.tech.live_scrapers.upenn_scraper.UPennScraper',
+    'columbia': 'scrapers.tech.live_scrapers.columbia_scraper.ColumbiaScraper',
+}
+
+_DONE = object()
+
+async def iter_in_thread(iterator, maxsize=64):
+    """Drive a blocking iterator (e.g. a selenium scraper) in a worker thread, yielding its items"""
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize)
+
+    def pump():
+        try:
+            for item in iterator:
+                asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+        finally:
+            asyncio.run_coroutine_threadsafe(queue.put(_DONE), loop).result()
+
+    future = loop.run_in_executor(None, pump)
+    while (item := await queue.get()) is not _DONE:
+        yield item
+    await future  # re-raises a scraper error
+
+def scraper_source(scraper, limit=None, max_concurrent=10, state=None):
+    """Records from a scraper as they are fetched (async scrapers natively, sync ones in a thread).
+    With a ScrapeState (scrapers/incremental.py) only new and changed records are produced.
+    """
+    if inspect.isasyncgenfunction(scraper.iter_items):
+        return scraper.iter_items(limit, max_concurrent, state=state)
+    return iter_in_thread(scraper.iter_items(limit, state=state))
+
+async def file_source(path, batch_size=1000):
+    """Records from an existing Parquet/CSV record file"""
+    frames = iter_record_batches(path, batch_size=batch_size) if is_parquet(path) else [read_records(path)]
+    for frame in frames:
+        for record in frame.to_dict('records'):
+            yield {key: None if pd.isna(value) else value for key, value in record.items()}
+        await asyncio.sleep(0)
+
+class StreamingPipeline:
+    """Scrape -> summarize -> embed/upsert with bounded queues and durable checkpoints.
+
+    Summaries are journaled under <checkpoint_dir>/<name>.summarized.journal and
+    upserted ids under <name>.upserted.journal. A restarted run skips records
+    that were already upserted and sends summarized-but-not-upserted ones
+    straight to the embed stage; the journals are removed once a run completes.
+
+    Like a full build, a run also updates the index's local snapshot: the
+    vectors it upserted (and any that an interrupted earlier run upserted)
+    are merged into snapshots/<index>, and remove() deletes from it too.
+    """
+
+    def __init__(self, name, content_type, generator, engine=None, checkpoint_dir=PIPELINE_CHECKPOINT_DIR,
+                 summarize_workers=16, embed_workers=2, queue_size=64, embed_batch_size=32, flush_seconds=5.0,
+                 combined=True, output_path=None, sync_every=20):
+        self.name = name
+        self.content_type = content_type
+        self.generator = generator
+        self.engine = engine or CompletionEngine(model=SUMMARY_MODEL, cache=LLMCache())
+        self.summarize_workers = summarize_workers
+        self.embed_workers = embed_workers
+        self.queue_size = queue_size
+        self.embed_batch_size = embed_batch_size
+        self.flush_seconds = flush_seconds
+        self.combined = combined
+        self.output_path = output_path
+        self.sync_every = sync_every
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        self.summarized_journal = ResultsJournal(os.path.join(checkpoint_dir, f"{name}.summarized.journal"))
+        self.upserted_journal = ResultsJournal(os.path.join(checkpoint_dir, f"{name}.upserted.journal"))
+        self.stats = {'scraped': 0, 'skipped': 0, 'summarized': 0, 'upserted': 0, 'failed': 0}
+        # Seconds from a record leaving the scraper to its vector reaching the index
+        self.time_to_searchable = []
+
+    async def run(self, source):
+        """Stream every record of source (an async iterator of scraped dicts) into the index"""
+        self.generator.set_columns(REQUIRED_COLUMNS[self.content_type])
+        self.index = self.generator.pc.Index(self.generator.index_name)
+        self.summarized = self.summarized_journal.load()
+        self.upserted = set(self.upserted_journal.load())
+        self.scraped_at = {}
+        self.queued = set()  # ids sent on to summarize/embed this run, so each is indexed once
+        self.snapshot_path = snapshot_path(self.generator.index_name, self.generator.snapshot_dir)
+        self.delta = SnapshotWriter(f"{self.snapshot_path}.delta", self.generator.index_name,
+                                    dimension=self.index.describe_index_stats()['dimension'], quantize=False)
+        self.snapshotted = set()
+        self.started = time.monotonic()
+        summarize_queue = asyncio.Queue(self.queue_size)
+        embed_queue = asyncio.Queue(self.queue_size)
+
+        async def summarize_stage():
+            await asyncio.gather(*(self._summarize_worker(summarize_queue, embed_queue) for _ in range(self.summarize_workers)))
+            for _ in range(self.embed_workers):
+                await embed_queue.put(_DONE)
+
+        tasks = [
+            asyncio.create_task(self._produce(source, summarize_queue, embed_queue)),
+            asyncio.create_task(summarize_stage()),
+            *(asyncio.create_task(self._embed_worker(embed_queue)) for _ in range(self.embed_workers)),
+        ]
+        try:
+            await asyncio.gather(*tasks)
+            await asyncio.to_thread(self._update_snapshot)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            self.delta.abort()
+            raise
+        finally:
+            self.summarized_journal.close()
+            self.upserted_journal.close()
+
+        if self.output_path:
+            entries = list(self.summarized.values())
+            df = pd.DataFrame([
+                dict(entry["record"], **{'LLM Summary': entry["summary"], 'LLM Teaser': entry["teaser"]}) for entry in entries
+            ])
+            write_records(df, self.output_path, self.content_type)
+            print(f"Wrote {len(df)} summarized records to {self.output_path}")
+        if not self.stats['failed']:
+            self.summarized_journal.remove()
+            self.upserted_journal.remove()
+        return self.report()
+
+    async def _produce(self, source, summarize_queue, embed_queue):
+        # Summarized but not yet upserted when an earlier run stopped
+        for row_id, entry in self.summarized.items():
+            if row_id not in self.upserted and entry.get("summary") and entry.get("teaser"):
+                self.queued.add(row_id)
+                self.scraped_at[row_id] = time.monotonic()
+                await embed_queue.put(entry)
+
+        async for record in source:
+            record = {key: clean_cell(value) for key, value in record.items()}
+            row_id = record_ids(pd.DataFrame([record]), self.content_type).iloc[0]
+            self.stats['scraped'] += 1
+            if row_id in self.upserted:
+                self.stats['skipped'] += 1
+                continue
+            if row_id in self.queued:
+                continue  # replayed from the journal above, or listed twice by the source
+            self.queued.add(row_id)
+            self.scraped_at.setdefault(row_id, time.monotonic())
+            await summarize_queue.put((row_id, record))
+        for _ in range(self.summarize_workers):
+            await summarize_queue.put(_DONE)
+
+    async def _summarize_worker(self, summarize_queue, embed_queue):
+        while (item := await summarize_queue.get()) is not _DONE:
+            row_id, record = item
+            entry = self.summarized.get(row_id)
+            if record.get('LLM Summary') and record.get('LLM Teaser'):
+                # Already summarized upstream (e.g. streaming an existing summarized file)
+                entry = {"id": row_id, "record": record, "summary": record['LLM Summary'], "teaser": record['LLM Teaser']}
+            elif not (entry and entry.get("summary") and entry.get("teaser")):
+                title_col, description_col = find_text_columns(pd.DataFrame(columns=list(record)))
+                summary, teaser = await summarize_row(
+                    self.engine, record[title_col] or "", clean_text(record[description_col]), self.content_type, self.combined
+                )
+                entry = {"id": row_id, "record": record, "summary": summary, "teaser": teaser}
+                self.summarized[row_id] = entry
+                self.summarized_journal.append(entry)
+                self.stats['summarized'] += 1
+                if self.stats['summarized'] % self.sync_every == 0:
+                    self.summarized_journal.sync()
+            if not (entry["summary"] and entry["teaser"]):
+                # Not indexed on its title alone: left for the next run, like process_csv_async's incomplete rows
+                print(f"[pipeline {self.name}] {row_id}: summary or teaser failed; will retry next run")
+                self.scraped_at.pop(row_id, None)
+                self.stats['failed'] += 1
+                continue
+            await embed_queue.put(entry)
+
+    async def _embed_worker(self, embed_queue):
+        # Each worker keeps its own batchers: they adapt to the limits they hit
+        batchers = self.generator.make_batchers()
+        done = False
+        while not done:
+            # Micro-batch: up to embed_batch_size records, or whatever arrived within flush_seconds
+            batch = []
+            item = await embed_queue.get()
+            deadline = time.monotonic() + self.flush_seconds
+            while True:
+                if item is _DONE:
+                    done = True
+                    break
+                batch.append(item)
+                remaining = deadline - time.monotonic()
+                if len(batch) >= self.embed_batch_size or remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(embed_queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+            if batch:
+                # The summaries a batch is built from reach disk before its vectors reach the index
+                self.summarized_journal.sync()
+                upserted = await asyncio.to_thread(self._index_batch, batch, batchers)
+                self._mark_upserted(batch, upserted)
+
+    def _index_batch(self, batch, batchers):
+        df = pd.DataFrame([
+            dict(entry["record"], **{'LLM Summary': entry["summary"], 'LLM Teaser': entry["teaser"]})
+            for entry in batch
+        ])
+        frame = self.generator.format_records(df, self.content_type).drop_duplicates("id").reset_index(drop=True)
+        return self.generator.embed_and_upsert(frame, self.index, *batchers)
+
+    def _mark_upserted(self, batch, upserted):
+        self.delta.add(upserted)
+        upserted_ids = {vector["id"] for vector in upserted}
+        self.snapshotted |= upserted_ids
+        now = time.monotonic()
+        for entry in batch:
+            if entry["id"] in upserted_ids:
+                self.upserted.add(entry["id"])
+                self.upserted_journal.append({"id": entry["id"]})
+                self.stats['upserted'] += 1
+                self.time_to_searchable.append(now - self.scraped_at.pop(entry["id"], now))
+            else:
+                self.stats['failed'] += 1
+        self.upserted_journal.sync()
+        print(f"[pipeline {self.name}] {self.stats['upserted']} upserted, {self.stats['summarized']} summarized, "
+              f"{self.stats['scraped']} scraped")
+
+    def remove(self, records):
+        """Delete the index (and snapshot) entries of records that disappeared from their source"""
+        if not records:
+            return 0
+        ids = list(dict.fromkeys(record_ids(pd.DataFrame(records), self.content_type)))
+        for start in range(0, len(ids), 1000):
+            self.index.delete(ids=ids[start:start + 1000])
+        print(f"[pipeline {self.name}] removed {len(ids)} records no longer listed")
+        if os.path.exists(os.path.join(self.snapshot_path, 'manifest.json')):
+            update_snapshot(self.snapshot_path, removed_ids=ids)
+        return len(ids)
+
+    def _update_snapshot(self, fetch_batch_size=100):
+        """Merge this run's upserts into the index's snapshot, so snapshot serving sees streamed records"""
+        if not self.upserted:
+            self.delta.abort()
+            return
+        # Upserted by an interrupted earlier run: in the journal but never snapshotted
+        missing = [row_id for row_id in self.upserted if row_id not in self.snapshotted]
+        for start in range(0, len(missing), fetch_batch_size):
+            fetched = self.index.fetch(ids=missing[start:start + fetch_batch_size], namespace="ns1")['vectors']
+            self.delta.add([
+                {"id": id, "values": list(v.values), "metadata": getattr(v, 'metadata', None) or {}}
+                for id, v in fetched.items()
+            ])
+        delta_path = self.delta.close()
+        try:
+            if os.path.exists(os.path.join(self.snapshot_path, 'manifest.json')):
+                update_snapshot(self.snapshot_path, Snapshot(delta_path))
+            else:
+                print(f"[pipeline {self.name}] no snapshot of {self.generator.index_name} yet; exporting the whole index")
+                export_index(self.generator.pc, self.generator.index_name, self.snapshot_path)
+        finally:
+            shutil.rmtree(delta_path, ignore_errors=True)
+
+    def report(self):
+        """Print record counts, time-to-searchable percentiles and the completion engine's report"""
+        elapsed = time.monotonic() - self.started
+        latencies = np.asarray(self.time_to_searchable)
+        p50, p90 = np.percentile(latencies, [50, 90]) if len(latencies) else (0.0, 0.0)
+        print(
+            f"[pipeline {self.name}] {self.stats['scraped']} scraped ({self.stats['skipped']} already indexed), "
+            f"{self.stats['summarized']} summarized, {self.stats['upserted']} upserted, {self.stats['failed']} failed "
+            f"in {elapsed:.1f}s; time to searchable p50={p50:.1f}s p90={p90:.1f}s"
+        )
+        self.engine.report(label=self.content_type)
+        return dict(self.stats, elapsed=elapsed, time_to_searchable_p50=float(p50), time_to_searchable_p90=float(p90))
+
+def load_scraper(name):
+    module_name, class_name = SCRAPERS[name].rsplit('.', 1)
+    return getattr(importlib.import_module(module_name), class_name)()
+
+if __name__ == "__main__":
+    """
+    python -m main.services.pipeline tech --scraper stanford --limit 2
+    python -m main.services.pipeline tech --file data/tech/stanford_2024_11_24.parquet --index tech
+    """
+    import dotenv
+    from main.services.index_aliases import IndexAliasResolver
+    from scrapers.incremental import ScrapeState
+    dotenv.load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Stream records from a scraper or file into a live index")
+    parser.add_argument('content_type', choices=['tech', 'grants'])
+    sources = parser.add_mutually_exclusive_group(required=True)
+    sources.add_argument('--scraper', choices=sorted(SCRAPERS))
+    sources.add_argument('--file', help="existing Parquet/CSV record file")
+    parser.add_argument('--index', help="index or alias to upsert into (default: the content type's alias)")
+    parser.add_argument('--name', help="checkpoint name (default: scraper or file name)")
+    parser.add_argument('--limit', type=int, help="page limit passed to the scraper")
+    parser.add_argument('--incremental', action='store_true',
+                        help="only stream listings that are new or changed since the last incremental run, "
+                             "and delete ones that disappeared")
+    parser.add_argument('--output', help="also write the summarized records to this Parquet file")
+    parser.add_argument('--scrape-concurrency', type=int, default=10)
+    parser.add_argument('--summarize-workers', type=int, default=16)
+    parser.add_argument('--embed-workers', type=int, default=2)
+    parser.add_argument('--queue-size', type=int, default=64)
+    parser.add_argument('--embed-batch-size', type=int, default=32)
+    parser.add_argument('--flush-seconds', type=float, default=5.0)
+    args = parser.parse_args()
+
+    index_name = IndexAliasResolver().resolve(args.index or args.content_type)
+    generator = EmbeddingsGenerator(data_path=None, index_name=index_name)
+    generator.setup()
+
+    async def main():
+        state = None
+        if args.scraper:
+            scraper = load_scraper(args.scraper)
+            state = ScrapeState.for_scraper(type(scraper).__name__) if args.incremental else None
+            source = scraper_source(scraper, args.limit, args.scrape_concurrency, state)
+        else:
+            source = file_source(args.file)
+        pipeline = StreamingPipeline(
+            args.name or args.scraper or os.path.splitext(os.path.basename(args.file))[0],
+            args.content_type, generator,
+            summarize_workers=args.summarize_workers, embed_workers=args.embed_workers,
+            queue_size=args.queue_size, embed_batch_size=args.embed_batch_size,
+            flush_seconds=args.flush_seconds, output_path=args.output
+        )
+        stats = await pipeline.run(source)
+        if state is not None:
+            pipeline.remove(state.changes.removed)
+            # A failed record must be seen as changed again next run
+            if not stats['failed']:
+                state.save()
+
+    print(f"Streaming {args.content_type} records into '{index_name}'...")
+    asyncio.run(main())
@@ -0,0 +1,92 @@
+import os
+import numpy as np
+
+# Rows processed at once when encoding or scanning codes; small enough that the
+# float32 scratch copy of a chunk (8 MB at 1024 dims) stays in cache
+CHUNK_ROWS = 2048
+
+class ScalarQuantizer:
+    """Per-dimension int8 quantization: x ~= offset + scale * (code + 128).
+
+    Queries are folded into the same space (q * scale) and quantized with one
+    symmetric scale, so candidate scores are int8 x int8 dot products.
+    """
+
+    def __init__(self, offset, scale):
+        self.offset = np.asarray(offset, dtype=np.float32)
+        self.scale = np.asarray(scale, dtype=np.float32)
+
+    @classmethod
+    def fit(cls, vectors):
+        low = np.full(vectors.shape[1], np.inf, dtype=np.float32)
+        high = np.full(vectors.shape[1], -np.inf, dtype=np.float32)
+        for start in range(0, len(vectors), CHUNK_ROWS):
+            chunk = np.asarray(vectors[start:start + CHUNK_ROWS], dtype=np.float32)
+            low = np.minimum(low, chunk.min(axis=0))
+            high = np.maximum(high, chunk.max(axis=0))
+        scale = (high - low) / 255.0
+        scale[scale == 0] = 1.0
+        return cls(low, scale)
+
+    def encode(self, vectors):
+        """int8 codes for a float matrix, converted chunk by chunk"""
+        codes = np.empty(vectors.shape, dtype=np.int8)
+        for start in range(0, len(vectors), CHUNK_ROWS):
+            chunk = np.asarray(vectors[start:start + CHUNK_ROWS], dtype=np.float32)
+            levels = np.rint((chunk - self.offset) / self.scale)
+            codes[start:start + len(chunk)] = (np.clip(levels, 0, 255) - 128).astype(np.int8)
+        return codes
+
+    def decode(self, codes):
+        return self.offset + self.scale * (codes.astype(np.float32) + 128)
+
+    def scores(self, codes, query):
+        """Approximate dot products of every coded row with a float query"""
+        query = np.asarray(query, dtype=np.float32)
+        folded = query * self.scale
+        query_scale = max(float(np.abs(folded).max()) / 127.0, 1e-12)
+        query_codes = np.rint(folded / query_scale).astype(np.float32)
+        # offset.q and the +128 shift are the same for every row
+        constant = float(self.offset @ query) + 128.0 * query_scale * float(query_codes.sum())
+        dots = np.empty(len(codes), dtype=np.float32)
+        for start in range(0, len(codes), CHUNK_ROWS):
+            # Integer-valued operands; |sum| < 2**24 over 1024 dims, so float32 BLAS is exact
+            chunk = codes[start:start + CHUNK_ROWS].astype(np.float32)
+            dots[start:start + len(chunk)] = chunk @ query_codes
+        return dots * query_scale + constant
+
+    def save(self, path):
+        np.savez(path, offset=self.offset, scale=self.scale)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data['offset'], data['scale'])
+
+def _write_atomically(path, write):
+    """Call write(file) on a temporary file and move it to path, so readers never see a partial file"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            write(f)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def quantize_snapshot(path, vectors):
+    """Write vectors.int8.npy, norms.npy and quantizer.npz next to a snapshot's vectors.npy.
+
+    Each file is replaced atomically and quantizer.npz goes last, so its
+    presence means the other two are complete.
+    """
+    quantizer = ScalarQuantizer.fit(vectors)
+    norms = np.concatenate([
+        np.linalg.norm(np.asarray(vectors[start:start + CHUNK_ROWS], dtype=np.float32), axis=1)
+        for start in range(0, len(vectors), CHUNK_ROWS)
+    ]) if len(vectors) else np.empty(0, dtype=np.float32)
+    _write_atomically(os.path.join(path, 'vectors.int8.npy'), lambda f: np.save(f, quantizer.encode(vectors)))
+    _write_atomically(os.path.join(path, 'norms.npy'), lambda f: np.save(f, norms.astype(np.float32)))
+    _write_atomically(os.path.join(path, 'quantizer.npz'), quantizer.save)
+    print(f"Quantized {len(vectors)} vectors in {path}")
+    return quantizer
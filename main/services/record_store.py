@@ -0,0 +1,148 @@
+import csv
+import os
+import sys
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from main.constants.record_schema import RECORD_SCHEMAS
+
+# Arrow strings map straight onto pandas' Arrow-backed string dtype (no per-value copies)
+_TYPES_MAPPER = {pa.string(): pd.StringDtype("pyarrow"), pa.large_string(): pd.StringDtype("pyarrow")}.get
+
+def clean_text(text):
+    """Normalize scraped text: straight quotes, no carriage returns or null bytes.
+
+    Parquet stores newlines and quotes as-is, so no CSV escaping happens here;
+    export_csv quotes fields properly when a human-readable copy is needed.
+    """
+    if not isinstance(text, str):
+        return text
+    text = text.replace('“', '"').replace('”', '"')
+    text = text.replace('‘', "'").replace('’', "'")
+    text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return text.replace('\x00', '')
+
+def is_parquet(path):
+    return str(path).endswith('.parquet')
+
+def record_schema(columns, record_type):
+    """The shared schema for record_type, with any other columns kept as trailing string fields"""
+    schema = RECORD_SCHEMAS[record_type]
+    extra = [str(column) for column in columns if str(column) not in schema.names]
+    for name in extra:
+        schema = schema.append(pa.field(name, pa.string()))
+    return schema
+
+def to_table(records, record_type, schema=None):
+    """Build an all-string Arrow table: the shared schema's columns (null when missing) plus any extra ones.
+
+    With an explicit schema (e.g. the one a file was opened with), columns
+    outside it raise instead of being dropped.
+    """
+    df = records if isinstance(records, pd.DataFrame) else pd.DataFrame(list(records))
+    df = df.rename(columns=str)
+    if schema is None:
+        schema = record_schema(df.columns, record_type)
+    else:
+        unknown = [column for column in df.columns if column not in schema.names]
+        if unknown:
+            raise ValueError(f"Columns {unknown} are not in the file's schema ({schema.names})")
+    arrays = []
+    for field in schema:
+        if field.name in df.columns:
+            column = df[field.name].astype("string").array
+            arrays.append(pa.array(column, type=pa.string(), from_pandas=True))
+        else:
+            arrays.append(pa.nulls(len(df), type=pa.string()))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+def write_records(records, path, record_type):
+    """Write records as zstd-compressed Parquet (atomically) or, for a .csv path, as a quoted CSV"""
+    table = to_table(records, record_type)
+    if not is_parquet(path):
+        table.to_pandas().to_csv(path, index=False, quoting=csv.QUOTE_ALL)
+        return path
+    tmp_path = f"{path}.tmp"
+    pq.write_table(table, tmp_path, compression='zstd')
+    os.replace(tmp_path, path)
+    return path
+
+def write_record_batches(batches, path, record_type):
+    """Write an iterable of record batches (DataFrames or lists of dicts) one row group at a time.
+
+    Only one batch is held in memory; like write_records the file appears
+    atomically, and a .csv path gets a quoted CSV. Extra columns are taken
+    from the first batch; a later batch with other columns raises.
+    Returns the row count.
+    """
+    tmp_path = f"{path}.tmp"
+    rows = 0
+    writer = None
+    try:
+        schema = None
+        for batch in batches:
+            table = to_table(batch, record_type, schema)
+            schema = table.schema
+            if is_parquet(path):
+                if writer is None:
+                    writer = pq.ParquetWriter(tmp_path, table.schema, compression='zstd')
+                writer.write_table(table)
+            else:
+                table.to_pandas().to_csv(tmp_path, mode='a' if rows else 'w', header=not rows,
+                                         index=False, quoting=csv.QUOTE_ALL)
+            rows += table.num_rows
+        if is_parquet(path):
+            if writer is None:
+                writer = pq.ParquetWriter(tmp_path, RECORD_SCHEMAS[record_type], compression='zstd')
+            writer.close()
+            writer = None
+        elif not rows:
+            to_table([], record_type).to_pandas().to_csv(tmp_path, index=False, quoting=csv.QUOTE_ALL)
+    except BaseException:
+        if writer is not None:
+            writer.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, path)
+    return rows
+
+def read_records(path, columns=None, nrows=None):
+    """Read a Parquet or legacy CSV record file into a DataFrame, optionally projecting columns"""
+    if is_parquet(path):
+        table = pq.read_table(path, columns=columns, memory_map=True)
+        if nrows is not None:
+            table = table.slice(0, nrows)
+        return table.to_pandas(types_mapper=_TYPES_MAPPER)
+    return pd.read_csv(
+        path,
+        usecols=columns,
+        nrows=nrows,
+        skipinitialspace=True,
+        skip_blank_lines=True,
+        encoding='utf-8',
+        on_bad_lines='warn'
+    )
+
+def record_columns(path):
+    """Column names of a record file without reading its rows"""
+    if is_parquet(path):
+        return pq.read_schema(path).names
+    return list(pd.read_csv(path, nrows=0, skipinitialspace=True, encoding='utf-8').columns)
+
+def iter_record_batches(path, columns=None, batch_size=1000):
+    """Stream a Parquet file as DataFrames of at most batch_size rows"""
+    parquet_file = pq.ParquetFile(path, memory_map=True)
+    for batch in parquet_file.iter_batches(batch_size=batch_size, columns=columns):
+        yield batch.to_pandas(types_mapper=_TYPES_MAPPER)
+
+def export_csv(path, csv_path=None):
+    """Write a human-readable CSV copy of a Parquet record file"""
+    csv_path = csv_path or path[:-len('.parquet')] + '.csv'
+    pq.read_table(path).to_pandas().to_csv(csv_path, index=False, quoting=csv.QUOTE_ALL)
+    print(f"Exported {path} -> {csv_path}")
+    return csv_path
+
+if __name__ == "__main__":
+    # python -m main.services.record_store data/tech/stanford_2024_11_24.parquet [out.csv]
+    export_csv(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)
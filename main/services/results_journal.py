@@ -0,0 +1,53 @@
+import json
+import os
+
+class ResultsJournal:
+    """Append-only JSON-lines journal of per-row results keyed by stable id.
+
+    Results are appended as they arrive and fsynced in batches, so a crash
+    loses at most the unsynced tail; a torn last line is ignored on load.
+    Later entries for an id replace earlier ones.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+        self._unsynced = 0
+
+    def load(self):
+        """{id: entry} for every complete line in the journal"""
+        entries = {}
+        if not os.path.exists(self.path):
+            return entries
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # torn write from an interrupted run
+                entries[entry["id"]] = entry
+        return entries
+
+    def append(self, entry):
+        if self._file is None:
+            self._file = open(self.path, 'a', encoding='utf-8')
+        self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._unsynced += 1
+
+    def sync(self):
+        """Flush appended entries to disk"""
+        if self._file is not None and self._unsynced:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+
+    def close(self):
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+            self._file = None
+
+    def remove(self):
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
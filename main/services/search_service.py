@@ -8,24 +8,60 @@ import numpy as np
 import os
 import asyncio
 from dotenv import load_dotenv
-from main.constants.pinecone_indexes import INDEX_ALIASES
-from main.constants.results_blacklist import GRANTS_BLACKLIST, TECH_BLACKLIST
+from main.constants.results_blacklist import TECH_BLACKLIST
+from main.services.document_ids import resolve_grants_blacklist
+from main.services.index_aliases import IndexAliasResolver
+from main.services.embedding_backends import get_embedder
 class SemanticSearch:
-    def __init__(self, index_name='tech', top_k=20):
+    def __init__(self, index_name='tech', top_k=20, alias_check_interval=5, pc=None):
         # Load environment variables
         load_dotenv()
-        self.pc = Pinecone(api_key=os.getenv('PINECONE_API_KEY'))
+        # pc can be a LocalPinecone to serve from index snapshots
+        self.pc = pc or Pinecone(api_key=os.getenv('PINECONE_API_KEY'))
+        # Query embeddings: Pinecone inference, or a local model when LOCAL_EMBED_MODEL_PATH is set
+        self.embedder = get_embedder(self.pc)
 
-        self.index_aliases = INDEX_ALIASES
+        self.index_aliases = IndexAliasResolver(check_interval=alias_check_interval)
+        self.index_handles = {}  # actual index name -> warmed Index handle
         self.index_name = index_name
+        self.actual_index_name = None
         self.index = self.set_index(index_name)  # This line is fixed
         
         self.top_k = top_k
+        self.blacklists = {}  # index name -> lowercased ids hidden from its results
+
+    def blacklist(self, index_name):
+        """Ids hidden from index_name's results; legacy grant ids are resolved on first use"""
+        if index_name not in self.blacklists:
+            ids = resolve_grants_blacklist(self.pc) if index_name == 'grants' else TECH_BLACKLIST if index_name == 'tech' else []
+            self.blacklists[index_name] = {str(id).strip().lower() for id in ids}
+        return self.blacklists[index_name]
 
     def set_index(self, index_name):
         self.index_name = index_name
-        actual_index_name = self.index_aliases.get(index_name, index_name)
-        self.index = self.pc.Index(actual_index_name)
+        self.actual_index_name = self.index_aliases.resolve(index_name)
+        self.index = self._get_handle(self.actual_index_name)
+        return self.index
+
+    def _get_handle(self, actual_index_name):
+        """Return a cached Index handle, warming the connection before first use"""
+        if actual_index_name not in self.index_handles:
+            index = self.pc.Index(actual_index_name)
+            try:
+                index.describe_index_stats()
+            except Exception as e:
+                print(f"Error warming index {actual_index_name}: {e}")
+            self.index_handles[actual_index_name] = index
+        return self.index_handles[actual_index_name]
+
+    def refresh_index(self):
+        """Follow alias swaps made by index builds without restarting the worker"""
+        actual_index_name = self.index_aliases.resolve(self.index_name)
+        if actual_index_name != self.actual_index_name:
+            # Warm the new handle before requests are routed to it
+            index = self._get_handle(actual_index_name)
+            print(f"Alias '{self.index_name}' moved from {self.actual_index_name} to {actual_index_name}")
+            self.index, self.actual_index_name = index, actual_index_name
         return self.index
 
     async def search(self, query, category_filter=None):
@@ -34,8 +70,10 @@ class SemanticSearch:
         - university
         - agency code
         """
+        self.refresh_index()
+
         # Perform initial retrieval using embeddings
-        embedding = self.pc.inference.embed(
+        embedding = self.embedder.embed(
             model="multilingual-e5-large",
             inputs=[query],
             parameters={"input_type": "query"}
@@ -54,7 +92,7 @@ class SemanticSearch:
 
         results = self.index.query(
             namespace="ns1",
-            vector=embedding[0].values,
+            vector=embedding[0]['values'],
             top_k=self.top_k,  # Changed from self.top_k * 5 to just self.top_k
             include_values=False, 
             include_metadata=True, 
@@ -67,17 +105,12 @@ class SemanticSearch:
             match['metadata'] = match['metadata']
             match['relevance_score'] = match['score']  # Use the original similarity score
 
-        # Filter out blacklisted results - fixing the blacklist check
-        if self.index_name == 'grants':
-            results['matches'] = [
-                match for match in results['matches'] 
-                if str(match['id']).strip().lower() not in {str(id).strip().lower() for id in GRANTS_BLACKLIST}
-            ]
-        elif self.index_name == 'tech':
-            results['matches'] = [
-                match for match in results['matches'] 
-                if str(match['id']).strip().lower() not in {str(id).strip().lower() for id in TECH_BLACKLIST}
-            ]
+        # Filter out blacklisted results
+        blacklist = self.blacklist(self.index_name)
+        results['matches'] = [
+            match for match in results['matches']
+            if str(match['id']).strip().lower() not in blacklist
+        ]
         
         return results['matches']
 
@@ -87,6 +120,7 @@ class SemanticSearch:
 
     def get_by_id(self, id):
         """Fetch a specific document by its ID"""
+        self.refresh_index()
         try:
             response = self.index.fetch(ids=[id], namespace="ns1")
             if not response or not response.get('vectors'):
@@ -1,58 +1,59 @@
-import openai
+import asyncio
+import json
+import time
 import pandas as pd
 from dotenv import load_dotenv
 import os
-import csv
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from main.services.record_store import read_records, write_records
+from main.services.completion_engine import CompletionEngine, estimate_cost
+from main.services.llm_cache import LLMCache, cache_key
+from main.services.batch_client import OpenAIBatchClient, BATCH_DONE_STATUSES
+from main.services.document_ids import record_ids
+from main.services.results_journal import ResultsJournal
+from main.services.tokens import truncate_to_tokens
 
 load_dotenv()
 
-openai.api_key = os.getenv('OPENAI_API_KEY')
+SUMMARY_MODEL = "gpt-4o-mini-2024-07-18"
+# Description budgets (prompt tokens) for the summary and teaser prompts
+SUMMARY_INPUT_TOKENS = int(os.getenv('SUMMARY_INPUT_TOKENS', '400'))
+TEASER_INPUT_TOKENS = int(os.getenv('TEASER_INPUT_TOKENS', '125'))
+# One JSON line of telemetry (requests, tokens, latency, retries, cost) per summarization run
+SUMMARY_TELEMETRY_PATH = os.getenv('SUMMARY_TELEMETRY_PATH', 'data/summarization_runs.jsonl')
 
-def truncate_text(text, max_length=1500):
-    """Truncate text to a maximum length."""
-    return text if len(text) <= max_length else text[:max_length] + '...'
+def truncate_text(text, max_tokens=SUMMARY_INPUT_TOKENS):
+    """Truncate text to a token budget, at a sentence boundary where possible."""
+    return truncate_to_tokens(text, max_tokens, SUMMARY_MODEL)
 
-def summarize_text(text, title, content_type='tech', max_tokens=900):
+def brief_description_prompt(title, content_type='tech'):
+    if content_type.lower() == 'grants':
+        return f"In 15 words or less, what might this grant titled '{title}' be related to? Start with 'supporting' or 'funding'"
+    return f"In 15 words or less, what might this technology titled '{title}' be able to do? Start with a verb"
+
+def title_only_summary(brief_desc, content_type='tech'):
+    """Summary for rows without a description, built around a brief description of the title"""
+    if content_type.lower() == 'grants':
+        return (
+            "The sponsoring grant agency did not provide a description. "
+            f"Based on the title, this grant is likely {brief_desc}\n\n"
+            "For more detailed information about funding objectives, eligibility requirements, "
+            "and award amounts, please reach out to learn more about this opportunity."
+        )
+    return (
+        "The institution which posted this technology did not provide a description. "
+        f"Based on the title, this technology likely can {brief_desc}.\n\n"
+        "If you would like to learn more about the specific capabilities, technical details, "
+        "and potential applications of this technology, please reach out to us."
+    )
+
+async def summarize_text(engine, text, title, content_type='tech', max_tokens=900):
     print(f"\nProcessing summary for: {title[:50]}...")
     
     if not text.strip() or len(text) < 30:
         print("Short/empty text detected - generating brief description from title")
-        # Handle cases with only title
-        if content_type.lower() == 'grants':
-            # Get a brief description from the title using GPT
-            brief_desc = openai.chat.completions.create(
-                model="gpt-4o-mini-2024-07-18",
-                messages=[{
-                    "role": "user",
-                    "content": f"In 15 words or less, what might this grant titled '{title}' be related to? Start with 'supporting' or 'funding'"
-                }],
-                max_tokens=30
-            ).choices[0].message.content.strip()
-            
-            return (
-                "The sponsoring grant agency did not provide a description. "
-                f"Based on the title, this grant is likely {brief_desc}\n\n"
-                "For more detailed information about funding objectives, eligibility requirements, "
-                "and award amounts, please reach out to learn more about this opportunity."
-            )
-        else:  # tech case
-            # Get a brief description from the title using GPT
-            brief_desc = openai.chat.completions.create(
-                model="gpt-4o-mini-2024-07-18",
-                messages=[{
-                    "role": "user",
-                    "content": f"In 15 words or less, what might this technology titled '{title}' be able to do? Start with a verb"
-                }],
-                max_tokens=30
-            ).choices[0].message.content.strip()
-            
-            return (
-                "The institution which posted this technology did not provide a description. "
-                f"Based on the title, this technology likely can {brief_desc}.\n\n"
-                "If you would like to learn more about the specific capabilities, technical details, "
-                "and potential applications of this technology, please reach out to us."
-            )
+        # Handle cases with only title: get a brief description from the title using GPT
+        brief_desc = await engine.complete(brief_description_prompt(title, content_type), max_tokens=30)
+        return title_only_summary(brief_desc, content_type)
 
     # Truncate the text to a reasonable length
     text = truncate_text(text)
@@ -83,17 +84,9 @@ def summarize_text(text, title, content_type='tech', max_tokens=900):
             f"Here is the technology description: {text}"
         )
 
-    response = openai.chat.completions.create(
-        model="gpt-4o-mini-2024-07-18",
-        messages=[{
-            "role": "user",
-            "content": prompt
-        }],
-        max_tokens=max_tokens
-    )
-    return response.choices[0].message.content.strip()
+    return await engine.complete(prompt, max_tokens=max_tokens)
 
-def generate_teaser(title, text, max_tokens=100):
+async def generate_teaser(engine, title, text, max_tokens=100):
     print(f"\nGenerating teaser for: {title[:50]}...")
     
     if not text.strip() or len(text) < 30:
@@ -107,21 +100,13 @@ def generate_teaser(title, text, max_tokens=100):
         )
     else:
         prompt = (
-            f"Create a brief, factual summary for: '{title}', and the following text: {truncate_text(text, max_length=500)}"
+            f"Create a brief, factual summary for: '{title}', and the following text: {truncate_text(text, TEASER_INPUT_TOKENS)}"
             "Focus only on the clearly stated information in the text. "
             "Avoid speculation. Two sentences max."
             "Do not restate the title in the summary."
         )
 
-    response = openai.chat.completions.create(
-        model="gpt-4o-mini-2024-07-18",
-        messages=[{
-            "role": "user",
-            "content": prompt
-        }],
-        max_tokens=max_tokens
-    )
-    return response.choices[0].message.content.strip()
+    return await engine.complete(prompt, max_tokens=max_tokens)
 
 def clean_text(text):
     """Clean text by removing excessive whitespace and normalizing line breaks."""
@@ -139,66 +124,8 @@ def clean_text(text):
     
     return text
 
-def process_batch(rows, title_col, description_col, content_type):
-    """Process a batch of rows in parallel"""
-    results = []
-    with ThreadPoolExecutor() as executor:
-        # Submit summary tasks
-        summary_futures = {
-            executor.submit(summarize_text, row[description_col], row[title_col], content_type): row
-            for _, row in rows.iterrows()
-        }
-        
-        # Submit teaser tasks
-        teaser_futures = {
-            executor.submit(generate_teaser, row[title_col], row[description_col]): row
-            for _, row in rows.iterrows()
-        }
-        
-        # Collect summary results
-        summaries = {}
-        for future in as_completed(summary_futures):
-            row = summary_futures[future]
-            try:
-                summaries[row.name] = future.result()
-            except Exception as e:
-                print(f"Error processing summary for row {row.name}: {e}")
-                summaries[row.name] = None
-
-        # Collect teaser results
-        teasers = {}
-        for future in as_completed(teaser_futures):
-            row = teaser_futures[future]
-            try:
-                teasers[row.name] = future.result()
-            except Exception as e:
-                print(f"Error processing teaser for row {row.name}: {e}")
-                teasers[row.name] = None
-
-        # Combine results
-        for idx, row in rows.iterrows():
-            results.append({
-                'index': idx,
-                'summary': summaries.get(idx),
-                'teaser': teasers.get(idx)
-            })
-    
-    return results
-
-def process_csv(input_csv_path, output_csv_path, content_type='tech', limit=None, batch_size=5):
-    print(f"Starting to process CSV file: {input_csv_path}")
-    
-    # Load the CSV file
-    df = pd.read_csv(input_csv_path, 
-                     skipinitialspace=True,
-                     skip_blank_lines=True,
-                     encoding='utf-8',
-                     on_bad_lines='skip',
-                     nrows=limit)
-    print(f"Loaded {len(df)} rows from CSV")
-
-    # Clean column names and find correct columns
-    df.columns = df.columns.str.strip()
+def find_text_columns(df):
+    """(title column, description column) of a tech or grants record frame"""
     title_patterns = ['OPPORTUNITY TITLE', 'TITLE']
     desc_patterns = ['DESCRIPTION']
     
@@ -209,52 +136,418 @@ def process_csv(input_csv_path, output_csv_path, content_type='tech', limit=None
 
     if not title_col or not description_col:
         raise ValueError(f"Could not find required columns. Available columns: {df.columns.tolist()}")
+    return title_col, description_col
+
+# Structured-output fields of the combined summary, with the headers they are rendered under
+SUMMARY_SECTIONS = {
+    'tech': [
+        ("summary", "Summary"),
+        ("applications", "Applications"),
+        ("problem_solved", "Problem Solved"),
+    ],
+    'grants': [
+        ("description", "Description"),
+        ("research_objectives", "Research Objectives"),
+        ("expected_outcomes", "Expected Outcomes"),
+        ("application_considerations", "Application Considerations"),
+    ],
+}
+
+def structured_response_format(fields):
+    """Strict JSON schema response format: every field a required string"""
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "summary_and_teaser",
+            "strict": True,
+            "schema": {
+                "type": "object",
+                "properties": {field: {"type": "string"} for field in fields},
+                "required": list(fields),
+                "additionalProperties": False,
+            },
+        },
+    }
+
+def parse_structured(content, fields):
+    """The fields of a JSON response that validate (non-empty strings); {} when it is not JSON"""
+    try:
+        data = json.loads(content)
+    except (TypeError, ValueError):
+        return {}
+    if not isinstance(data, dict):
+        return {}
+    return {field: data[field].strip() for field in fields if isinstance(data.get(field), str) and data[field].strip()}
+
+async def summarize_combined(engine, text, title, content_type='tech', max_tokens=1000):
+    """Summary and teaser from one structured completion.
+
+    Returns (summary, teaser); a part is None when its fields fail
+    validation, so the caller only re-requests that part.
+    """
+    print(f"\nProcessing summary and teaser for: {title[:50]}...")
+    kind = 'grants' if content_type.lower() == 'grants' else 'tech'
+
+    if not text.strip() or len(text) < 30:
+        print("Short/empty text detected - generating brief description and teaser from title")
+        prompt = (
+            f"{brief_description_prompt(title, content_type)}. Put that in brief_description. "
+            f"In teaser, create a very brief, factual summary based only on the title: '{title}'. "
+            "Do not make assumptions beyond what the title directly implies. "
+            "If the title is not descriptive enough, return a conservative statement. "
+            "Do not restate the title in the summary."
+        )
+        fields = ["brief_description", "teaser"]
+        content = await engine.complete(prompt, max_tokens=130, response_format=structured_response_format(fields))
+        parsed = parse_structured(content, fields)
+        summary = title_only_summary(parsed["brief_description"], content_type) if "brief_description" in parsed else None
+        return summary, parsed.get("teaser")
+
+    noun = "grant" if kind == 'grants' else "technology"
+    sections = SUMMARY_SECTIONS[kind]
+    prompt = (
+        f"Given the {noun} titled '{title}', provide a factual summary based only on the available information. "
+        "If certain aspects are not mentioned, make reasonable, but conservative assumptions and fill out the summary accordingly. "
+        "If this is not possible, indicate 'Information not provided'. Use only sentences, no lists or other formatting. "
+        "Do not restate the title in the summary. "
+        f"Write the summary in these fields: {', '.join(field for field, _ in sections)}. "
+        "In teaser, write a brief, factual summary focused only on the clearly stated information in the text. "
+        "Avoid speculation. Two sentences max. Do not restate the title in the teaser.\n\n"
+        f"Here is the {noun} description: {truncate_text(text)}"
+    )
+    fields = [field for field, _ in sections] + ["teaser"]
+    content = await engine.complete(prompt, max_tokens=max_tokens, response_format=structured_response_format(fields))
+    parsed = parse_structured(content, fields)
+    summary = None
+    if all(field in parsed for field, _ in sections):
+        # Same layout the separate summary prompt asks for: header and text on one line
+        summary = "\n\n".join(f"**{header}:** {parsed[field]}" for field, header in sections)
+    return summary, parsed.get("teaser")
+
+async def summarize_row(engine, title, description, content_type, combined=False):
+    """Summary and teaser for one row; a failed call leaves its field as None.
+
+    combined asks for both in one structured completion and only falls back
+    to the separate prompts for the part that did not validate.
+    """
+    summary = teaser = None
+    if combined:
+        try:
+            summary, teaser = await summarize_combined(engine, description, title, content_type)
+        except Exception as e:
+            print(f"Error processing combined summary for '{title[:50]}': {e}")
+
+    calls = {}
+    if summary is None:
+        calls['summary'] = summarize_text(engine, description, title, content_type)
+    if teaser is None:
+        calls['teaser'] = generate_teaser(engine, title, description)
+    results = await asyncio.gather(*calls.values(), return_exceptions=True)
+    for name, result in zip(calls, results):
+        if isinstance(result, Exception):
+            print(f"Error processing {name} for '{title[:50]}': {result}")
+            result = None
+        if name == 'summary':
+            summary = result
+        else:
+            teaser = result
+    return summary, teaser
+
+async def process_csv_async(input_csv_path, output_csv_path, content_type='tech', limit=None,
+                            engine=None, window=None, sync_every=20, combined=True):
+    print(f"Starting to process CSV file: {input_csv_path}")
+    
+    # Load the Parquet (or legacy CSV) file
+    df = read_records(input_csv_path, nrows=limit)
+    print(f"Loaded {len(df)} rows from {input_csv_path}")
+
+    # Clean column names and find correct columns
+    df.columns = df.columns.str.strip()
+    title_col, description_col = find_text_columns(df)
+    ids = record_ids(df, content_type)
 
-    # Check if output file exists and load previous progress
+    # Results are appended to a journal keyed by stable row id while the run
+    # is in progress; the output file is written once at the end.
+    journal = ResultsJournal(f"{output_csv_path}.journal")
+    results = journal.load()
     if os.path.exists(output_csv_path):
-        existing_df = pd.read_csv(output_csv_path)
-        # Find which rows have already been processed - using the correct title column name
-        processed_titles = set(existing_df[existing_df['LLM Summary'].notna()][title_col])
-        df = df[~df[title_col].isin(processed_titles)]
-        print(f"Resuming from previous progress. {len(processed_titles)} rows already processed")
-        result_df = existing_df
-    else:
-        result_df = df.copy()
+        # Rows summarized by an earlier, completed run
+        existing_df = read_records(output_csv_path)
+        existing_df.columns = existing_df.columns.str.strip()
+        if 'LLM Summary' in existing_df.columns:
+            for row_id, summary, teaser in zip(
+                record_ids(existing_df, content_type),
+                existing_df['LLM Summary'].tolist(),
+                existing_df.get('LLM Teaser', pd.Series(index=existing_df.index, dtype=object)).tolist()
+            ):
+                if pd.notna(summary) and row_id not in results:
+                    results[row_id] = {"id": row_id, "summary": summary, "teaser": teaser if pd.notna(teaser) else None}
+    done = {row_id for row_id, entry in results.items() if entry.get("summary") and entry.get("teaser")}
+    todo = ~ids.isin(done)
+    if len(df) - int(todo.sum()):
+        print(f"Resuming from previous progress. {len(df) - int(todo.sum())} rows already processed")
 
     print(f"Using columns: {title_col} and {description_col}")
 
-    # Clean the description column in place
-    df[description_col] = df[description_col].apply(clean_text)
-    
-    # Process in batches
-    for start_idx in range(0, len(df), batch_size):
-        end_idx = min(start_idx + batch_size, len(df))
-        print(f"\nProcessing batch {start_idx//batch_size + 1} (rows {start_idx+1} to {end_idx})")
-        
-        batch_df = df.iloc[start_idx:end_idx]
-        results = process_batch(batch_df, title_col, description_col, content_type)
-        
-        # Update result_df with batch results
-        for result in results:
-            idx = result['index']
-            # Copy all columns from the input dataframe for this row
-            for col in df.columns:
-                result_df.at[idx, col] = df.at[idx, col]
-            # Add the summary and teaser
-            if result['summary']:
-                result_df.at[idx, 'LLM Summary'] = result['summary']
-            if result['teaser']:
-                result_df.at[idx, 'LLM Teaser'] = result['teaser']
-        
-        # Save progress after each batch
-        result_df.to_csv(output_csv_path, index=False, quoting=csv.QUOTE_ALL)
-        print(f"Saved progress for batch {start_idx//batch_size + 1}")
-
-    print("Processing complete!")
+    # Clean the description column (missing values become empty strings)
+    titles = df.loc[todo, title_col].fillna("")
+    descriptions = df.loc[todo, description_col].fillna("").apply(clean_text)
+
+    # One engine for the whole file: its concurrency and rate limits are global.
+    # Rows are kept in a sliding window, so a slow call never holds up the rest.
+    engine = engine or CompletionEngine(model=SUMMARY_MODEL, cache=LLMCache())
+    window = window or engine.max_concurrency
+    mark = engine.mark()
+    rows = zip(ids[todo].tolist(), titles.tolist(), descriptions.tolist())
+    pending = {}
+    completed = 0
+
+    try:
+        while True:
+            for row_id, title, description in rows:
+                pending[asyncio.create_task(summarize_row(engine, title, description, content_type, combined))] = row_id
+                if len(pending) >= window:
+                    break
+            if not pending:
+                break
+
+            finished, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in finished:
+                row_id = pending.pop(task)
+                summary, teaser = task.result()
+                entry = {"id": row_id, "summary": summary, "teaser": teaser}
+                journal.append(entry)
+                results[row_id] = entry
+                completed += 1
+
+                if completed % sync_every == 0:
+                    journal.sync()
+                    print(f"Progress: {completed}/{len(titles)} rows")
+    finally:
+        journal.close()
+
+    df['LLM Summary'] = ids.map(lambda row_id: results.get(row_id, {}).get("summary"))
+    df['LLM Teaser'] = ids.map(lambda row_id: results.get(row_id, {}).get("teaser"))
+    write_records(df, output_csv_path, content_type)
+    journal.remove()
+    telemetry = engine.report(since=mark, label=content_type)
+    log_telemetry(dict(telemetry, input=input_csv_path, rows=completed))
+    print(f"Processing complete! Wrote {len(df)} rows to {output_csv_path}")
+    return telemetry
+
+def process_csv(input_csv_path, output_csv_path, content_type='tech', limit=None, engine=None, window=None,
+                sync_every=20, combined=True):
+    """Summarize every unprocessed row of a record file (see process_csv_async)"""
+    return asyncio.run(process_csv_async(input_csv_path, output_csv_path, content_type, limit, engine, window, sync_every, combined))
+
+def log_telemetry(entry, path=None):
+    """Append a run's telemetry to the JSON-lines log (SUMMARY_TELEMETRY_PATH by default; '' disables it)"""
+    path = SUMMARY_TELEMETRY_PATH if path is None else path
+    if not path:
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(dict(entry, finished_at=time.strftime('%Y-%m-%dT%H:%M:%S')), default=str) + "\n")
+
+class RecordingEngine:
+    """Collects the completions rows would request, answering each with a placeholder.
+
+    Structured requests get a placeholder that validates, so no fallback
+    requests are recorded for them; with a cache, cached responses are
+    returned instead, so a structured result that failed validation in an
+    earlier batch records only its fallback.
+    """
+
+    def __init__(self, model=SUMMARY_MODEL, cache=None):
+        self.model = model
+        self.cache = cache
+        self.requests = []
+
+    async def complete(self, prompt, max_tokens, **params):
+        params = dict(params, max_tokens=max_tokens)
+        cached = self.cache.get(self.model, prompt, params) if self.cache is not None else None
+        if cached is not None:
+            return cached[0]
+        self.requests.append(dict(params, prompt=prompt))
+        response_format = params.get("response_format") or {}
+        if response_format.get("type") == "json_schema":
+            return json.dumps({field: "-" for field in response_format["json_schema"]["schema"]["required"]})
+        return ""
+
+class ReplayEngine:
+    """Answers completions from batch results (then the LLM cache), never calling the API"""
+
+    def __init__(self, responses, model=SUMMARY_MODEL, cache=None):
+        self.responses = responses
+        self.model = model
+        self.cache = cache
+
+    async def complete(self, prompt, max_tokens, **params):
+        params = dict(params, max_tokens=max_tokens)
+        key = cache_key(self.model, prompt, params)
+        if key in self.responses:
+            return self.responses[key]
+        cached = self.cache.get(self.model, prompt, params) if self.cache is not None else None
+        if cached is None:
+            raise KeyError("no batch result for this request")
+        return cached[0]
+
+def _load_batch_rows(input_path, content_type, limit=None):
+    """Records with their stable ids and cleaned title/description lists"""
+    df = read_records(input_path, nrows=limit)
+    df.columns = df.columns.str.strip()
+    title_col, description_col = find_text_columns(df)
+    ids = record_ids(df, content_type)
+    titles = df[title_col].fillna("").tolist()
+    descriptions = df[description_col].fillna("").apply(clean_text).tolist()
+    return df, ids, titles, descriptions
+
+def prepare_batch_job(input_path, job_path, content_type='tech', limit=None, cache=None, max_requests=50000,
+                      combined=True):
+    """Write every summary/teaser request for a record file as OpenAI batch JSONL.
+
+    custom_id is '<stable row id>#<request number>'. Identical requests are written once
+    and requests the LLM cache already answers are skipped. Jobs larger than
+    max_requests (the Batch API limit) are split into numbered parts.
+    Returns the job file paths.
+    """
+    df, ids, titles, descriptions = _load_batch_rows(input_path, content_type, limit)
+    recorder = RecordingEngine(cache=cache)
+
+    async def record_all():
+        rows = []
+        for row_id, title, description in zip(ids, titles, descriptions):
+            start = len(recorder.requests)
+            await summarize_row(recorder, title, description, content_type, combined)
+            rows.append((row_id, recorder.requests[start:]))
+        return rows
+
+    base, _ = os.path.splitext(job_path)
+    job_paths, written, seen = [], 0, set()
+    job = None
+    try:
+        for row_id, requests in asyncio.run(record_all()):
+            for request in requests:
+                prompt = request.pop('prompt')
+                key = cache_key(SUMMARY_MODEL, prompt, request)
+                if key in seen:
+                    continue
+                seen.add(key)
+                if job is None or written % max_requests == 0:
+                    if job is not None:
+                        job.close()
+                    job_paths.append(f"{base}-{len(job_paths):03d}.jsonl" if job_paths else job_path)
+                    job = open(job_paths[-1], 'w', encoding='utf-8')
+                job.write(json.dumps({
+                    "custom_id": f"{row_id}#{written}",
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": dict(request, model=SUMMARY_MODEL, messages=[{"role": "user", "content": prompt}]),
+                }) + "\n")
+                written += 1
+    finally:
+        if job is not None:
+            job.close()
+    print(f"Wrote {written} batch requests for {len(df)} rows to {len(job_paths)} job file(s)")
+    return job_paths
+
+def ingest_batch_results(input_path, output_path, job_paths, result_paths, content_type='tech', limit=None, cache=None,
+                         combined=True):
+    """Fill LLM Summary/Teaser from batch results, matching rows by stable id"""
+    requests = {}
+    for job_path in job_paths:
+        with open(job_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                request = json.loads(line)
+                body = dict(request["body"])
+                prompt = body.pop("messages")[0]["content"]
+                requests[request["custom_id"]] = (body.pop("model"), prompt, body)
+
+    responses, failed, usage_totals = {}, 0, {"prompt_tokens": 0, "completion_tokens": 0}
+    for result_path in result_paths:
+        with open(result_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                result = json.loads(line)
+                response = result.get("response") or {}
+                if response.get("status_code") != 200 or result["custom_id"] not in requests:
+                    failed += 1
+                    continue
+                body = response["body"]
+                model, prompt, params = requests[result["custom_id"]]
+                text = body["choices"][0]["message"]["content"].strip()
+                responses[cache_key(model, prompt, params)] = text
+                usage = body.get("usage") or {}
+                for name in usage_totals:
+                    usage_totals[name] += usage.get(name) or 0
+                if cache is not None:
+                    cache.put(model, prompt, params, text, usage.get("prompt_tokens"), usage.get("completion_tokens"))
+    cost = estimate_cost(SUMMARY_MODEL, usage_totals["prompt_tokens"], usage_totals["completion_tokens"], batch=True)
+    print(f"Loaded {len(responses)} batch results ({failed} failed)")
+    log_telemetry(dict(
+        usage_totals, label=content_type, model=SUMMARY_MODEL, input=input_path, batch=True,
+        requests=len(responses), failed=failed, estimated_cost=cost
+    ))
+
+    df, ids, titles, descriptions = _load_batch_rows(input_path, content_type, limit)
+    replay = ReplayEngine(responses, cache=cache)
+
+    async def replay_all():
+        return {
+            row_id: await summarize_row(replay, title, description, content_type, combined)
+            for row_id, title, description in zip(ids, titles, descriptions)
+        }
+
+    results = asyncio.run(replay_all())
+    df['LLM Summary'] = ids.map(lambda row_id: results[row_id][0])
+    df['LLM Teaser'] = ids.map(lambda row_id: results[row_id][1])
+    write_records(df, output_path, content_type)
+    missing = int(df['LLM Summary'].isna().sum())
+    print(f"Wrote {len(df) - missing} summarized rows to {output_path}" + (f"; {missing} without results" if missing else ""))
+
+def run_batch(input_path, output_path, content_type='tech', batch_client=None, workdir='data/batch_jobs',
+              poll_interval=60, limit=None, cache=None, combined=True):
+    """Summarize a record file through a batch-API client: prepare, submit, poll, ingest.
+
+    Submitted batch ids are kept in <workdir>/<input name>.state.json, so an
+    interrupted run picks up polling instead of resubmitting.
+    """
+    batch_client = batch_client or OpenAIBatchClient()
+    os.makedirs(workdir, exist_ok=True)
+    name = os.path.splitext(os.path.basename(input_path))[0]
+    state_path = os.path.join(workdir, f"{name}.state.json")
+    if os.path.exists(state_path):
+        with open(state_path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    else:
+        job_paths = prepare_batch_job(
+            input_path, os.path.join(workdir, f"{name}.jsonl"), content_type, limit, cache, combined=combined
+        )
+        state = {"jobs": {job_path: None for job_path in job_paths}}
+
+    def save_state():
+        with open(state_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, indent=4)
+
+    for job_path, batch_id in state["jobs"].items():
+        if batch_id is None:
+            state["jobs"][job_path] = batch_client.submit(job_path)
+            print(f"Submitted {job_path} as {state['jobs'][job_path]}")
+            save_state()
+
+    result_paths = []
+    for job_path, batch_id in state["jobs"].items():
+        while (batch := batch_client.retrieve(batch_id))["status"] not in BATCH_DONE_STATUSES:
+            print(f"Batch {batch_id}: {batch['status']} {batch.get('request_counts', {})}")
+            time.sleep(poll_interval)
+        if not batch.get("output_file_id"):
+            raise RuntimeError(f"Batch {batch_id} finished as '{batch['status']}' without an output file")
+        result_paths.append(batch_client.download(batch["output_file_id"], os.path.join(workdir, f"{batch_id}_output.jsonl")))
+
+    ingest_batch_results(input_path, output_path, list(state["jobs"]), result_paths, content_type, limit, cache, combined)
+    os.remove(state_path)
 
 def read_and_process_csv(file_path, content_type='tech', start_idx=0, end_idx=None):
-    # Let pandas handle the newline parsing
-    df = pd.read_csv(file_path, lineterminator='\n')
+    df = read_records(file_path)
     if end_idx:
         df = df.iloc[start_idx:end_idx]
     for i, (_, row) in enumerate(df.iterrows()):
@@ -275,11 +568,14 @@ def read_and_process_csv(file_path, content_type='tech', start_idx=0, end_idx=No
 
 if __name__ == "__main__":
     # Example usage
-    input_csv_path = 'Incepta_backend/data/tech/upenn_2024_12_07.csv'
-    output_csv_path = 'Incepta_backend/data/tech/upenn_2024_12_07_summarized.csv'
+    input_csv_path = 'Incepta_backend/data/tech/upenn_2024_12_07.parquet'
+    output_csv_path = 'Incepta_backend/data/tech/upenn_2024_12_07_summarized.parquet'
     
     # Process and summarize
     process_csv(input_csv_path, output_csv_path, content_type='tech', limit=None)
+
+    # Or push the whole file through the Batch API (bulk pricing, results within 24h)
+    # run_batch(input_csv_path, output_csv_path, content_type='tech', cache=LLMCache())
     
     # Read and display the results
     # read_and_process_csv(output_csv_path, content_type='tech')
\ No newline at end of file
@@ -0,0 +1,59 @@
+import re
+from main.services.batching import estimate_tokens
+
+# Token counting for OpenAI prompts with tiktoken (requirements.txt). If it is
+# missing, counts fall back to the ~4 characters per token estimate, which
+# overshoots budgets on dense text; a warning is printed once.
+
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+_encodings = {}
+
+def _encoding(model):
+    if model not in _encodings:
+        try:
+            import tiktoken
+        except ImportError:
+            if not any(encoding is None for encoding in _encodings.values()):
+                print("tiktoken is not installed; estimating prompt tokens at ~4 characters per token "
+                      "(pip install -r requirements.txt for exact counts)")
+            _encodings[model] = None
+        else:
+            try:
+                _encodings[model] = tiktoken.encoding_for_model(model)
+            except KeyError:
+                _encodings[model] = tiktoken.get_encoding('o200k_base')
+    return _encodings[model]
+
+def count_tokens(text, model="gpt-4o-mini"):
+    encoding = _encoding(model)
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+def _cut(text, max_tokens, model):
+    """The longest prefix of text within max_tokens, ignoring sentence boundaries"""
+    encoding = _encoding(model)
+    if encoding is None:
+        return text[:max_tokens * 4]
+    return encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+
+def truncate_to_tokens(text, max_tokens, model="gpt-4o-mini", suffix='...'):
+    """Truncate text to max_tokens, ending at a sentence boundary when one fits.
+
+    Whole sentences are kept while they fit; when they would fill less than
+    half the budget, the text is cut at the token limit instead. suffix
+    marks truncated text.
+    """
+    if count_tokens(text, model) <= max_tokens:
+        return text
+    kept, used = [], 0
+    for sentence in _SENTENCE_END.split(text):
+        tokens = count_tokens(sentence + ' ', model)
+        if used + tokens > max_tokens:
+            break
+        kept.append(sentence)
+        used += tokens
+    if used < max_tokens // 2:
+        # No usable boundary (e.g. one long run-on sentence): cut mid-sentence instead
+        return _cut(text, max_tokens, model).rstrip() + suffix
+    return ' '.join(kept) + suffix
@@ -1,137 +1,168 @@
-import pandas as pd
-from bs4 import BeautifulSoup
-import requests
 import re
-import csv
 from datetime import datetime
+from lxml import etree
+from main.services.record_store import clean_text, write_record_batches
 
-def get_topic_numbers(soup):
-    """Extract opportunity numbers from the soup object."""
-    return [y.text.strip().split(' ')[0] for y in soup.find_all('div', class_="topic-number-status")]
+# Output columns, in order
+COLUMNS = [
+    'OPPORTUNITY TITLE', 'AGENCY CODE', 'OPPORTUNITY STATUS', 'POSTED DATE',
+    'CLOSE DATE', 'LINK', 'OPPORTUNITY NUMBER', 'CATEGORY',
+    'LAST_UPDATED_DATE', 'POSTED_DATE', 'APPLICATION_DEADLINE',
+    'TOTAL_FUNDING_AMOUNT', 'AWARD_CEILING', 'AWARD_FLOOR', 'DESCRIPTION'
+]
 
-def get_title(soup):
-    """Extract titles from the soup object."""
-    return [y.text.strip() for y in soup.find_all('div', class_="topic-title")]
+# Base link for all topics
+LINK = 'https://www.dodsbirsttr.mil/topics-app/'
 
-def get_open_date(soup):
-    """Extract open date from the soup object."""
-    return [y.text.strip() for y in soup.find_all('div', class_="topic-open-close")][0]
+# The divs of the saved topics page that carry a topic's fields
+NUMBER_CLASS = 'topic-number-status'
+TITLE_CLASS = 'topic-title'
+DATES_CLASS = 'topic-open-close'
+DETAIL_CLASSES = {'topicDetailBox', 'container'}
 
-def get_close_date(soup):
-    """Extract close date from the soup object."""
-    return [y.text.strip() for y in soup.find_all('div', class_="topic-open-close")][1]
+_FUNDING = re.compile(r'\$(\d+(,\d{3})*|\d+)')
+# Alternatives are tried in order, so PHASE III ... wins over PHASE II over PHASE I
+_SECTIONS = re.compile(r'OBJECTIVE|DESCRIPTION|PHASE III DUAL USE APPLICATIONS|PHASE II|PHASE I')
+_SECTION_HEADINGS = {
+    'OBJECTIVE': '\nOBJECTIVE: ',
+    'DESCRIPTION': '\n\nDESCRIPTION: ',
+    'PHASE III DUAL USE APPLICATIONS': '\n\nPHASE 3 DUAL USE APPLICATIONS: ',
+    'PHASE II': '\n\nPHASE 2: ',
+    'PHASE I': '\n\nPHASE 1: ',
+}
 
-def get_all_descriptions(soup):
-    """
-    Get all descriptions from all topics in a page.
-    Returns a list of strings, each string is a description.
-    """
-    detail_text = "\n".join([y.text for y in soup.find_all('div', class_="topicDetailBox container")])
-    descriptions = ["KEYWORDS: " + detail_text.split('KEYWORDS')[i] for i in range(1, len(detail_text.split('KEYWORDS')))]
-    
-    descriptions = [description.replace('OBJECTIVE', '\nOBJECTIVE: ')
-                   .replace('DESCRIPTION', '\n\nDESCRIPTION: ')
-                   .replace('PHASE III DUAL USE APPLICATIONS', '\n\nPHASE 3 DUAL USE APPLICATIONS: ')
-                   .replace('PHASE II', '\n\nPHASE 2: ')
-                   .replace('PHASE I', '\n\nPHASE 1: ')
-                   for description in descriptions]
-    
-    return descriptions
+def format_description(detail_text):
+    """Description of one topic from its detail box: the text from KEYWORDS on, with section headings spaced out"""
+    _, keywords, rest = detail_text.partition('KEYWORDS')
+    text = "KEYWORDS: " + rest if keywords else detail_text
+    return _SECTIONS.sub(lambda match: _SECTION_HEADINGS[match.group(0)], text)
 
 def get_funding_from_description(description):
     """Extract funding amount from description using regex."""
-    try:
-        result =  re.search(r'\$(\d+(,\d{3})*|\d+)', description).group(0)
-        if len(result) < 3: # if the result is less than 3 characters, it's probably not a valid number
-            return 'nan'
-        else:
-            return result
-    except:
+    match = _FUNDING.search(description)
+    # Fewer than 3 characters (e.g. "$5") is probably not a valid amount
+    if match is None or len(match.group(0)) < 3:
         return 'nan'
+    return match.group(0)
+
+# Where a topic's number div starts in the raw export: a safe place to cut it
+_TOPIC_START = re.compile(rb'<div\b[^>]*\bclass\s*=\s*["\'][^"\']*\btopic-number-status\b')
+
+class _Topic:
+    def __init__(self):
+        self.number = None
+        self.title = None
+        self.dates = []
+        self.details = []  # every detail box (KEYWORDS box, body) until the next topic
+
+    def empty(self):
+        return self.number is None and self.title is None and not self.details
+
+def _text(element):
+    return ''.join(element.itertext())
+
+def iter_segments(input_file, segment_size=1 << 20):
+    """
+    Read the export as byte segments of about segment_size, each cut just
+    before a topic's number div, so no topic field is split between two
+    segments. A segment only grows past segment_size for a single topic
+    larger than that.
+    """
+    buffer = b''
+    with open(input_file, 'rb') as file:
+        while chunk := file.read(segment_size):
+            buffer += chunk
+            if len(buffer) < segment_size:
+                continue
+            cut = None
+            for match in _TOPIC_START.finditer(buffer, 1):
+                cut = match.start()
+            if cut:
+                yield buffer[:cut]
+                buffer = buffer[cut:]
+    if buffer:
+        yield buffer
+
+def iter_topics(input_file):
+    """
+    Yield the topics of a saved topics page (number, title, dates, detail_text) in one streaming pass.
+
+    The export is parsed one segment at a time with lxml (libxml2's HTML push
+    parser keeps its whole input buffer, so iterparse over a multi-hundred-MB
+    file would not stay bounded); memory is bounded by the segment size.
+    Each topic's fields come from its own divs in document order, and a
+    topic is complete when the next one starts: all detail boxes up to the
+    next topic-number-status div belong to it, so a topic without KEYWORDS
+    (or with an extra box) cannot shift its neighbours' fields.
+    """
+    parser = etree.HTMLParser(encoding='utf-8', recover=True, huge_tree=True)
+    topic = _Topic()
+    for segment in iter_segments(input_file):
+        root = etree.fromstring(segment, parser)
+        if root is None:
+            continue
+        for element in root.iter('div'):
+            classes = set(element.get('class', '').split())
+            if NUMBER_CLASS in classes:
+                if topic.number is not None:
+                    yield topic
+                    topic = _Topic()
+                topic.number = _text(element).strip().split(' ')[0]
+            elif TITLE_CLASS in classes:
+                if topic.title is not None:
+                    yield topic
+                    topic = _Topic()
+                topic.title = _text(element).strip()
+            elif DATES_CLASS in classes:
+                topic.dates.append(_text(element).strip())
+            elif DETAIL_CLASSES <= classes:
+                topic.details.append(_text(element))
+    if not topic.empty():
+        yield topic
+
+def iter_dod_grants(input_file):
+    """Grant records for each topic of a saved topics page, streamed"""
+    # Topics without their own open/close dates use the first ones on the page
+    page_dates = None
+    for topic in iter_topics(input_file):
+        if page_dates is None and len(topic.dates) >= 2:
+            page_dates = topic.dates[:2]
+        open_date, close_date = topic.dates[:2] if len(topic.dates) >= 2 else (page_dates or ['', ''])
+        description = format_description("\n".join(topic.details)) if topic.details else ''
+        row = dict.fromkeys(COLUMNS, '')
+        row.update({
+            'OPPORTUNITY TITLE': topic.title or '',
+            'AGENCY CODE': 'DOD',
+            'POSTED DATE': open_date,
+            'CLOSE DATE': close_date,
+            'LINK': LINK,
+            'OPPORTUNITY NUMBER': topic.number or '',
+            'DESCRIPTION': description,
+            'TOTAL_FUNDING_AMOUNT': get_funding_from_description(description) if description else 'nan',
+        })
+        yield {column: clean_text(value) for column, value in row.items()}
 
-def clean_text(text):
-    """Clean text by removing inconsistent quotes and standardizing format"""
-    if not isinstance(text, str):
-        return text
-    # Replace curly/smart quotes with straight quotes
-    text = text.replace('"', '"').replace('"', '"')
-    # Escape any remaining double quotes
-    text = text.replace('"', '""')
-    # Replace newlines with \n literal
-    text = text.replace('\n', '\\n').replace('\r', '')
-    # Remove any null bytes or other problematic characters
-    text = text.replace('\x00', '')
-    return text
-
-def process_dod_grants(input_file, output_file=None):
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def process_dod_grants(input_file, output_file=None, batch_size=500):
     """Main function to process DOD SBIR/STTR grants data."""
-    # Define columns
-    columns = [
-        'OPPORTUNITY TITLE', 'AGENCY CODE', 'OPPORTUNITY STATUS', 'POSTED DATE', 
-        'CLOSE DATE', 'LINK', 'OPPORTUNITY NUMBER', 'CATEGORY', 
-        'LAST_UPDATED_DATE', 'POSTED_DATE', 'APPLICATION_DEADLINE', 
-        'TOTAL_FUNDING_AMOUNT', 'AWARD_CEILING', 'AWARD_FLOOR', 'DESCRIPTION'
-    ]
-    
-    unused_columns = ['OPPORTUNITY STATUS', 'APPLICATION_DEADLINE', 'CATEGORY', 
-                     'LAST_UPDATED_DATE', 'AWARD_CEILING', 'AWARD_FLOOR']
-    
-    # Read and parse HTML
-    with open(input_file, 'r') as file:
-        html_content = file.read()
-    
-    soup = BeautifulSoup(html_content, 'html.parser')
-    
     # Set default output filename if none provided
     if output_file is None:
         current_date = datetime.now().strftime('%Y_%m_%d')
-        output_file = f'dodsbirsttr_{current_date}.csv'
-    
-    # Base link for all pages
-    link = 'https://www.dodsbirsttr.mil/topics-app/'
-    
-    # Write to CSV
-    with open(output_file, 'w', newline='', encoding='utf-8') as file:
-        writer = csv.writer(file, quoting=csv.QUOTE_ALL)
-        writer.writerow([clean_text(col) for col in columns])
-        
-        titles = get_title(soup)
-        topic_numbers = get_topic_numbers(soup)
-        open_date = get_open_date(soup)
-        close_date = get_close_date(soup)
-        descriptions = get_all_descriptions(soup)
-        
-        for i in range(len(titles)):
-            row = []
-            for column in columns:
-                value = ''
-                if column in unused_columns:
-                    value = ''
-                elif column == 'OPPORTUNITY TITLE':
-                    value = titles[i] if i < len(titles) else ''
-                elif column == 'AGENCY CODE':
-                    value = 'DOD'
-                elif column == 'POSTED DATE':
-                    value = open_date
-                elif column == 'CLOSE DATE':
-                    value = close_date
-                elif column == 'LINK':
-                    value = link
-                elif column == 'OPPORTUNITY NUMBER':
-                    value = topic_numbers[i] if i < len(topic_numbers) else ''
-                elif column == 'DESCRIPTION':
-                    value = descriptions[i] if i < len(descriptions) else ''
-                elif column == 'TOTAL_FUNDING_AMOUNT':
-                    try:
-                        if i < len(descriptions):
-                            value = get_funding_from_description(descriptions[i])
-                        else:
-                            value = 'nan'
-                    except:
-                        value = 'nan'
-                
-                row.append(clean_text(value))
-            writer.writerow(row)
+        output_file = f'dodsbirsttr_{current_date}.parquet'
+
+    # Parquet for the pipeline, or a quoted CSV when output_file ends in .csv
+    rows = write_record_batches(_batches(iter_dod_grants(input_file), batch_size), output_file, 'grants')
+    print(f"Wrote {rows} topics to {output_file}")
+    return rows
 
 if __name__ == "__main__":
     """
@@ -139,6 +170,7 @@ if __name__ == "__main__":
     Open all of the dropdowns for all of the topics
     Download the page as HTML
     Run this script, passing in the filename as the argument.
-    The output file will be named dodsbirsttr_YYYY_MM_DD.csv, and will be saved in the current working directory.
+    The output file will be named dodsbirsttr_YYYY_MM_DD.parquet, and will be saved in the current working directory.
+    Export a CSV copy for reading with: python -m main.services.record_store dodsbirsttr_YYYY_MM_DD.parquet
     """
-    process_dod_grants('dodsbirsttr.html', 'dodsbirsttr_2024_11_21.csv')
+    process_dod_grants('dodsbirsttr.html', 'dodsbirsttr_2024_11_21.parquet')
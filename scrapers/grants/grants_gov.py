@@ -1,24 +1,21 @@
 import pandas as pd
+import requests
 import urllib3
-from selenium import webdriver
+from bs4 import BeautifulSoup
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
 from multiprocessing import Pool, cpu_count
-import threading
-from contextlib import contextmanager
+from multiprocessing.util import Finalize
 from tenacity import retry, stop_after_attempt, wait_exponential
 import logging
-import time
-import random
 from tqdm import tqdm
-from functools import partial
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.chrome.service import Service
 import os
 from selenium.webdriver.remote.remote_connection import LOGGER as selenium_logger
-import csv
+from main.services.record_store import read_records, write_records
+from main.services.results_journal import ResultsJournal
+from scrapers.rate_limiter import rate_limiter
+from scrapers.tech.browser_pool import headless_chrome
 
 urllib3.disable_warnings()
 selenium_logger.setLevel(logging.WARNING)
@@ -37,126 +34,130 @@ logging.getLogger('WDM').disabled = True
 logging.getLogger('selenium').disabled = True
 selenium_logger.disabled = True
 
-class BrowserPool:
-    def __init__(self, size):
-        self.browsers = [self._create_browser() for _ in range(size)]
-        self.available = self.browsers.copy()
-        self.lock = threading.Lock()
-    
-    def _create_browser(self):
-        options = Options()
-        options.add_argument("--headless")
-        options.add_argument("--no-sandbox")
-        options.add_argument("--disable-dev-shm-usage")
-        return webdriver.Chrome(
-            service=Service(ChromeDriverManager().install()),
-            options=options
-        )
-    
-    @contextmanager
-    def get_browser(self):
-        browser = None
-        with self.lock:
-            if self.available:
-                browser = self.available.pop()
-        if browser is None:
-            browser = self._create_browser()
+# Polite request rate for grants.gov across all worker processes
+REQUESTS_PER_SECOND = 5
+
+# Append-only record of finished grants, so an interrupted run resumes where it stopped
+CHECKPOINT_PATH = os.getenv('GRANTS_GOV_CHECKPOINT', 'data/grants/grants_gov.journal')
+
+# Detail-page labels -> output columns
+FIELD_MAPPING = {
+    'Category of Funding Activity:': 'CATEGORY',
+    'Last Updated Date:': 'LAST_UPDATED_DATE',
+    # Posted date fields
+    'Posted Date:': 'POSTED_DATE',
+    'Estimated Post Date:': 'POSTED_DATE',
+    # Application deadline fields
+    'Current Closing Date for Applications:': 'APPLICATION_DEADLINE',
+    'Estimated Application Due Date:': 'APPLICATION_DEADLINE',
+    'Original Closing Date for Applications:': 'APPLICATION_DEADLINE',
+    # Funding fields
+    'Estimated Total Program Funding:': 'TOTAL_FUNDING_AMOUNT',
+    'Award Ceiling:': 'AWARD_CEILING',
+    'Award Floor:': 'AWARD_FLOOR',
+    'Description:': 'DESCRIPTION'
+}
+DETAIL_COLUMNS = list(dict.fromkeys(FIELD_MAPPING.values()))
+
+# After this many detail pages in a row without a server-rendered table, a
+# worker stops trying plain HTTP and goes straight to its browser
+HTTP_MISSES_BEFORE_BROWSER = 5
+
+# Per worker process: one HTTP session and (only when needed) one browser
+_session = None
+_browser = None
+_http_misses = 0
+
+def init_worker(site_url, requests_per_second):
+    """Pool initializer: this process's share of the site's rate, and its own HTTP session"""
+    global _session
+    # Every worker process has its own copy of the limiter
+    rate_limiter.configure(site_url, requests_per_second)
+    _session = requests.Session()
+    _session.headers.update({'User-Agent': 'GrantsGovScraper/1.0'})
+    Finalize(None, _close_worker, exitpriority=10)
+
+def _close_worker():
+    if _browser is not None:
         try:
-            yield browser
-        finally:
-            with self.lock:
-                if browser in self.browsers:
-                    self.available.append(browser)
-                else:
-                    browser.quit()
-    
-    def cleanup(self):
-        for browser in self.browsers:
-            try:
-                browser.quit()
-            except:
-                pass
+            _browser.quit()
+        except Exception:
+            pass
+
+def get_browser():
+    """This worker's browser, started on first use"""
+    global _browser
+    if _browser is None:
+        _browser = headless_chrome()
+    return _browser
 
-# Create a global browser pool
-browser_pool = BrowserPool(size=max(1, cpu_count() - 1))
+def extract_fields(rows):
+    """Map (label, value) pairs from a detail table onto the output columns"""
+    data = {}
+    for field, value in rows:
+        if field in FIELD_MAPPING:
+            data[FIELD_MAPPING[field]] = value
+    return data
+
+def fetch_details_http(url):
+    """Detail fields from the server-rendered html, or None when the table is rendered by JS"""
+    rate_limiter.wait(url)
+    response = _session.get(url, timeout=30)
+    rate_limiter.report(url, response.status_code, response.headers.get('Retry-After'))
+    response.raise_for_status()
+    soup = BeautifulSoup(response.text, 'html.parser')
+    rows = []
+    for row in soup.find_all('tr'):
+        cells = row.find_all('td', recursive=False)
+        if len(cells) == 2:
+            rows.append((cells[0].get_text(strip=True), cells[1].get_text('\n', strip=True)))
+    return extract_fields(rows) or None
 
 @retry(
     stop=stop_after_attempt(3),
     wait=wait_exponential(multiplier=1, min=4, max=10)
 )
-def scrape_grant_details(url, browser=None):
-    """Scrape a single grant's details"""
-    should_quit = False
-    if browser is None:
-        options = Options()
-        options.add_argument("--headless")
-        options.add_argument("--no-sandbox")
-        options.add_argument("--disable-dev-shm-usage")
-        browser = webdriver.Chrome(
-            service=Service(ChromeDriverManager().install()),
-            options=options
-        )
-        should_quit = True
-    
-    try:
-        browser.get(url)
-        wait = WebDriverWait(browser, 10)
-        wait.until(EC.presence_of_element_located((By.TAG_NAME, "table")))
-        
-        rows = browser.find_elements(By.TAG_NAME, "tr")
-        data = {}
-        
-        field_mapping = {
-            'Category of Funding Activity:': 'CATEGORY',
-            'Last Updated Date:': 'LAST_UPDATED_DATE',
-            # Posted date fields
-            'Posted Date:': 'POSTED_DATE',
-            'Estimated Post Date:': 'POSTED_DATE',
-            # Application deadline fields
-            'Current Closing Date for Applications:': 'APPLICATION_DEADLINE',
-            'Estimated Application Due Date:': 'APPLICATION_DEADLINE',
-            'Original Closing Date for Applications:': 'APPLICATION_DEADLINE',
-            # Funding fields
-            'Estimated Total Program Funding:': 'TOTAL_FUNDING_AMOUNT',
-            'Award Ceiling:': 'AWARD_CEILING',
-            'Award Floor:': 'AWARD_FLOOR',
-            'Description:': 'DESCRIPTION'
-        }
-        
-        for row in rows:
-            cells = row.find_elements(By.TAG_NAME, "td")
-            if len(cells) == 2:
-                field = cells[0].text.strip()
-                
-                if field in field_mapping:
-                    if field == 'Description:':
-                        value = cells[1].text.strip()
-                    else:
-                        value = cells[1].text.strip()
+def fetch_details_browser(url):
+    """Detail fields from the page as rendered by this worker's browser"""
+    browser = get_browser()
+    rate_limiter.wait(url)
+    browser.get(url)
+    wait = WebDriverWait(browser, 10)
+    wait.until(EC.presence_of_element_located((By.TAG_NAME, "table")))
 
-                    data[field_mapping[field]] = value
-        
-        return data
-    except Exception as e:
-        logging.error(f"Error scraping {url}: {str(e)}")
-        return None
-    finally:
-        if should_quit:
-            browser.quit()
+    rows = []
+    for row in browser.find_elements(By.TAG_NAME, "tr"):
+        cells = row.find_elements(By.TAG_NAME, "td")
+        if len(cells) == 2:
+            rows.append((cells[0].text.strip(), cells[1].text.strip()))
+    return extract_fields(rows)
 
-def process_batch(urls, batch_size=10):
-    """Process a batch of URLs using the browser pool"""
+def scrape_grant_details(url):
+    """Scrape a single grant's details: plain HTTP when the page is server-rendered, the browser otherwise"""
+    global _http_misses
+    if _http_misses < HTTP_MISSES_BEFORE_BROWSER:
+        try:
+            data = fetch_details_http(url)
+        except Exception as e:
+            logging.debug(f"HTTP fetch failed for {url}: {e!r}")
+            data = None
+        if data:
+            _http_misses = 0
+            return data
+        _http_misses += 1
+        if _http_misses == HTTP_MISSES_BEFORE_BROWSER:
+            logging.info("Detail pages are rendered client-side; using the browser only")
+    return fetch_details_browser(url)
+
+def process_batch(urls):
+    """Scrape a batch of URLs in this worker; returns (url, data or None) pairs"""
     results = []
-    with browser_pool.get_browser() as browser:
-        # Add progress bar for URLs within each batch
-        for url in tqdm(urls, desc="Processing URLs in batch", leave=False):
-            try:
-                result = scrape_grant_details(url, browser)
-                results.append((url, result))
-                time.sleep(random.uniform(0.1, 0.2))
-            except Exception as e:
-                logging.error(f"Error processing {url}: {str(e)}")
-                results.append((url, None))
+    for url in urls:
+        try:
+            results.append((url, scrape_grant_details(url)))
+        except Exception as e:
+            logging.error(f"Error scraping {url}: {e!r}")
+            results.append((url, None))
     return results
 
 def extract_url_from_hyperlink(hyperlink_formula):
@@ -173,108 +174,85 @@ def extract_url_from_hyperlink(hyperlink_formula):
         logging.error(f"Failed to extract URL from: {hyperlink_formula}. Error: {str(e)}")
         return None
 
-def main():
+def merge_details(df, details):
+    """Fill the detail columns of df from {url: fields}, joining on LINK with a hash index"""
+    df = df.copy()
+    if not details:
+        for col in DETAIL_COLUMNS:
+            if col not in df.columns:
+                df[col] = pd.Series(dtype='object')
+        return df
+    found = pd.DataFrame.from_dict(details, orient='index').reindex(columns=DETAIL_COLUMNS)
+    for col in DETAIL_COLUMNS:
+        values = df['LINK'].map(found[col])
+        df[col] = values.where(values.notna(), df[col]) if col in df.columns else values.astype('object')
+    return df
+
+def main(checkpoint_path=CHECKPOINT_PATH):
     df = pd.read_csv("Incepta_backend/data/grants/unprocessed/grants_gov_links.csv")
     
     # Extract URLs and create new column
     df['LINK'] = df['OPPORTUNITY NUMBER'].apply(extract_url_from_hyperlink)
     
-    output_file = "grants_gov_scraped_2024_12_05.csv"
+    output_file = "grants_gov_scraped_2024_12_05.parquet"
     
-    # Check for existing progress
-    try:
-        existing_df = pd.read_csv(output_file)
+    # Rows already in the output file are done
+    if os.path.exists(output_file):
+        existing_df = read_records(output_file, columns=['LINK'])
         processed_urls = set(existing_df['LINK'])
         df = df[~df['LINK'].isin(processed_urls)].copy()
         logging.info(f"Resuming processing. {len(processed_urls)} entries already processed.")
-    except FileNotFoundError:
+    else:
         logging.info("Starting fresh processing.")
     
     if len(df) == 0:
         logging.info("All entries have been processed!")
         return
 
-    # Define columns with their proper dtypes
-    column_dtypes = {
-        'CATEGORY': 'object',
-        'LAST_UPDATED_DATE': 'object',
-        'POSTED_DATE': 'object',
-        'APPLICATION_DEADLINE': 'object',
-        'TOTAL_FUNDING_AMOUNT': 'object',
-        'AWARD_CEILING': 'object',
-        'AWARD_FLOOR': 'object',
-        'DESCRIPTION': 'object'
-    }
-    
-    # Initialize new columns with correct dtypes
-    for col, dtype in column_dtypes.items():
-        if col not in df.columns:
-            df[col] = pd.Series(dtype=dtype)
+    # Grants scraped by an interrupted run
+    os.makedirs(os.path.dirname(checkpoint_path) or '.', exist_ok=True)
+    journal = ResultsJournal(checkpoint_path)
+    details = {url: entry['data'] for url, entry in journal.load().items()}
+    pending = [url for url in dict.fromkeys(df['LINK'].dropna()) if url not in details]
+    if details:
+        logging.info(f"{len(details)} grants restored from {checkpoint_path}")
+    logging.info(f"Starting to process {len(pending)} entries")
     
-    # Add overall progress information
-    total_entries = len(df)
-    logging.info(f"Starting to process {total_entries} entries")
-    
-    # Process in parallel batches
+    # Process in parallel batches, one browser per worker process
     batch_size = 10
     num_processes = max(1, cpu_count() - 1)
-    url_batches = [df['LINK'].iloc[i:i + batch_size].tolist() 
-                  for i in range(0, len(df), batch_size)]
-    
-    # Add progress bar for overall batch processing
-    with Pool(num_processes) as pool:
-        results = list(tqdm(
-            pool.imap(process_batch, url_batches),
-            total=len(url_batches),
-            desc="Processing batches",
-            position=0
-        ))
+    url_batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+    failed = 0
+    pool = Pool(num_processes, initializer=init_worker, initargs=(df['LINK'].iloc[0], REQUESTS_PER_SECOND / num_processes))
+    try:
+        for batch_results in tqdm(pool.imap_unordered(process_batch, url_batches),
+                                  total=len(url_batches), desc="Processing batches"):
+            # Each finished batch reaches disk before the next is taken
+            for url, grant_data in batch_results:
+                if grant_data:
+                    details[url] = grant_data
+                    journal.append({'id': url, 'data': grant_data})
+                else:
+                    failed += 1
+            journal.sync()
+        pool.close()  # let workers exit normally so their browsers are closed
+    except BaseException:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+        journal.close()
     
-    # Add progress bar for results processing
-    logging.info("Processing results and updating DataFrame...")
-    for batch_results in tqdm(results, desc="Updating DataFrame"):
-        for url, grant_data in batch_results:
-            if grant_data:
-                idx = df[df['LINK'] == url].index[0]
-                for col in column_dtypes.keys():
-                    value = grant_data.get(col)
-                    if value is not None:
-                        if column_dtypes[col] == 'float64':
-                            if isinstance(value, str):
-                                value = value.replace('$', '').replace(',', '').strip()
-                                try:
-                                    value = float(value)
-                                except ValueError:
-                                    value = None
-                        df.loc[idx, col] = value
+    logging.info(f"Merging {len(details)} scraped grants ({failed} failed)...")
+    df = merge_details(df, details)
     
-    # Save final results with consistent quoting
+    # Save final results (Parquet; export a CSV copy with python -m main.services.record_store)
     if os.path.exists(output_file):
-        final_df = pd.concat([pd.read_csv(output_file), df])
-        final_df.to_csv(
-            output_file, 
-            index=False,
-            quoting=csv.QUOTE_ALL,  # Quote all non-numeric fields
-            quotechar='"',                 # Use double quotes
-            encoding='utf-8',
-            escapechar='\\',              # Escape character for quotes within text
-            doublequote=True              # Double-quote rather than escape quotes
-        )
-    else:
-        df.to_csv(
-            output_file, 
-            index=False,
-            quoting=csv.QUOTE_ALL,
-            quotechar='"',
-            encoding='utf-8',
-            escapechar='\\',
-            doublequote=True
-        )
+        df = pd.concat([read_records(output_file), df])
+    write_records(df, output_file, 'grants')
+    journal.remove()  # the output file now records these rows
     
     logging.info("Scraping completed successfully")
 
 if __name__ == "__main__":
-    try:
-        main()
-    finally:
-        browser_pool.cleanup()
+    main()
@@ -0,0 +1,152 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from typing import Dict, Optional
+import pyarrow as pa
+
+# '' disables the cache
+HTTP_CACHE_DIR = os.getenv('SCRAPER_HTTP_CACHE_DIR', 'data/http_cache')
+
+class CachedPage:
+    """A stored response: body bytes plus what is needed to decode and revalidate it"""
+
+    def __init__(self, url: str, digest: str, encoding: Optional[str], etag: Optional[str],
+                 last_modified: Optional[str], size: int, fetched_at: float):
+        self.url = url
+        self.digest = digest
+        self.encoding = encoding
+        self.etag = etag
+        self.last_modified = last_modified
+        self.size = size
+        self.fetched_at = fetched_at
+
+class HttpCache:
+    """
+    Content-addressed, zstd-compressed archive of scraped pages with conditional-GET validators.
+
+    Bodies are stored once per SHA-256 under objects/<2 hex>/<digest>.zst, so a
+    page that did not change between crawls costs no extra space. An SQLite
+    index maps each url to its current body and the ETag / Last-Modified the
+    server sent, which become If-None-Match / If-Modified-Since on refetch;
+    a 304 answer is then served from the archive.
+    """
+
+    def __init__(self, directory: str = HTTP_CACHE_DIR):
+        self.directory = directory
+        os.makedirs(os.path.join(directory, 'objects'), exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(directory, 'index.sqlite'), isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                digest TEXT NOT NULL,
+                encoding TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                size INTEGER NOT NULL,
+                fetched_at REAL NOT NULL
+            )
+        """)
+        self.lock = threading.Lock()
+        self.stats = {'not_modified': 0, 'fetched': 0, 'bytes_fetched': 0, 'bytes_saved': 0}
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.directory, 'objects', digest[:2], f"{digest}.zst")
+
+    def lookup(self, url: str) -> Optional[CachedPage]:
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT url, digest, encoding, etag, last_modified, size, fetched_at FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None or not os.path.exists(self._object_path(row[1])):
+            return None
+        return CachedPage(*row)
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """If-None-Match / If-Modified-Since for a url with a stored copy"""
+        page = self.lookup(url)
+        headers = {}
+        if page is not None:
+            if page.etag:
+                headers['If-None-Match'] = page.etag
+            if page.last_modified:
+                headers['If-Modified-Since'] = page.last_modified
+        return headers
+
+    def body(self, page: CachedPage) -> bytes:
+        with pa.CompressedInputStream(pa.OSFile(self._object_path(page.digest)), 'zstd') as f:
+            return f.read()
+
+    def text(self, page: CachedPage) -> str:
+        return self.body(page).decode(page.encoding or 'utf-8', errors='replace')
+
+    def not_modified(self, url: str) -> Optional[str]:
+        """Text of the stored copy after a 304, or None when there is none"""
+        page = self.lookup(url)
+        if page is None:
+            return None
+        with self.lock:
+            self.conn.execute("UPDATE pages SET fetched_at = ? WHERE url = ?", (time.time(), url))
+            self.stats['not_modified'] += 1
+            self.stats['bytes_saved'] += page.size
+        return self.text(page)
+
+    def store(self, url: str, body: bytes, headers, encoding: Optional[str] = None) -> None:
+        """Archive a 200 response with its validators"""
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with pa.CompressedOutputStream(tmp_path, 'zstd') as f:
+                f.write(body)
+            os.replace(tmp_path, path)
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, digest, encoding, headers.get('ETag'), headers.get('Last-Modified'), len(body), time.time())
+            )
+            self.stats['fetched'] += 1
+            self.stats['bytes_fetched'] += len(body)
+
+    def report(self) -> Dict[str, int]:
+        s = self.stats
+        logging.info(
+            f"HTTP cache: {s['fetched']} fetched ({s['bytes_fetched'] / 1e6:.1f} MB), "
+            f"{s['not_modified']} not modified ({s['bytes_saved'] / 1e6:.1f} MB served from the archive)"
+        )
+        return dict(s)
+
+    def summary(self) -> Dict[str, int]:
+        pages, size = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pages").fetchone()
+        stored = sum(
+            entry.stat().st_size
+            for shard in os.scandir(os.path.join(self.directory, 'objects')) if shard.is_dir()
+            for entry in os.scandir(shard.path)
+        )
+        return {'pages': pages, 'raw_bytes': size, 'archive_bytes': stored}
+
+    def close(self) -> None:
+        self.conn.close()
+
+_caches: Dict[str, HttpCache] = {}
+
+def get_http_cache(directory: str = HTTP_CACHE_DIR) -> Optional[HttpCache]:
+    """The process-wide cache for directory (None when caching is disabled)"""
+    if not directory:
+        return None
+    if directory not in _caches:
+        _caches[directory] = HttpCache(directory)
+    return _caches[directory]
+
+if __name__ == "__main__":
+    """
+    python -m scrapers.http_cache [directory]
+    """
+    cache = HttpCache(sys.argv[1] if len(sys.argv) > 1 else HTTP_CACHE_DIR)
+    print(cache.summary())
@@ -0,0 +1,136 @@
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+from typing import Dict, List, Optional
+
+SCRAPE_STATE_DIR = os.getenv('SCRAPE_STATE_DIR', 'data/scrape_state')
+
+# Listing data rarely shows every detail-page edit, so details are refetched
+# after this many days even when the listing entry looks unchanged
+REFRESH_AFTER_DAYS = float(os.getenv('SCRAPE_REFRESH_AFTER_DAYS', '30'))
+
+def listing_fingerprint(item: Dict[str, str]) -> str:
+    """Stable digest of the fields a listing page shows for an item"""
+    payload = json.dumps({key: item[key] for key in sorted(item)}, ensure_ascii=False, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+class ScrapeChanges:
+    """What an incremental run found: full records for added/changed links, the last known record for removed ones"""
+
+    def __init__(self, added: List[Dict[str, str]], changed: List[Dict[str, str]],
+                 removed: List[Dict[str, str]], unchanged: int, complete: bool):
+        self.added = added
+        self.changed = changed
+        self.removed = removed
+        self.unchanged = unchanged
+        # removed is only meaningful when the listing was crawled to the end
+        self.complete = complete
+
+    def summary(self) -> Dict[str, int]:
+        return {'added': len(self.added), 'changed': len(self.changed), 'removed': len(self.removed),
+                'unchanged': self.unchanged, 'complete': self.complete}
+
+    def save(self, path: str) -> None:
+        """Write the change sets as JSON for downstream stages"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'added': self.added, 'changed': self.changed, 'removed': self.removed,
+                       'unchanged': self.unchanged, 'complete': self.complete}, f, ensure_ascii=False, default=str)
+
+class ScrapeState:
+    """
+    The previous run's listing fingerprints and records, keyed by link.
+
+    Scrapers call needs_details() for every listing item: it is False when
+    the item's listing data matches the previous run (and its details are
+    younger than refresh_after_days), so the detail request can be skipped.
+    Items that are fetched are handed to record(). finish() then classifies
+    links as added, changed or - when the crawl reached the end of the
+    listing - removed, and save() makes this run the baseline for the next.
+    """
+
+    def __init__(self, path: str, refresh_after_days: float = REFRESH_AFTER_DAYS):
+        self.path = path
+        self.refresh_after = refresh_after_days * 86400
+        self.previous: Dict[str, Dict] = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.previous = json.load(f)['items']
+        self.seen: Dict[str, str] = {}  # link -> listing fingerprint for this run
+        self.fetched: Dict[str, Dict] = {}
+        self.complete = False
+        self.changes: Optional[ScrapeChanges] = None
+
+    @classmethod
+    def for_scraper(cls, name: str, directory: str = SCRAPE_STATE_DIR, **kwargs) -> 'ScrapeState':
+        os.makedirs(directory, exist_ok=True)
+        return cls(os.path.join(directory, f"{name}.json"), **kwargs)
+
+    @property
+    def changes_path(self) -> str:
+        return f"{os.path.splitext(self.path)[0]}.changes.json"
+
+    def needs_details(self, item: Dict[str, str]) -> bool:
+        """Remember the listing item; False when its stored record is still current"""
+        fingerprint = listing_fingerprint(item)
+        self.seen[item['link']] = fingerprint
+        entry = self.previous.get(item['link'])
+        return (entry is None or entry['fingerprint'] != fingerprint
+                or time.time() - entry['fetched_at'] > self.refresh_after)
+
+    def record(self, item: Dict[str, str]) -> None:
+        """Store the full record of an item whose details were fetched this run"""
+        self.fetched[item['link']] = item
+
+    def finish(self, complete: bool) -> ScrapeChanges:
+        """Classify this run's links; complete means every listing page was read, so unseen links were removed"""
+        self.complete = complete
+        added, changed = [], []
+        for link, item in self.fetched.items():
+            previous = self.previous.get(link)
+            if previous is None:
+                added.append(item)
+            elif previous['record'] != item:
+                changed.append(item)
+        removed = [entry['record'] for link, entry in self.previous.items() if link not in self.seen] if complete else []
+        unchanged = sum(1 for link in self.seen if link in self.previous) - len(changed)
+        self.changes = ScrapeChanges(added, changed, removed, unchanged, complete)
+        logging.info(
+            f"Incremental scrape: {len(added)} added, {len(changed)} changed, {len(removed)} removed, "
+            f"{unchanged} unchanged ({len(self.fetched)} detail pages fetched for {len(self.seen)} listings)"
+        )
+        return self.changes
+
+    def items(self) -> Dict[str, Dict]:
+        """State entries after this run: previous entries, minus removed links, updated with fetched ones"""
+        now = time.time()
+        items = {link: entry for link, entry in self.previous.items() if not self.complete or link in self.seen}
+        for link, item in self.fetched.items():
+            items[link] = {'fingerprint': self.seen[link], 'fetched_at': now, 'record': item}
+        return items
+
+    def records(self) -> List[Dict[str, str]]:
+        """The current full dataset: unchanged records from earlier runs plus everything fetched now"""
+        return [entry['record'] for entry in self.items().values()]
+
+    def save(self) -> None:
+        """Make this run the baseline for the next (atomically, so a crash keeps the old state)"""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'items': self.items()}, f, ensure_ascii=False, default=str)
+        os.replace(tmp_path, self.path)
+        if self.changes is not None:
+            self.changes.save(self.changes_path)
+
+if __name__ == "__main__":
+    """
+    python -m scrapers.incremental StanfordScraper
+    """
+    state = ScrapeState.for_scraper(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else SCRAPE_STATE_DIR)
+    print(f"{len(state.previous)} links in {state.path}")
+    if os.path.exists(state.changes_path):
+        with open(state.changes_path, 'r', encoding='utf-8') as f:
+            changes = json.load(f)
+        print({key: len(value) if isinstance(value, list) else value for key, value in changes.items()})
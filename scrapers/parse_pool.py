@@ -0,0 +1,37 @@
+import asyncio
+import atexit
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Optional, TypeVar
+
+# Worker processes for HTML parsing; 0 parses inline on the calling thread
+PARSE_WORKERS = int(os.getenv('SCRAPER_PARSE_WORKERS', str(os.cpu_count() or 1)))
+
+HTML_PARSER = 'lxml'
+
+T = TypeVar('T')
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+def get_parse_pool() -> Optional[ProcessPoolExecutor]:
+    """The process-wide parsing pool (None when SCRAPER_PARSE_WORKERS is 0)"""
+    global _pool
+    if _pool is None and PARSE_WORKERS > 0:
+        # spawn: forking a process that runs an event loop and client threads is not safe
+        _pool = ProcessPoolExecutor(max_workers=PARSE_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+        atexit.register(_pool.shutdown, cancel_futures=True)
+    return _pool
+
+async def parse_in_pool(fn: Callable[..., T], *args) -> T:
+    """
+    Run a CPU-bound parse function in the parsing pool without blocking the event loop.
+
+    fn must be a module-level function (it is pickled by name) that takes and
+    returns plain data - html text in, dicts/lists of strings out - since
+    parse trees cannot cross process boundaries.
+    """
+    pool = get_parse_pool()
+    if pool is None:
+        return fn(*args)
+    return await asyncio.get_running_loop().run_in_executor(pool, fn, *args)
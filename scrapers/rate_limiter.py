@@ -0,0 +1,128 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+DEFAULT_REQUESTS_PER_SECOND = float(os.getenv('SCRAPER_REQUESTS_PER_SECOND', '5'))
+
+# Responses that mean "slow down" rather than "this request is wrong"
+THROTTLE_STATUSES = {429, 503}
+
+def host_of(url: str) -> str:
+    return urlsplit(url).netloc.lower() or url
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class _HostState:
+    def __init__(self, rate: float, burst: int):
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.next_free = 0.0      # monotonic time the next request may start
+        self.blocked_until = 0.0  # set by Retry-After / throttling responses
+
+class HostRateLimiter:
+    """
+    Token bucket per host, shared by every scraper in the process.
+
+    Each host gets requests_per_second (configure() per site, otherwise the
+    default) with a burst of `burst` requests. Usable from threads (wait)
+    and coroutines (acquire). report() adapts the rate: a 429/503 halves it
+    and blocks the host for Retry-After, successes creep back up to the
+    configured maximum, so crawls run at the fastest rate the site accepts.
+    """
+
+    def __init__(self, default_rate: float = DEFAULT_REQUESTS_PER_SECOND, burst: int = 1,
+                 min_rate: float = 0.1, recovery: float = 0.05):
+        self.default_rate = default_rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.recovery = recovery
+        self.hosts: Dict[str, _HostState] = {}
+        self.lock = threading.Lock()
+
+    def _state(self, host: str) -> _HostState:
+        if host not in self.hosts:
+            self.hosts[host] = _HostState(self.default_rate, self.burst)
+        return self.hosts[host]
+
+    def configure(self, url: str, requests_per_second: float, burst: Optional[int] = None) -> None:
+        """Set the maximum polite rate for the host of url"""
+        with self.lock:
+            state = self._state(host_of(url))
+            state.max_rate = state.rate = requests_per_second
+            if burst is not None:
+                state.burst = burst
+
+    def _reserve(self, url: str) -> float:
+        """Claim the next slot for url's host; returns how long the caller must wait for it"""
+        now = time.monotonic()
+        with self.lock:
+            state = self._state(host_of(url))
+            interval = 1.0 / state.rate
+            # Idle time banks up to burst - 1 extra requests
+            start = max(state.next_free, now - (state.burst - 1) * interval, state.blocked_until)
+            state.next_free = start + interval
+        return max(0.0, start - now)
+
+    def _blocked(self, url: str) -> bool:
+        with self.lock:
+            return self._state(host_of(url)).blocked_until > time.monotonic()
+
+    def wait(self, url: str) -> None:
+        """Block the calling thread until a request to url is allowed"""
+        # A slot claimed before a 429 arrived is claimed again after the back-off
+        while True:
+            delay = self._reserve(url)
+            if delay:
+                time.sleep(delay)
+            if not self._blocked(url):
+                return
+
+    async def acquire(self, url: str) -> None:
+        """Wait (without blocking the event loop) until a request to url is allowed"""
+        while True:
+            delay = self._reserve(url)
+            if delay:
+                await asyncio.sleep(delay)
+            if not self._blocked(url):
+                return
+
+    def report(self, url: str, status: Optional[int], retry_after: Optional[str] = None) -> Optional[float]:
+        """Adapt to a response; returns the back-off in seconds for throttling responses"""
+        now = time.monotonic()
+        with self.lock:
+            state = self._state(host_of(url))
+            if status in THROTTLE_STATUSES:
+                state.rate = max(self.min_rate, state.rate / 2)
+                delay = parse_retry_after(retry_after)
+                if delay is None:
+                    delay = 1.0 / state.rate
+                state.blocked_until = max(state.blocked_until, now + delay)
+                logging.warning(f"{host_of(url)} answered {status}; backing off {delay:.1f}s, rate now {state.rate:.2f}/s")
+                return delay
+            if status is not None and status < 400 and state.rate < state.max_rate:
+                state.rate = min(state.max_rate, state.rate + self.recovery * state.max_rate)
+        return None
+
+    def rate(self, url: str) -> float:
+        with self.lock:
+            return self._state(host_of(url)).rate
+
+# The process-wide limiter every scraper shares
+rate_limiter = HostRateLimiter()
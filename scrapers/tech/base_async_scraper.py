@@ -1,12 +1,17 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict, Optional, Type
+from typing import AsyncIterator, List, Dict, Optional, Type
 import aiohttp
 from bs4 import BeautifulSoup
 import csv
 import pandas as pd
+from main.services.record_store import clean_text, is_parquet, write_records
+from scrapers.rate_limiter import THROTTLE_STATUSES, rate_limiter
+from scrapers.http_cache import get_http_cache
+from scrapers.incremental import ScrapeState
 from tqdm import tqdm
 import logging
 import asyncio
+from collections import deque
 from aiohttp import ClientSession
 from tenacity import retry, stop_after_attempt, wait_fixed
 
@@ -14,6 +19,9 @@ logging.basicConfig(level=logging.INFO, format='%(levelname)s:%(message)s')
 
 class BaseScraper(ABC):
     """Base class for web scrapers"""
+
+    record_type = 'tech'  # schema used for Parquet output (see main/constants/record_schema.py)
+    requests_per_second: Optional[float] = None  # polite rate for base_url's host (None: the limiter default)
     
     def __init__(self, base_url: str, fieldnames: List[str], headers: Dict[str, str] = None):
         self.base_url = base_url
@@ -22,20 +30,10 @@ class BaseScraper(ABC):
             'User-Agent': 'YourScraperName/1.0 (contact@example.com)'
         }
         self.headers = headers or default_headers
-
-    def clean_text(text):
-        """Clean text by removing inconsistent quotes and standardizing format"""
-        if not isinstance(text, str):
-            return text
-        # Replace curly/smart quotes with straight quotes
-        text = text.replace('"', '"').replace('"', '"')
-        # Escape any remaining double quotes
-        text = text.replace('"', '""')
-        # Replace newlines with \n literal
-        text = text.replace('\n', '\\n').replace('\r', '')
-        # Remove any null bytes or other problematic characters
-        text = text.replace('\x00', '')
-        return text
+        self.rate_limiter = rate_limiter
+        self.http_cache = get_http_cache()  # None when SCRAPER_HTTP_CACHE_DIR is ''
+        if self.requests_per_second:
+            self.rate_limiter.configure(base_url, self.requests_per_second)
 
     @abstractmethod
     async def get_page_soup(self, session: ClientSession, page_number: int) -> BeautifulSoup:
@@ -52,76 +50,196 @@ class BaseScraper(ABC):
         """Get detailed information for a single item"""
         pass
 
+    async def get_page_items(self, session: ClientSession, page_number: int) -> List[Dict[str, str]]:
+        """
+        Fetch a listing page and extract its items. Subclasses with heavy pages can
+        override this to parse off the event loop (see scrapers/parse_pool.py).
+        """
+        return self.get_items_from_page(await self.get_page_soup(session, page_number))
+
+    async def fetch_text(self, session: ClientSession, url: str, max_retries: int = 3) -> str:
+        """
+        GET url through the shared per-host rate limiter, retrying 429/503 after the requested back-off.
+        A stored copy is revalidated with a conditional GET and served from the HTTP cache on 304.
+        """
+        # The cache reads and writes disk and SQLite: kept off the event loop
+        headers = await asyncio.to_thread(self.http_cache.conditional_headers, url) if self.http_cache else {}
+        attempt = 0
+        while True:
+            await self.rate_limiter.acquire(url)
+            async with session.get(url, headers=headers) as response:
+                self.rate_limiter.report(url, response.status, response.headers.get('Retry-After'))
+                if response.status in THROTTLE_STATUSES and attempt < max_retries:
+                    attempt += 1
+                    continue
+                if response.status == 304:
+                    text = await asyncio.to_thread(self.http_cache.not_modified, url) if self.http_cache else None
+                    if text is not None:
+                        return text
+                    if headers:
+                        headers = {}  # stored copy vanished; fetch in full
+                        continue
+                    raise aiohttp.ClientResponseError(
+                        response.request_info, response.history, status=304,
+                        message="Not Modified for an unconditional request", headers=response.headers
+                    )
+                response.raise_for_status()
+                body = await response.read()
+                encoding = response.get_encoding()
+                if self.http_cache:
+                    await asyncio.to_thread(self.http_cache.store, url, body, response.headers.copy(), encoding)
+                return body.decode(encoding, errors='replace')
+
     def process_item(self, item: Dict[str, str]) -> Dict[str, str]:
         """Process item before adding to dataset (can be overridden by subclasses)"""
         return item
 
-    async def scrape(self, limit: int = None, output_file: Optional[str] = None, max_concurrent: int = 10) -> List[Dict[str, str]]:
+    async def iter_items(self, limit: int = None, max_concurrent: int = 10, max_per_host: Optional[int] = None,
+                         page_lookahead: int = 2, request_timeout: float = 30, page_retries: int = 2,
+                         max_failed_pages: int = 3,
+                         state: Optional[ScrapeState] = None) -> AsyncIterator[Dict[str, str]]:
+        """
+        Yield processed items as their details arrive.
+
+        Listing pages and detail fetches share one window of at most
+        max_concurrent requests: whenever one finishes the next is started, so
+        a slow response only holds its own slot. At most page_lookahead listing
+        pages are in flight, so the end of pagination (the first empty page)
+        is found without fetching many pages past it. request_timeout bounds
+        each HTTP request (time spent waiting on the rate limiter does not
+        count); failed or timed-out requests are logged and skipped.
+
+        A listing page that fails is retried up to page_retries times; one
+        that still fails is skipped and marks the crawl incomplete, but does
+        not end pagination - only a page that loaded and had no items does.
+        After max_failed_pages given-up pages in a row (e.g. the site is
+        down) no further pages are started.
+
+        With a ScrapeState only items whose listing data changed since the
+        previous run (or that are new) get their details fetched and yielded;
+        the state is finished once the crawl ends.
+        """
+        connector = aiohttp.TCPConnector(limit=max_concurrent, limit_per_host=max_per_host or max_concurrent)
+        client_timeout = aiohttp.ClientTimeout(total=request_timeout)
+        async with aiohttp.ClientSession(headers=self.headers, connector=connector, timeout=client_timeout) as session:
+            in_flight = {}  # task -> ('page', page number) or ('detail', item)
+            pending_items = deque()
+            next_page = 1
+            last_page = limit  # lowered to the first empty page once it is seen
+            pages_in_flight = 0
+            listing_complete = True  # False once a listing page fails: unseen links may still exist
+            page_attempts = {}  # page number -> failed attempts so far
+            retry_pages = deque()
+            failed_in_a_row = 0
+
+            try:
+                while True:
+                    while retry_pages and len(in_flight) < max_concurrent:
+                        page = retry_pages.popleft()
+                        logging.info(f"Retrying page {page}...")
+                        task = asyncio.create_task(self.get_page_items(session, page))
+                        in_flight[task] = ('page', page)
+                        pages_in_flight += 1
+                    while (pages_in_flight < page_lookahead and len(in_flight) < max_concurrent
+                           and failed_in_a_row < max_failed_pages
+                           and (last_page is None or next_page <= last_page)):
+                        logging.info(f"Processing page {next_page}...")
+                        task = asyncio.create_task(self.get_page_items(session, next_page))
+                        in_flight[task] = ('page', next_page)
+                        pages_in_flight += 1
+                        next_page += 1
+                    while pending_items and len(in_flight) < max_concurrent:
+                        item = pending_items.popleft()
+                        task = asyncio.create_task(self.get_item_details(session, item['link']))
+                        in_flight[task] = ('detail', item)
+                    if not in_flight:
+                        break
+
+                    done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        kind, payload = in_flight.pop(task)
+                        if kind == 'page':
+                            pages_in_flight -= 1
+                            if last_page is not None and payload > last_page:
+                                continue  # fetched ahead, past the end of pagination
+                            try:
+                                page_items = task.result()
+                            except Exception as e:
+                                attempts = page_attempts[payload] = page_attempts.get(payload, 0) + 1
+                                if attempts <= page_retries:
+                                    logging.warning(f"Error processing page {payload} (attempt {attempts}): {e!r}")
+                                    retry_pages.append(payload)
+                                else:
+                                    logging.error(f"Giving up on page {payload}: {e!r}")
+                                    listing_complete = False
+                                    failed_in_a_row += 1
+                                    if failed_in_a_row == max_failed_pages:
+                                        logging.error(f"{failed_in_a_row} pages in a row failed. Stopping pagination.")
+                                continue
+                            failed_in_a_row = 0
+                            if not page_items:
+                                logging.info(f"No more items found on page {payload}. Stopping pagination.")
+                                last_page = payload - 1
+                                continue
+                            logging.info(f"Found {len(page_items)} items on page {payload}")
+                            if state is not None:
+                                page_items = [item for item in page_items if state.needs_details(item)]
+                            pending_items.extend(page_items)
+                        else:
+                            try:
+                                detail = task.result()
+                            except Exception as e:
+                                logging.error(f"Error fetching details for {payload.get('link')}: {e!r}")
+                                continue
+                            payload.update(detail)
+                            item = self.process_item(payload)
+                            if state is not None:
+                                state.record(item)
+                            yield item
+                if state is not None:
+                    # A page limit also stops the crawl before the end of the listing
+                    state.finish(complete=listing_complete and (limit is None or last_page < limit))
+            finally:
+                # The consumer may stop early; do not leave requests running
+                for task in in_flight:
+                    task.cancel()
+                await asyncio.gather(*in_flight, return_exceptions=True)
+
+    async def scrape(self, limit: int = None, output_file: Optional[str] = None, max_concurrent: int = 10,
+                     incremental: bool = False) -> List[Dict[str, str]]:
         """
         Main scraping method to collect and save data
+
+        incremental: only fetch details for listings that are new or changed since the previous
+        incremental run; the full dataset is rebuilt from the saved state and the added/changed/removed
+        sets are written next to it (see scrapers/incremental.py)
         """
-        all_items = []
         logging.info(f"Starting scraping process with max {max_concurrent} concurrent requests...")
-        
-        async with aiohttp.ClientSession(headers=self.headers) as session:
-            # First, get all pages concurrently
-            page_tasks = []
-            current_page = 1
-            pagination_stopped = False
-            
-            for page_num in range(1, limit + 1 if limit else 999999):
-                if pagination_stopped:
-                    logging.info("Pagination stopped by user. Exiting loop.")
-                    break
-
-                logging.info(f"Processing page {page_num}...")
-                page_tasks.append(self.get_page_soup(session, page_num))
-                
-                # Process in batches to avoid overwhelming the server
-                if len(page_tasks) >= max_concurrent:
-                    logging.info(f"Fetching batch of {len(page_tasks)} pages...")
-                    pages = await asyncio.gather(*page_tasks)
-                    page_tasks = []
-                    
-                    # Extract items from pages
-                    items = []
-                    for page_soup in pages:
-                        page_items = self.get_items_from_page(page_soup)
-                        if not page_items:
-                            logging.info("No more items found. Stopping pagination.")
-                            pagination_stopped = True
-                            break
-                        items.extend(page_items)
-                    
-                    logging.info(f"Found {len(items)} items in current batch")
-                    
-                    # Get details for items concurrently
-                    detail_tasks = []
-                    for item in items:
-                        detail_tasks.append(self.get_item_details(session, item['link']))
-                    
-                    # Process detail tasks in batches
-                    for i in range(0, len(detail_tasks), max_concurrent):
-                        batch = detail_tasks[i:i + max_concurrent]
-                        logging.info(f"Fetching details for items {i+1}-{i+len(batch)}/{len(items)}")
-                        details = await asyncio.gather(*batch)
-                        
-                        # Update items with their details
-                        for j, detail in enumerate(details):
-                            item = items[i + j]
-                            item.update(detail)
-                            processed_item = self.process_item(item)
-                            all_items.append(processed_item)
+        state = ScrapeState.for_scraper(type(self).__name__) if incremental else None
+        all_items = [item async for item in self.iter_items(limit, max_concurrent, state=state)]
+        if self.http_cache:
+            self.http_cache.report()
+        if state is not None:
+            all_items = state.records()
 
         if output_file:
-            logging.info(f"Saving {len(all_items)} items to {output_file}")
-            df = pd.DataFrame(all_items, columns=self.fieldnames)
-            df.to_csv(output_file, index=False)
-            logging.info("Save complete!")
+            self.save(all_items, output_file)
+        if state is not None:
+            state.save()  # only once the output is written, so a failed run is redone in full
 
         logging.info(f"Scraping complete! Total items collected: {len(all_items)}")
         return all_items
 
+    def save(self, items: List[Dict[str, str]], output_file: str) -> None:
+        """Save items as Parquet (for the pipeline) or as a quoted CSV (for humans)"""
+        logging.info(f"Saving {len(items)} items to {output_file}")
+        df = pd.DataFrame(items, columns=self.fieldnames).map(clean_text)
+        if is_parquet(output_file):
+            write_records(df, output_file, self.record_type)
+        else:
+            df.to_csv(output_file, index=False, quoting=csv.QUOTE_ALL)
+        logging.info("Save complete!")
+
     def make_absolute_url(self, url: str) -> str:
         """Convert a relative URL to an absolute URL"""
         from urllib.parse import urljoin
@@ -0,0 +1,40 @@
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Type
+from scrapers.tech.base_async_scraper import BaseScraper
+from scrapers.tech.browser_pool import BROWSER_WORKERS, BrowserPool, headless_chrome, page_source
+
+class BrowserScraper(BaseScraper):
+    """
+    Base class for scrapers of JS-rendered sites.
+
+    Pages are rendered by a pool of headless browsers (browser_workers of
+    them) instead of fetched over HTTP, so listing pages and detail pages
+    render in parallel under the async BaseScraper's scheduler. Subclasses
+    implement the usual get_page_soup / get_items_from_page /
+    get_item_details with `await self.render(url, ready=...)`, where ready
+    is a CSS selector that marks the page as loaded.
+    """
+
+    browser_workers = BROWSER_WORKERS
+    ready_timeout = 10  # seconds to wait for a ready selector
+
+    def __init__(self, base_url: str, fieldnames: List[str], headers: Dict[str, str] = None,
+                 driver_factory: Callable = headless_chrome):
+        super().__init__(base_url, fieldnames, headers)
+        self.browser = BrowserPool(self.browser_workers, driver_factory)
+
+    async def render(self, url: str, ready: Optional[str] = None, then: Callable = page_source,
+                     timeout: Optional[float] = None) -> Any:
+        """Load url in a pooled browser (through the per-host rate limiter) and return then(driver)"""
+        await self.rate_limiter.acquire(url)
+        return await self.browser.render(url, ready, self.ready_timeout if timeout is None else timeout, then)
+
+    async def iter_items(self, *args, **kwargs) -> AsyncIterator[Dict[str, str]]:
+        try:
+            async for item in super().iter_items(*args, **kwargs):
+                yield item
+        finally:
+            # Browsers are heavy; do not keep them around between crawls
+            await self.browser.close()
+
+    async def __aexit__(self, exc_type: Optional[Type[BaseException]], exc_val: Optional[BaseException], exc_tb) -> None:
+        await self.browser.close()
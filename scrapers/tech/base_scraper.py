@@ -1,8 +1,13 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict, Optional, Type
+from typing import List, Dict, Iterator, Optional, Type
 import requests
 from bs4 import BeautifulSoup
+import csv
 import pandas as pd
+from main.services.record_store import clean_text, is_parquet, write_records
+from scrapers.rate_limiter import THROTTLE_STATUSES, rate_limiter
+from scrapers.http_cache import get_http_cache
+from scrapers.incremental import ScrapeState
 import logging
 from tenacity import retry, stop_after_attempt, wait_fixed
 
@@ -10,6 +15,9 @@ logging.basicConfig(level=logging.INFO, format='%(levelname)s:%(message)s')
 
 class BaseScraper(ABC):
     """Base class for web scrapers"""
+
+    record_type = 'tech'  # schema used for Parquet output (see main/constants/record_schema.py)
+    requests_per_second: Optional[float] = None  # polite rate for base_url's host (None: the limiter default)
     
     def __init__(self, base_url: str, fieldnames: List[str], headers: Dict[str, str] = None):
         self.base_url = base_url
@@ -20,16 +28,10 @@ class BaseScraper(ABC):
         self.headers = headers or default_headers
         self.session = requests.Session()
         self.session.headers.update(self.headers)
-
-    def clean_text(text):
-        """Clean text by removing inconsistent quotes and standardizing format"""
-        if not isinstance(text, str):
-            return text
-        text = text.replace('"', '"').replace('"', '"')
-        text = text.replace('"', '""')
-        text = text.replace('\n', '\\n').replace('\r', '')
-        text = text.replace('\x00', '')
-        return text
+        self.rate_limiter = rate_limiter
+        self.http_cache = get_http_cache()  # None when SCRAPER_HTTP_CACHE_DIR is ''
+        if self.requests_per_second:
+            self.rate_limiter.configure(base_url, self.requests_per_second)
 
     @abstractmethod
     def get_page_soup(self, page_number: int) -> BeautifulSoup:
@@ -46,18 +48,41 @@ class BaseScraper(ABC):
         """Get detailed information for a single item"""
         pass
 
+    def fetch(self, url: str, max_retries: int = 3, headers: Optional[Dict[str, str]] = None) -> requests.Response:
+        """GET url through the shared per-host rate limiter, retrying 429/503 after the requested back-off"""
+        for attempt in range(max_retries + 1):
+            self.rate_limiter.wait(url)
+            response = self.session.get(url, headers=headers)
+            self.rate_limiter.report(url, response.status_code, response.headers.get('Retry-After'))
+            if response.status_code not in THROTTLE_STATUSES or attempt == max_retries:
+                break
+        response.raise_for_status()
+        return response
+
+    def fetch_text(self, url: str, max_retries: int = 3) -> str:
+        """GET url as text, revalidating a stored copy with a conditional GET (304s are served from the HTTP cache)"""
+        headers = self.http_cache.conditional_headers(url) if self.http_cache else {}
+        response = self.fetch(url, max_retries, headers=headers)
+        if response.status_code == 304:
+            text = self.http_cache.not_modified(url)
+            if text is not None:
+                return text
+            response = self.fetch(url, max_retries)  # stored copy vanished; fetch in full
+        if self.http_cache:
+            self.http_cache.store(url, response.content, response.headers, response.encoding)
+        return response.text
+
     def process_item(self, item: Dict[str, str]) -> Dict[str, str]:
         """Process item before adding to dataset (can be overridden by subclasses)"""
         return item
 
-    def scrape(self, limit: int = None, output_file: Optional[str] = None) -> List[Dict[str, str]]:
+    def iter_items(self, limit: int = None, state: Optional[ScrapeState] = None) -> Iterator[Dict[str, str]]:
         """
-        Main scraping method to collect and save data
+        Yield processed items one at a time, as soon as their details are fetched.
+        With a ScrapeState only new or changed listings are fetched and yielded.
         """
-        all_items = []
-        logging.info("Starting scraping process...")
-        
         current_page = 0
+        listing_complete = False
         while limit is None or current_page <= limit:
             logging.info(f"Processing page {current_page}...")
             
@@ -68,33 +93,65 @@ class BaseScraper(ABC):
                 
                 if not items:
                     logging.info("No more items found. Stopping pagination.")
+                    listing_complete = True
                     break
                 
                 logging.info(f"Found {len(items)} items on page {current_page}")
+                if state is not None:
+                    items = [item for item in items if state.needs_details(item)]
                 
                 # Get details for each item
                 for i, item in enumerate(items, 1):
                     logging.info(f"Fetching details for item {i}/{len(items)} on page {current_page}")
                     details = self.get_item_details(item['link'])
                     item.update(details)
-                    processed_item = self.process_item(item)
-                    all_items.append(processed_item)
+                    item = self.process_item(item)
+                    if state is not None:
+                        state.record(item)
+                    yield item
                 
                 current_page += 1
                 
             except Exception as e:
                 logging.error(f"Error processing page {current_page}: {str(e)}")
                 break
+        if state is not None:
+            state.finish(complete=listing_complete)
+
+    def scrape(self, limit: int = None, output_file: Optional[str] = None, incremental: bool = False) -> List[Dict[str, str]]:
+        """
+        Main scraping method to collect and save data
+
+        incremental: only fetch details for listings that are new or changed since the previous
+        incremental run; the full dataset is rebuilt from the saved state and the added/changed/removed
+        sets are written next to it (see scrapers/incremental.py)
+        """
+        logging.info("Starting scraping process...")
+        state = ScrapeState.for_scraper(type(self).__name__) if incremental else None
+        all_items = list(self.iter_items(limit, state=state))
+        if self.http_cache:
+            self.http_cache.report()
+        if state is not None:
+            all_items = state.records()
 
         if output_file:
-            logging.info(f"Saving {len(all_items)} items to {output_file}")
-            df = pd.DataFrame(all_items, columns=self.fieldnames)
-            df.to_csv(output_file, index=False)
-            logging.info("Save complete!")
+            self.save(all_items, output_file)
+        if state is not None:
+            state.save()  # only once the output is written, so a failed run is redone in full
 
         logging.info(f"Scraping complete! Total items collected: {len(all_items)}")
         return all_items
 
+    def save(self, items: List[Dict[str, str]], output_file: str) -> None:
+        """Save items as Parquet (for the pipeline) or as a quoted CSV (for humans)"""
+        logging.info(f"Saving {len(items)} items to {output_file}")
+        df = pd.DataFrame(items, columns=self.fieldnames).map(clean_text)
+        if is_parquet(output_file):
+            write_records(df, output_file, self.record_type)
+        else:
+            df.to_csv(output_file, index=False, quoting=csv.QUOTE_ALL)
+        logging.info("Save complete!")
+
     def make_absolute_url(self, url: str) -> str:
         """Convert a relative URL to an absolute URL"""
         from urllib.parse import urljoin
@@ -24,9 +24,8 @@ class TemplateScraper(BaseScraper):
     def get_page_soup(self, page_number: int) -> BeautifulSoup:
         """Fetch and parse a single page"""
         url = f'{self.base_url}/page/{page_number}'  # Modify URL pattern as needed
-        response = self.session.get(url)
-        response.raise_for_status()
-        return BeautifulSoup(response.text, 'html.parser')
+        # Rate-limited per host (set requests_per_second on the class) and revalidated against the HTTP cache
+        return BeautifulSoup(self.fetch_text(url), 'html.parser')
 
     def get_items_from_page(self, soup: BeautifulSoup) -> List[Dict[str, str]]:
         """Extract items from a page"""
@@ -46,9 +45,7 @@ class TemplateScraper(BaseScraper):
 
     def get_item_details(self, link: str) -> Dict[str, str]:
         """Get detailed information for a single item"""
-        response = self.session.get(link)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'html.parser')
+        soup = BeautifulSoup(self.fetch_text(link), 'html.parser')
         
         details = {
             # Add detailed information extraction
@@ -0,0 +1,176 @@
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Callable, List, Optional
+
+# Headless browsers per scraper; each renders one page at a time
+BROWSER_WORKERS = int(os.getenv('SCRAPER_BROWSER_WORKERS', '4'))
+
+# Requests the scrapers never need: images, fonts and media
+BLOCKED_URL_PATTERNS = [
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.svg', '*.ico',
+    '*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot', '*.mp4', '*.webm',
+]
+
+CSS_SELECTOR = 'css selector'  # selenium's By.CSS_SELECTOR
+
+def headless_chrome(block_resources: bool = True, page_load_timeout: float = 30):
+    """A headless Chrome driver that returns from get() at DOMContentLoaded and skips images/fonts"""
+    from selenium import webdriver
+
+    options = webdriver.ChromeOptions()
+    options.add_argument('--headless=new')
+    options.add_argument('--disable-gpu')
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+    # Readiness is checked on the DOM (wait_for_selector), not on every subresource
+    options.page_load_strategy = 'eager'
+    if block_resources:
+        options.add_argument('--blink-settings=imagesEnabled=false')
+        options.add_experimental_option('prefs', {'profile.managed_default_content_settings.images': 2})
+    driver = webdriver.Chrome(options=options)
+    driver.set_page_load_timeout(page_load_timeout)
+    if block_resources:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': BLOCKED_URL_PATTERNS})
+    return driver
+
+def wait_until(condition: Callable[[], Any], timeout: float, poll: float = 0.05) -> bool:
+    """Poll condition until it is truthy; False if timeout passes first"""
+    deadline = time.monotonic() + timeout
+    while True:
+        if condition():
+            return True
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(poll)
+
+def count_elements(driver, selector: str) -> int:
+    return len(driver.find_elements(CSS_SELECTOR, selector))
+
+def wait_for_selector(driver, selector: str, timeout: float) -> bool:
+    """Wait until selector matches an element in the rendered DOM"""
+    return wait_until(lambda: count_elements(driver, selector) > 0, timeout)
+
+def scroll_until_stable(driver, selector: str, idle: float = 1.0, max_rounds: int = 10) -> int:
+    """
+    Scroll to the bottom until no more elements matching selector appear
+    (infinite scroll); each round waits at most `idle` seconds for new
+    ones. Returns the final count.
+    """
+    count = count_elements(driver, selector)
+    for _ in range(max_rounds):
+        driver.execute_script('window.scrollTo(0, document.body.scrollHeight);')
+        if not wait_until(lambda: count_elements(driver, selector) > count, idle):
+            break
+        count = count_elements(driver, selector)
+    return count
+
+def page_source(driver) -> str:
+    return driver.page_source
+
+def load_page(driver, url: str, ready: Optional[str] = None, timeout: float = 10,
+              then: Callable = page_source) -> Any:
+    """
+    Open url and wait until the ready selector is present, then return then(driver)
+    (the rendered html by default). A page where ready never appears is still
+    handed to then() after timeout, e.g. the empty page past the last listing page.
+    """
+    driver.get(url)
+    if ready and not wait_for_selector(driver, ready, timeout):
+        logging.debug(f"'{ready}' did not appear on {url} within {timeout}s")
+    return then(driver)
+
+class BrowserPool:
+    """
+    A fixed set of browser drivers shared by coroutines.
+
+    Drivers are blocking (selenium), so each job runs in a worker thread with
+    a driver checked out of the pool: up to `size` pages render in parallel
+    while the event loop keeps scheduling. Drivers start on first use;
+    one that dies mid-job is replaced. driver_factory makes a driver
+    (headless_chrome by default); tests can pass one that serves fixture html.
+    """
+
+    def __init__(self, size: int = BROWSER_WORKERS, driver_factory: Callable = headless_chrome):
+        self.size = size
+        self.driver_factory = driver_factory
+        self.drivers: List = []
+        self.idle: Optional[asyncio.Queue] = None
+        self.start_lock = asyncio.Lock()
+
+    async def start(self) -> None:
+        async with self.start_lock:
+            if self.idle is not None:
+                return
+            logging.info(f"Starting {self.size} browser(s)...")
+            self.drivers = list(await asyncio.gather(*(asyncio.to_thread(self.driver_factory) for _ in range(self.size))))
+            self.idle = asyncio.Queue()
+            for driver in self.drivers:
+                self.idle.put_nowait(driver)
+
+    async def close(self) -> None:
+        async with self.start_lock:
+            drivers, self.drivers, self.idle = self.drivers, [], None
+            await asyncio.gather(*(asyncio.to_thread(_quit, driver) for driver in drivers))
+
+    @asynccontextmanager
+    async def driver(self):
+        """
+        Check out a driver for the duration of the block. The driver goes back
+        to the pool when the block exits, so the block must not leave a worker
+        thread still using it (see run()).
+        """
+        if self.idle is None:
+            await self.start()
+        idle = self.idle
+        driver = await idle.get()
+        try:
+            yield driver
+        except BaseException:
+            if not await asyncio.to_thread(_alive, driver):
+                logging.warning("Browser died; starting a replacement")
+                await asyncio.to_thread(_quit, driver)
+                replacement = await asyncio.to_thread(self.driver_factory)
+                self.drivers[self.drivers.index(driver)] = replacement
+                driver = replacement
+            raise
+        finally:
+            idle.put_nowait(driver)
+
+    async def run(self, fn: Callable, *args) -> Any:
+        """Call fn(driver, *args) in a worker thread with a pooled driver"""
+        async with self.driver() as driver:
+            job = asyncio.ensure_future(asyncio.to_thread(fn, driver, *args))
+            try:
+                return await asyncio.shield(job)
+            except asyncio.CancelledError:
+                # The worker thread can't be interrupted: hold on to the driver until it is done with it
+                await _wait_through_cancellation(job)
+                raise
+
+    async def render(self, url: str, ready: Optional[str] = None, timeout: float = 10, then: Callable = page_source) -> Any:
+        """load_page in a pooled browser"""
+        return await self.run(load_page, url, ready, timeout, then)
+
+async def _wait_through_cancellation(job: asyncio.Future) -> None:
+    while not job.done():
+        try:
+            await asyncio.wait([job])
+        except asyncio.CancelledError:
+            pass
+
+def _alive(driver) -> bool:
+    try:
+        driver.title
+        return True
+    except Exception:
+        return False
+
+def _quit(driver) -> None:
+    try:
+        driver.quit()
+    except Exception as e:
+        logging.warning(f"Error closing browser: {e!r}")
@@ -1,14 +1,27 @@
-from typing import List, Dict
+from typing import Callable, List, Dict, Optional
 from bs4 import BeautifulSoup
-from scrapers.tech.base_scraper import BaseScraper
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
-import time
+from aiohttp import ClientSession
+from scrapers.tech.base_browser_scraper import BrowserScraper
+from scrapers.tech.browser_pool import CSS_SELECTOR, headless_chrome, scroll_until_stable
+import asyncio
 import logging
 
-class ColumbiaScraper(BaseScraper):
-    def __init__(self):
+RESULT_CARD = ".Result_resultCard__iJcI0"
+DETAILS_BODY = ".Typography_body1__SeQ9n.DetailsWithData_detailsBody__wcTdA"
+
+def load_all_results(driver) -> str:
+    """Scroll until no more result cards load, then return the page html (runs in a browser thread)"""
+    scroll_until_stable(driver, RESULT_CARD, idle=1.0)
+    return driver.page_source
+
+def details_text(driver) -> Optional[str]:
+    elements = driver.find_elements(CSS_SELECTOR, DETAILS_BODY)
+    return elements[0].text.strip() if elements else None
+
+class ColumbiaScraper(BrowserScraper):
+    requests_per_second = 5
+
+    def __init__(self, driver_factory: Callable = headless_chrome):
         fieldnames = [
             'university',
             'title',
@@ -23,53 +36,17 @@ class ColumbiaScraper(BaseScraper):
             fieldnames=fieldnames,
             headers={
                 'User-Agent': 'ColumbiaScraper/1.0',
-            }
+            },
+            driver_factory=driver_factory
         )
-        self.request_delay = 0.2
-        self.driver = None
-
-    def __enter__(self):
-        options = webdriver.ChromeOptions()
-        options.add_argument('--headless=new')  # Use new headless mode
-        options.add_argument('--disable-gpu')  # Required for some systems
-        options.add_argument('--no-sandbox')
-        options.add_argument('--disable-dev-shm-usage')
-        self.driver = webdriver.Chrome(options=options)
-        return super().__enter__()
 
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        if self.driver:
-            self.driver.quit()
-        return super().__exit__(exc_type, exc_val, exc_tb)
-
-    def get_page_soup(self, page_number: int) -> BeautifulSoup:
-        """Fetch and parse a single page"""
+    async def get_page_soup(self, session: ClientSession, page_number: int) -> BeautifulSoup:
+        """Render a single page, scrolling until its infinite-scroll results stop growing"""
         url = self.base_url
-        if page_number > 0:
-            url = f"{self.base_url}?p={page_number + 1}"
-            
-        self.driver.get(url)
-        time.sleep(0.1)  # Wait for initial load
-        
-        # Scroll down to load all content
-        body = self.driver.find_element(By.TAG_NAME, "body")
-        prev_count = 0
-        
-        for i in range(10):  # Reduced from 50 since we're paginating
-            # Scroll down
-            for _ in range(3):
-                body.send_keys(Keys.PAGE_DOWN)
-            time.sleep(0.1)  # Wait for content to load
-            
-            current_cards = self.driver.find_elements(By.CSS_SELECTOR, ".Result_resultCard__iJcI0")
-            current_count = len(current_cards)
-            
-            if current_count == prev_count:
-                break
-                
-            prev_count = current_count
-        
-        return BeautifulSoup(self.driver.page_source, 'html.parser')
+        if page_number > 1:
+            url = f"{self.base_url}?p={page_number}"
+        content = await self.render(url, ready=RESULT_CARD, then=load_all_results)
+        return BeautifulSoup(content, 'html.parser')
 
     def get_items_from_page(self, soup: BeautifulSoup) -> List[Dict[str, str]]:
         """Extract items from a page"""
@@ -98,22 +75,14 @@ class ColumbiaScraper(BaseScraper):
         
         return items
 
-    def get_item_details(self, link: str) -> Dict[str, str]:
+    async def get_item_details(self, session: ClientSession, link: str) -> Dict[str, str]:
         """Get detailed information for a single item"""
-        time.sleep(self.request_delay)
         logging.info(f"Fetching details from: {link}")
-        self.driver.get(link)
-        time.sleep(0.1)
-        
-        try:
-            description_elem = self.driver.find_element(
-                By.CSS_SELECTOR, 
-                ".Typography_body1__SeQ9n.DetailsWithData_detailsBody__wcTdA"
-            )
-            return {'description': description_elem.text.strip()}
-        except Exception as e:
-            logging.warning(f"Could not find description for {link}: {str(e)}")
+        description = await self.render(link, ready=DETAILS_BODY, then=details_text)
+        if description is None:
+            logging.warning(f"Could not find description for {link}")
             return {'description': 'No description available'}
+        return {'description': description}
 
     def process_item(self, item: Dict[str, str]) -> Dict[str, str]:
         """Process item before adding to dataset"""
@@ -121,14 +90,17 @@ class ColumbiaScraper(BaseScraper):
             item['description'] = 'No description available'
         return item
 
-if __name__ == '__main__':
-    with ColumbiaScraper() as scraper:
+async def main():
+    async with ColumbiaScraper() as scraper:
         try:
-            results = scraper.scrape(
-                limit=158,  # Only need one "page" since it's infinite scroll
-                output_file='data/tech/columbia_2024_11_26.csv'
+            results = await scraper.scrape(
+                limit=158,  # Number of result pages
+                output_file='data/tech/columbia_2024_11_26.parquet'
             )
             print(f"Successfully scraped {len(results)} items")
             
         except Exception as e:
-            print(f"An error occurred: {str(e)}")
\ No newline at end of file
+            print(f"An error occurred: {str(e)}")
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -1,9 +1,10 @@
 from typing import List, Dict
 from bs4 import BeautifulSoup
 from scrapers.tech.base_scraper import BaseScraper
-import time
 
 class MITScraper(BaseScraper):
+    requests_per_second = 5
+
     def __init__(self):
         fieldnames = [
             'university',
@@ -21,15 +22,11 @@ class MITScraper(BaseScraper):
                 'User-Agent': 'MITScraper/1.0',
             }
         )
-        self.request_delay = 0.2
 
     def get_page_soup(self, page_number: int) -> BeautifulSoup:
         """Fetch and parse a single page"""
-        time.sleep(self.request_delay)
         url = f'{self.base_url}?page={page_number}'
-        response = self.session.get(url)
-        response.raise_for_status()
-        return BeautifulSoup(response.text, 'html.parser')
+        return BeautifulSoup(self.fetch_text(url), 'html.parser')
 
     def get_items_from_page(self, soup: BeautifulSoup) -> List[Dict[str, str]]:
         """Extract items from a page"""
@@ -49,10 +46,7 @@ class MITScraper(BaseScraper):
 
     def get_item_details(self, link: str) -> Dict[str, str]:
         """Get detailed information for a single item"""
-        time.sleep(self.request_delay)
-        response = self.session.get(link)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'html.parser')
+        soup = BeautifulSoup(self.fetch_text(link), 'html.parser')
         
         body = soup.find('div', class_="tech-brief-body")
         description_parts = []
@@ -90,9 +84,6 @@ class MITScraper(BaseScraper):
         """Process item before adding to dataset"""
         if not item.get('description'):
             item['description'] = 'No description available'
-        # Replace newlines with escaped newlines in description
-        if 'description' in item:
-            item['description'] = item['description'].replace('\n', '\\n')
         return item
 
 
@@ -101,7 +92,7 @@ if __name__ == '__main__':
         try:
             results = scraper.scrape(
                 limit=132,  # Number of pages found in notebook
-                output_file='data/tech/mit_2024_11_26.csv'
+                output_file='data/tech/mit_2024_11_26.parquet'
             )
             print(f"Successfully scraped {len(results)} items")
             
@@ -1,11 +1,17 @@
-from typing import List, Dict
+from typing import Callable, List, Dict
 from bs4 import BeautifulSoup
-from scrapers.tech.base_scraper import BaseScraper
-import time
-from selenium import webdriver
+from aiohttp import ClientSession
+from scrapers.tech.base_browser_scraper import BrowserScraper
+from scrapers.tech.browser_pool import headless_chrome
+import asyncio
 
-class UPennScraper(BaseScraper):
-    def __init__(self):
+TITLE_LINK = 'a._name_link_1twmm_25'
+TECHNOLOGY_MAIN = 'div.technology-main'
+
+class UPennScraper(BrowserScraper):
+    requests_per_second = 5
+
+    def __init__(self, driver_factory: Callable = headless_chrome):
         fieldnames = [
             'university',
             'title',
@@ -20,32 +26,14 @@ class UPennScraper(BaseScraper):
             fieldnames=fieldnames,
             headers={
                 'User-Agent': 'UPennScraper/1.0',
-            }
+            },
+            driver_factory=driver_factory
         )
-        self.request_delay = 0.2
-        self.driver = None
-
-    def __enter__(self):
-        options = webdriver.ChromeOptions()
-        options.add_argument('--headless=new')
-        options.add_argument('--disable-gpu')
-        options.add_argument('--no-sandbox')
-        options.add_argument('--disable-dev-shm-usage')
-        self.driver = webdriver.Chrome(options=options)
-        return super().__enter__()
 
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        if self.driver:
-            self.driver.quit()
-        return super().__exit__(exc_type, exc_val, exc_tb)
-
-    def get_page_soup(self, page_number: int) -> BeautifulSoup:
-        """Fetch and parse a single page"""
-        time.sleep(self.request_delay)
-        url = f'{self.base_url}{page_number+1}'
-        self.driver.get(url)
-        time.sleep(0.1)  # Wait for page to load
-        return BeautifulSoup(self.driver.page_source, 'html.parser')
+    async def get_page_soup(self, session: ClientSession, page_number: int) -> BeautifulSoup:
+        """Render and parse a single page"""
+        content = await self.render(f'{self.base_url}{page_number}', ready=TITLE_LINK)
+        return BeautifulSoup(content, 'html.parser')
 
     def get_items_from_page(self, soup: BeautifulSoup) -> List[Dict[str, str]]:
         """Extract items from a page"""
@@ -63,12 +51,9 @@ class UPennScraper(BaseScraper):
         
         return items
 
-    def get_item_details(self, link: str) -> Dict[str, str]:
+    async def get_item_details(self, session: ClientSession, link: str) -> Dict[str, str]:
         """Get detailed information for a single item"""
-        time.sleep(self.request_delay)
-        self.driver.get(link)
-        time.sleep(0.1)  # Wait for page to load
-        soup = BeautifulSoup(self.driver.page_source, 'html.parser')
+        soup = BeautifulSoup(await self.render(link, ready=TECHNOLOGY_MAIN), 'html.parser')
         
         details = {}
         
@@ -96,14 +81,17 @@ class UPennScraper(BaseScraper):
                 item[field] = ''
         return item
 
-if __name__ == '__main__':
-    with UPennScraper() as scraper:
+async def main():
+    async with UPennScraper() as scraper:
         try:
-            results = scraper.scrape(
+            results = await scraper.scrape(
                 limit=21,  # Number of pages found in notebook
-                output_file='data/tech/upenn_2024_12_07.csv'
+                output_file='data/tech/upenn_2024_12_07.parquet'
             )
             print(f"Successfully scraped {len(results)} items")
             
         except Exception as e:
             print(f"An error occurred: {str(e)}")
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,58 @@
+import os
+from bs4 import BeautifulSoup
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+def read_fixture(*path):
+    with open(os.path.join(FIXTURES_DIR, *path), encoding='utf-8') as f:
+        return f.read()
+
+class FakeElement:
+    def __init__(self, tag):
+        self.text = tag.get_text()
+
+class FakeDriver:
+    """
+    Stands in for a selenium driver: get() loads the html that pages(url)
+    returns. With lazy_selector set, only the first `batch` matching
+    elements are in the DOM and each scroll reveals `batch` more, like an
+    infinite-scroll listing.
+    """
+
+    def __init__(self, pages, lazy_selector=None, batch=2):
+        self.pages = pages
+        self.lazy_selector = lazy_selector
+        self.batch = batch
+        self.visited = []
+        self._html = ''
+        self._shown = batch
+
+    @property
+    def title(self):
+        return ''
+
+    def get(self, url):
+        self.visited.append(url)
+        self._html = self.pages(url)
+        self._shown = self.batch
+
+    @property
+    def page_source(self):
+        return str(self._soup())
+
+    def _soup(self):
+        soup = BeautifulSoup(self._html, 'html.parser')
+        if self.lazy_selector:
+            for element in soup.select(self.lazy_selector)[self._shown:]:
+                element.decompose()
+        return soup
+
+    def find_elements(self, by, selector):
+        assert by == 'css selector'
+        return [FakeElement(tag) for tag in self._soup().select(selector)]
+
+    def execute_script(self, script):
+        self._shown += self.batch
+
+    def quit(self):
+        pass
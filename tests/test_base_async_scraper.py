@@ -0,0 +1,43 @@
+import asyncio
+from bs4 import BeautifulSoup
+import scrapers.tech.base_async_scraper as base_async_scraper
+
+class SlowDetailsScraper(base_async_scraper.BaseScraper):
+    """One listing page of five items; each detail takes a while unless it is the first"""
+
+    def __init__(self):
+        super().__init__('https://example.edu', ['title', 'link'])
+        self.finished = []
+
+    async def get_page_soup(self, session, page_number):
+        return BeautifulSoup('', 'html.parser')
+
+    def get_items_from_page(self, soup):
+        return [{'title': f'Item {i}', 'link': f'https://example.edu/{i}'} for i in range(5)]
+
+    async def get_page_items(self, session, page_number):
+        return self.get_items_from_page(None) if page_number == 1 else []
+
+    async def get_item_details(self, session, link):
+        try:
+            await asyncio.sleep(0 if link.endswith('/0') else 10)
+            return {'description': link}
+        finally:
+            await asyncio.sleep(0.05)  # cleanup that outlasts closing the session
+            self.finished.append(link)
+
+def test_stopping_early_waits_for_cancelled_requests(monkeypatch):
+    monkeypatch.setattr(base_async_scraper, 'get_http_cache', lambda: None)
+    scraper = SlowDetailsScraper()
+
+    async def first_item():
+        items = scraper.iter_items(max_concurrent=10)
+        item = await anext(items)
+        await items.aclose()
+        # Every cancelled detail request has unwound by the time the generator is closed
+        return item, sorted(scraper.finished)
+
+    item, finished = asyncio.run(first_item())
+
+    assert item['link'] == 'https://example.edu/0'
+    assert finished == [f'https://example.edu/{i}' for i in range(5)]
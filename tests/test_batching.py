@@ -0,0 +1,93 @@
+from main.services.batching import AdaptiveBatcher, estimate_vector_bytes
+from benchmarks.fakes import FakeApiError, FakePinecone
+
+def vectors(count, dimension=8):
+    return [{"id": f"v{i}", "values": [0.1] * dimension, "metadata": {"n": i}} for i in range(count)]
+
+def upsert_to(index):
+    """Upsert call as embedding_service makes it (no per-item results)"""
+    def upsert(batch):
+        index.upsert(vectors=batch, namespace="ns1")
+    return upsert
+
+def upsert_batcher(max_items=100, **kwargs):
+    return AdaptiveBatcher("upsert", max_items=max_items, size_fn=estimate_vector_bytes, base_delay=0.001, **kwargs)
+
+def test_size_error_splits_and_shrinks_the_cap():
+    index = FakePinecone(dimension=8).Index("test")
+    index.max_request_bytes = 20 * estimate_vector_bytes(vectors(1)[0])
+    batcher = upsert_batcher()
+
+    results = batcher.run(vectors(64), upsert_to(index))
+
+    assert all(results)
+    assert len(index.namespaces["ns1"]) == 64
+    assert batcher.stats['splits'] > 0
+    assert batcher.max_items <= 20
+
+def test_transient_errors_retry_at_the_same_size():
+    index = FakePinecone(dimension=8).Index("test")
+    calls = []
+
+    def flaky_upsert(batch):
+        calls.append(len(batch))
+        if len(calls) <= 2:
+            raise FakeApiError(503, "Service Unavailable")
+        upsert_to(index)(batch)
+
+    batcher = upsert_batcher()
+    results = batcher.run(vectors(50), flaky_upsert)
+
+    assert all(results)
+    assert calls == [50, 50, 50]
+    assert batcher.stats['splits'] == 0
+    assert batcher.max_items == 100
+
+def test_connection_errors_are_retried():
+    calls = []
+
+    def call(batch):
+        calls.append(len(batch))
+        if len(calls) == 1:
+            raise ConnectionResetError("connection reset by peer")
+        return None
+
+    batcher = upsert_batcher()
+    assert all(batcher.run(vectors(10), call))
+    assert calls == [10, 10]
+
+def test_random_server_errors_keep_the_cap():
+    index = FakePinecone(dimension=8, error_rate=0.2, seed=3).Index("test")
+    batcher = upsert_batcher(max_items=10)
+
+    results = batcher.run(vectors(200), upsert_to(index))
+
+    assert all(results)
+    assert batcher.stats['retries'] > 0
+    assert batcher.max_items == 10
+
+def test_cap_recovers_after_successes():
+    index = FakePinecone(dimension=8).Index("test")
+    batcher = upsert_batcher(max_items=40)
+    index.max_request_bytes = 6 * estimate_vector_bytes(vectors(1)[0])
+    batcher.run(vectors(40), upsert_to(index))
+    shrunk = batcher.max_items
+    assert shrunk <= 6
+
+    index.max_request_bytes = 10 ** 9
+    batcher.run(vectors(400), upsert_to(index))
+    assert batcher.max_items > shrunk
+
+def test_other_errors_fail_without_retrying():
+    calls = []
+
+    def call(batch):
+        calls.append(len(batch))
+        raise FakeApiError(401, "Unauthorized")
+
+    batcher = upsert_batcher()
+    results = batcher.run(vectors(10), call)
+
+    assert results == [None] * 10
+    assert calls == [10]
+    assert len(batcher.failed_items) == 10
@@ -0,0 +1,37 @@
+import asyncio
+import threading
+from fake_browser import FakeDriver
+from scrapers.tech.browser_pool import BrowserPool
+
+def test_cancelled_job_keeps_its_driver_until_the_worker_finishes():
+    release = threading.Event()
+    started = threading.Event()
+    users = []
+
+    def slow_job(driver):
+        users.append(driver)
+        started.set()
+        release.wait(5)
+        users.remove(driver)
+        return 'slow'
+
+    def quick_job(driver):
+        assert driver not in users, "driver handed out while a worker thread still used it"
+        return 'quick'
+
+    async def main():
+        pool = BrowserPool(1, lambda: FakeDriver(lambda url: ''))
+        slow = asyncio.create_task(pool.run(slow_job))
+        await asyncio.to_thread(started.wait, 5)
+        slow.cancel()
+        await asyncio.sleep(0.05)
+        quick = asyncio.create_task(pool.run(quick_job))
+        await asyncio.sleep(0.05)
+        assert not slow.done() and not quick.done()
+        release.set()
+        result = await quick
+        assert slow.cancelled()
+        await pool.close()
+        return result
+
+    assert asyncio.run(main()) == 'quick'
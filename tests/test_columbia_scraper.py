@@ -0,0 +1,39 @@
+import asyncio
+from fake_browser import FakeDriver, read_fixture
+from scrapers.tech.live_scrapers.columbia_scraper import RESULT_CARD, ColumbiaScraper
+
+BASE = 'https://inventions.techventures.columbia.edu'
+
+def pages(url):
+    if '/technologies/' in url:
+        return read_fixture('columbia', 'detail.html')
+    if url == f'{BASE}/categories':
+        return read_fixture('columbia', 'listing.html')
+    return '<html><body></body></html>'  # past the last listing page
+
+def test_columbia_scraper_parses_fixture_pages():
+    drivers = []
+
+    def driver_factory():
+        drivers.append(FakeDriver(pages, lazy_selector=RESULT_CARD))
+        return drivers[-1]
+
+    scraper = ColumbiaScraper(driver_factory=driver_factory)
+    scraper.ready_timeout = 0.1
+    scraper.rate_limiter.configure(BASE, 1000)
+
+    async def scrape():
+        return [item async for item in scraper.iter_items(max_concurrent=4)]
+
+    items = sorted(asyncio.run(scrape()), key=lambda item: item['title'])
+
+    assert [(item['title'], item['number'], item['link']) for item in items] == [
+        ('CRISPR Off-Target Detection Assay', '', f'{BASE}/technologies/crispr-off-target-assay--CU22301'),
+        ('Low-Power Neural Implant for Closed-Loop Stimulation', 'CU24012', f'{BASE}/technologies/low-power-neural-implant--CU24012'),
+        ('Solid-State Sodium Battery Electrolyte', 'CU23187', f'{BASE}/technologies/solid-state-sodium-battery--CU23187'),
+    ]
+    for item in items:
+        assert item['university'] == 'Columbia'
+        assert item['description'] == 'This implant records and stimulates neural tissue with a power budget under 1 mW.'
+    # Cards past the first scroll batch were only found by scrolling
+    assert len(items) > drivers[0].batch
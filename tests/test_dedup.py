@@ -0,0 +1,24 @@
+from main.services.dedup import EMPTY_SIGNATURE, find_duplicate_clusters, minhash_signatures
+
+TOPIC = ("Develop autonomous course of action generation for battalion echelon using AI ML to reduce "
+         "planning time from hours to minutes with multi agent reinforcement learning and wargaming simulation")
+OTHER = "Lipid nanoparticles that deliver mRNA to T cells in vivo for cancer immunotherapy and vaccines"
+
+def test_identical_texts_cluster_without_groups():
+    signatures = minhash_signatures([TOPIC, OTHER, TOPIC])
+    assert find_duplicate_clusters(signatures) == [[0, 2]]
+
+def test_groups_only_merge_across_sources():
+    texts = [TOPIC, TOPIC, TOPIC, OTHER, OTHER]
+    groups = ["grantsgov", "grantsgov", "dodsbirsttr", "grantsgov", "grantsgov"]
+    clusters = find_duplicate_clusters(minhash_signatures(texts), groups=groups)
+    # One grants.gov copy pairs with the DOD topic; same-source copies are never merged
+    assert len(clusters) == 1
+    assert sorted(groups[row] for row in clusters[0]) == ["dodsbirsttr", "grantsgov"]
+    assert 2 in clusters[0]
+
+def test_short_and_empty_texts_never_cluster():
+    signatures = minhash_signatures(["", "", "grant", "grant", "two words"])
+    assert (signatures == EMPTY_SIGNATURE).all()
+    assert find_duplicate_clusters(signatures) == []
+    assert find_duplicate_clusters(signatures, groups=["a", "b", "a", "b", "a"]) == []
@@ -0,0 +1,73 @@
+import shutil
+import pandas as pd
+from main.constants.results_blacklist import LEGACY_GRANTS_BLACKLIST
+from main.services.document_ids import (
+    content_hash, grant_ids, make_doc_id, migrate_blacklist, record_ids, resolve_grants_blacklist, tech_ids
+)
+from benchmarks.fakes import FakePinecone
+
+def test_grant_ids_use_source_and_opportunity_number():
+    frame = pd.DataFrame({
+        "link": ["https://www.grants.gov/search-results-detail/353676", "https://www.dodsbirsttr.mil/topics-app/"],
+        "opportunity_number": ["HHS-2025-ACF-0001", "A254-005"],
+        "title": ["Awards for Faculty", "Automated Course of Action Generation"],
+    })
+    assert grant_ids(frame).tolist() == ["grantsgov-HHS-2025-ACF-0001", "dodsbirsttr-A254-005"]
+
+def test_empty_number_falls_back_to_a_content_hash():
+    frame = pd.DataFrame({"link": ["https://www.grants.gov/x"], "opportunity_number": ["  "], "title": ["Awards"]})
+    expected = "grantsgov-h" + content_hash("Awards", "https://www.grants.gov/x")
+    assert grant_ids(frame).tolist() == [expected]
+    # Stable across runs, different for different content
+    assert grant_ids(frame).tolist() == [expected]
+    assert grant_ids(frame.assign(title=["Other"])).tolist() != [expected]
+
+def test_tech_ids_replace_unsafe_characters():
+    frame = pd.DataFrame({
+        "university": ["University of Pennsylvania", "Stanford"],
+        "number": ["24-105 21/B", ""],
+        "link": ["https://upenn.technologypublisher.com/tech/x", "https://techfinder.stanford.edu/technology/y"],
+        "title": ["Targeted mRNA", "Robotic Gait Trainer"],
+    })
+    ids = tech_ids(frame).tolist()
+    assert ids[0] == "University_of_Pennsylvania-24-105_21_B"
+    assert ids[1] == "Stanford-h" + content_hash(frame["link"][1], frame["title"][1])
+    assert make_doc_id("MIT", "a?b#c") == "MIT-a_b_c"
+
+def test_record_ids_match_formatted_ids():
+    records = pd.DataFrame({
+        "LINK": ["https://www.dodsbirsttr.mil/topics-app/"], "OPPORTUNITY NUMBER": ["A254-005"], "OPPORTUNITY TITLE": ["T"],
+    })
+    assert record_ids(records, "grants").tolist() == ["dodsbirsttr-A254-005"]
+
+def legacy_index(pc, index_name, legacy_ids):
+    index = pc.Index(index_name)
+    index.upsert(vectors=[
+        {"id": legacy_id, "values": [0.1] * 4,
+         "metadata": {"title": f"T{n}", "opportunity_number": f"HHS-{n}", "link": "https://www.grants.gov/x"}}
+        for n, legacy_id in enumerate(legacy_ids)
+    ], namespace="ns1")
+
+def test_legacy_blacklist_resolves_through_its_index():
+    pc = FakePinecone(dimension=4)
+    for index_name, legacy_ids in LEGACY_GRANTS_BLACKLIST.items():
+        legacy_index(pc, index_name, legacy_ids)
+    blacklist = resolve_grants_blacklist(pc)
+    assert {f"grantsgov-HHS-{n}" for n in range(5)} <= blacklist
+
+def test_migrate_blacklist_rewrites_the_constants(tmp_path):
+    path = tmp_path / "results_blacklist.py"
+    shutil.copy("main/constants/results_blacklist.py", path)
+    pc = FakePinecone(dimension=4)
+    for index_name, legacy_ids in LEGACY_GRANTS_BLACKLIST.items():
+        legacy_index(pc, index_name, legacy_ids[:-1])  # the last id is missing from the index
+
+    migrate_blacklist(pc, path=str(path))
+
+    constants = {}
+    exec(path.read_text(), constants)
+    assert constants["GRANTS_BLACKLIST"] == [f"grantsgov-HHS-{n}" for n in range(4)]
+    assert constants["LEGACY_GRANTS_BLACKLIST"] == {
+        index_name: legacy_ids[-1:] for index_name, legacy_ids in LEGACY_GRANTS_BLACKLIST.items()
+    }
+    assert constants["TECH_BLACKLIST"] == []
@@ -0,0 +1,47 @@
+import pandas as pd
+from main.services.embedding_service import EmbeddingsGenerator, REQUIRED_COLUMNS
+from main.services.index_snapshot import Snapshot
+from main.services.record_store import write_records
+from benchmarks.fakes import FakePinecone
+
+TOPIC = ("Develop autonomous course of action generation for battalion echelon using AI ML to reduce "
+         "planning time from hours to minutes with multi agent reinforcement learning and wargaming simulation")
+
+def grant(number, link, description, summary=""):
+    row = {col: "" for col in REQUIRED_COLUMNS['grants']}
+    row.update({"OPPORTUNITY TITLE": description.split(" for ")[0], "OPPORTUNITY NUMBER": number, "LINK": link,
+                "DESCRIPTION": description, "LLM Summary": summary, "LLM Teaser": summary})
+    return row
+
+def build(tmp_path, rows, chunk_size):
+    data_path = tmp_path / "grants"
+    data_path.mkdir()
+    write_records(pd.DataFrame(rows), str(data_path / "grants.parquet"), "grants")
+    pc = FakePinecone()
+    eg = EmbeddingsGenerator(data_path=str(data_path), index_name="grants-test", chunk_size=chunk_size,
+                             snapshot_dir=str(tmp_path / "snapshots"))
+    eg.setup(pc=pc)
+    eg.create_index()
+    eg.load_data(REQUIRED_COLUMNS['grants'])
+    eg.format_grants_data()
+    eg.deduplicate()
+    return eg, pc, eg.generate_embeddings()
+
+def test_build_streams_batches_without_repeats_or_cross_source_duplicates(tmp_path):
+    rows = [
+        grant("HHS-1", "https://www.grants.gov/search-results-detail/1", TOPIC),
+        grant("HHS-2", "https://www.grants.gov/search-results-detail/2", "Lipid nanoparticles that deliver mRNA to T cells"),
+        # Same topic on DOD SBIR, with a summary: kept over the grants.gov copy
+        grant("A254-005", "https://www.dodsbirsttr.mil/topics-app/?A254-005", TOPIC, summary="Summarized."),
+        # Listed again in a later batch: the first record wins
+        grant("HHS-2", "https://www.grants.gov/search-results-detail/2", "A later copy"),
+    ]
+
+    eg, pc, (upserted, failed) = build(tmp_path, rows, chunk_size=2)
+
+    assert (upserted, failed) == (2, 0)
+    assert eg.dropped_ids == {"grantsgov-HHS-1"}
+    stored = pc.Index("grants-test").namespaces["ns1"]
+    assert sorted(stored) == ["dodsbirsttr-A254-005", "grantsgov-HHS-2"]
+    assert stored["grantsgov-HHS-2"][1]["description"].startswith("Lipid")
+    assert sorted(Snapshot(str(tmp_path / "snapshots" / "grants-test")).ids) == sorted(stored)
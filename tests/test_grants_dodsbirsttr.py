@@ -0,0 +1,30 @@
+import os
+import pandas as pd
+from main.services.record_store import clean_text
+from scrapers.grants.grants_dodsbirsttr import iter_dod_grants
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data', 'grants', 'unprocessed')
+
+def baseline_rows():
+    """The export parsed by the original BeautifulSoup script (its CSV escaped newlines and doubled quotes)"""
+    df = pd.read_csv(os.path.join(DATA_DIR, 'dodsbirsttr_2024_11_21.csv'), dtype=str).fillna('nan')
+    df['DESCRIPTION'] = df['DESCRIPTION'].str.replace('\\n', '\n', regex=False).str.replace('""', '"', regex=False)
+    return df
+
+def test_topics_match_baseline_export():
+    rows = list(iter_dod_grants(os.path.join(DATA_DIR, 'dodsbirsttr.html')))
+    baseline = baseline_rows()
+
+    assert len(rows) == len(baseline) == 12
+    for row, (_, expected) in zip(rows, baseline.iterrows()):
+        assert row['OPPORTUNITY NUMBER'] == expected['OPPORTUNITY NUMBER']
+        assert row['OPPORTUNITY TITLE'] == clean_text(expected['OPPORTUNITY TITLE'])
+        assert row['DESCRIPTION'].strip() == clean_text(expected['DESCRIPTION']).strip()
+        assert row['TOTAL_FUNDING_AMOUNT'] == expected['TOTAL_FUNDING_AMOUNT']
+
+def test_keywords_and_body_boxes_form_one_description():
+    first = next(iter_dod_grants(os.path.join(DATA_DIR, 'dodsbirsttr.html')))
+    assert first['OPPORTUNITY NUMBER'] == 'A254-005'
+    assert first['DESCRIPTION'].startswith('KEYWORDS: Autonomy;')
+    assert '\nOBJECTIVE: Automated Course of Action (CoA)' in first['DESCRIPTION']
+    assert first['TOTAL_FUNDING_AMOUNT'] == '$250,000'
@@ -0,0 +1,78 @@
+import asyncio
+import os
+from main.services.completion_engine import CompletionEngine
+from main.services.document_ids import record_ids
+from main.services.embedding_service import EmbeddingsGenerator
+from main.services.index_snapshot import Snapshot, SnapshotWriter, snapshot_path
+from main.services.pipeline import StreamingPipeline
+from main.services.results_journal import ResultsJournal
+from benchmarks.fakes import FakeAsyncOpenAI, FakePinecone
+import pandas as pd
+
+def record(number):
+    return {
+        "university": "Stanford", "title": f"Invention {number}", "number": f"S24-{number:03d}", "patent": "",
+        "link": f"https://techfinder.stanford.edu/technology/{number}", "description": f"A method for thing {number}.",
+    }
+
+def row_id(rec):
+    return record_ids(pd.DataFrame([rec]), "tech").iloc[0]
+
+async def source(records):
+    for rec in records:
+        yield dict(rec)
+
+def make_pipeline(tmp_path, pc):
+    generator = EmbeddingsGenerator(data_path=None, index_name="tech-test", snapshot_dir=str(tmp_path / "snapshots"))
+    generator.setup(pc=pc)
+    engine = CompletionEngine(client=FakeAsyncOpenAI(), requests_per_minute=10**6, tokens_per_minute=10**9)
+    return StreamingPipeline("test", "tech", generator, engine=engine, checkpoint_dir=str(tmp_path / "checkpoints"),
+                             summarize_workers=2, embed_workers=1, flush_seconds=0.01)
+
+def test_resumed_run_indexes_a_journaled_summary_once(tmp_path):
+    pc = FakePinecone()
+    journaled = record(1)
+    os.makedirs(tmp_path / "checkpoints")
+    journal = ResultsJournal(str(tmp_path / "checkpoints" / "test.summarized.journal"))
+    journal.append({"id": row_id(journaled), "record": journaled, "summary": "Summary.", "teaser": "Teaser."})
+    journal.close()
+
+    stats = asyncio.run(make_pipeline(tmp_path, pc).run(source([journaled, record(2)])))
+
+    assert stats['upserted'] == 2
+    assert stats['summarized'] == 1
+    assert len(pc.Index("tech-test").namespaces["ns1"]) == 2
+
+def test_run_merges_streamed_and_earlier_upserts_into_the_snapshot(tmp_path):
+    pc = FakePinecone()
+    index = pc.Index("tech-test")
+    existing = {"id": "stanford-S24-900", "values": [0.5] * 1024, "metadata": {"title": "Existing"}}
+    writer = SnapshotWriter(snapshot_path("tech-test", str(tmp_path / "snapshots")), "tech-test")
+    writer.add([existing])
+    writer.close()
+    # Upserted by an interrupted run, but not yet in the snapshot
+    interrupted = {"id": row_id(record(1)), "values": [0.25] * 1024, "metadata": {"title": "Interrupted"}}
+    index.upsert(vectors=[existing, interrupted], namespace="ns1")
+    os.makedirs(tmp_path / "checkpoints")
+    journal = ResultsJournal(str(tmp_path / "checkpoints" / "test.upserted.journal"))
+    journal.append({"id": interrupted["id"]})
+    journal.close()
+
+    pipeline = make_pipeline(tmp_path, pc)
+    asyncio.run(pipeline.run(source([record(1), record(2)])))
+
+    snapshot = Snapshot(pipeline.snapshot_path)
+    assert sorted(snapshot.ids) == sorted([existing["id"], interrupted["id"], row_id(record(2))])
+    assert snapshot.metadata[snapshot.positions[interrupted["id"]]]["title"] == "Interrupted"
+    assert os.path.exists(os.path.join(pipeline.snapshot_path, 'quantizer.npz'))
+    assert not os.path.exists(f"{pipeline.snapshot_path}.delta")
+
+    pipeline.remove([record(2)])
+    assert row_id(record(2)) not in Snapshot(pipeline.snapshot_path).ids
+
+def test_run_without_a_snapshot_exports_the_index(tmp_path):
+    pc = FakePinecone()
+    pipeline = make_pipeline(tmp_path, pc)
+    asyncio.run(pipeline.run(source([record(1)])))
+
+    assert Snapshot(pipeline.snapshot_path).ids == [row_id(record(1))]
@@ -0,0 +1,37 @@
+import pandas as pd
+import pytest
+from main.constants.record_schema import RECORD_SCHEMAS
+from main.services.record_store import read_records, write_record_batches, write_records
+
+def tech_rows():
+    return pd.DataFrame({
+        "university": ["Stanford", "MIT"],
+        "title": ["Robotic Gait Trainer", "Solid-State Battery"],
+        "link": ["https://a", "https://b"],
+        "inventors": ["Ada; Grace", None],
+        "scraped_at": [1, 2],
+    })
+
+@pytest.mark.parametrize("name", ["records.parquet", "records.csv"])
+def test_extra_columns_are_kept_after_the_schema(tmp_path, name):
+    path = str(tmp_path / name)
+    write_records(tech_rows(), path, "tech")
+
+    df = read_records(path)
+    assert list(df.columns) == RECORD_SCHEMAS["tech"].names + ["inventors", "scraped_at"]
+    assert df["inventors"].tolist()[0] == "Ada; Grace"
+    assert df["scraped_at"].astype(str).tolist() == ["1", "2"]
+    assert df["number"].isna().all()
+
+def test_batches_keep_extra_columns_of_the_first_batch(tmp_path):
+    path = str(tmp_path / "records.parquet")
+    rows = write_record_batches([tech_rows(), tech_rows().drop(columns=["inventors"])], path, "tech")
+
+    df = read_records(path)
+    assert rows == 4
+    assert df["inventors"][2:].isna().all()
+
+def test_batch_with_new_columns_raises(tmp_path):
+    path = str(tmp_path / "records.parquet")
+    with pytest.raises(ValueError, match="surprise"):
+        write_record_batches([tech_rows(), tech_rows().assign(surprise="x")], path, "tech")
@@ -0,0 +1,41 @@
+import asyncio
+from fake_browser import FakeDriver, read_fixture
+from scrapers.tech.live_scrapers.upenn_scraper import UPennScraper
+
+BASE = 'https://upenn.technologypublisher.com'
+
+def pages(url):
+    if '/tech/' in url:
+        return read_fixture('upenn', 'detail.html')
+    if url.endswith('%5Bpage%5D=1'):
+        return read_fixture('upenn', 'listing.html')
+    return '<html><body></body></html>'  # past the last listing page
+
+def test_upenn_scraper_parses_fixture_pages():
+    scraper = UPennScraper(driver_factory=lambda: FakeDriver(pages))
+    scraper.ready_timeout = 0.1
+    scraper.rate_limiter.configure(BASE, 1000)
+
+    async def scrape():
+        return [item async for item in scraper.iter_items(max_concurrent=4)]
+
+    items = sorted(asyncio.run(scrape()), key=lambda item: item['title'])
+
+    assert items == [
+        {
+            'university': 'University of Pennsylvania',
+            'title': 'Robotic Gait Trainer',
+            'patent': '',
+            'link': f'{BASE}/tech/Robotic_Gait_Trainer',
+            'number': '24-10521',
+            'description': 'Lipid nanoparticles that deliver mRNA to T cells in vivo.',
+        },
+        {
+            'university': 'University of Pennsylvania',
+            'title': 'Targeted mRNA Lipid Nanoparticles',
+            'patent': '',
+            'link': f'{BASE}/tech/Targeted_mRNA_Lipid_Nanoparticles',
+            'number': '24-10521',
+            'description': 'Lipid nanoparticles that deliver mRNA to T cells in vivo.',
+        },
+    ]